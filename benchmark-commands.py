@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for building and encoding SDK command bodies
+
+Measures per-command CPU cost of the create/exercise paths without any
+network: the SDK's pre-encoded command templates (payload builder plus
+request body encoding) against the previous approach of rebuilding the
+nested payload dict on every call and serializing it with json.dumps.
+The previous builders are reproduced below verbatim as the baseline.
+
+Run with: python benchmark-commands.py --number 20000 --output command-results.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_module(name, relative_path):
+    """Import one of the repo's script-style modules by file path"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class BaselineCommands:
+    """Command builders as they were before templates: fresh dicts plus json.dumps per call"""
+
+    MODULE_NAME = "AgentTokenizationV2"
+
+    def __init__(self, package_id, party):
+        self.package_id = package_id
+        self.party = party
+
+    def _template_id(self, entity_name):
+        return {"packageId": self.package_id, "moduleName": self.MODULE_NAME, "entityName": entity_name}
+
+    def register_agent(self, agent_data, party=None):
+        for field in ['agent_id', 'name', 'agent_type']:
+            if field not in agent_data:
+                raise ValueError(f"Missing required field: {field}")
+        agent_data.setdefault('description', '')
+        agent_data.setdefault('capabilities', [])
+        agent_data.setdefault('attributes', {})
+        agent_data.setdefault('is_active', True)
+        agent_data.setdefault('created_at', datetime.now(timezone.utc).isoformat())
+        return json.dumps({
+            "templateId": self._template_id("AgentRegistration"),
+            "argument": {
+                "operator": party or self.party,
+                "agentId": agent_data['agent_id'],
+                "name": agent_data['name'],
+                "description": agent_data['description'],
+                "agentType": agent_data['agent_type'],
+                "capabilities": agent_data['capabilities'],
+                "attributes": agent_data['attributes'],
+                "isActive": agent_data['is_active'],
+                "createdAt": agent_data['created_at']
+            }
+        })
+
+    def update_agent_status(self, contract_id, is_active):
+        return json.dumps({
+            "templateId": self._template_id("AgentRegistration"),
+            "contractId": contract_id,
+            "choice": "Activate" if is_active else "Deactivate",
+            "argument": {}
+        })
+
+    def create_usage_token(self, token_data, party=None):
+        for field in ['agent_id', 'usage_type', 'max_usage']:
+            if field not in token_data:
+                raise ValueError(f"Missing required field: {field}")
+        token_data.setdefault('token_id', f"token-{int(time.time())}-{hash(str(token_data)) % 10000}")
+        token_data.setdefault('current_usage', 0)
+        token_data.setdefault('metadata', {})
+        token_data.setdefault('is_active', True)
+        token_data.setdefault('created_at', datetime.now(timezone.utc).isoformat())
+        return json.dumps({
+            "templateId": self._template_id("AgentUsageToken"),
+            "argument": {
+                "operator": party or self.party,
+                "agentId": token_data['agent_id'],
+                "tokenId": token_data['token_id'],
+                "usageType": token_data['usage_type'],
+                "maxUsage": token_data['max_usage'],
+                "currentUsage": token_data['current_usage'],
+                "metadata": token_data['metadata'],
+                "isActive": token_data['is_active'],
+                "createdAt": token_data['created_at']
+            }
+        })
+
+    def record_usage(self, contract_id, usage_amount, command_id=None):
+        payload = {
+            "templateId": self._template_id("AgentUsageToken"),
+            "contractId": contract_id,
+            "choice": "RecordUsage",
+            "argument": {
+                "usageAmount": usage_amount,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+        }
+        if command_id is not None:
+            payload["meta"] = {"commandId": command_id}
+        return json.dumps(payload)
+
+
+def scenarios(sdk, baseline):
+    """{command: (baseline call, templated call)}; each call builds and encodes one body"""
+    def agent():
+        return {'agent_id': 'agent-000042', 'name': 'Bench agent', 'agent_type': 'LLM', 'capabilities': ['text_generation']}
+
+    def token():
+        return {'agent_id': 'agent-000042', 'usage_type': 'API_CALLS', 'max_usage': 10000}
+
+    return {
+        'register_agent': (
+            lambda: baseline.register_agent(agent()),
+            lambda: sdk._encode_body(sdk._register_agent_payload(agent()))
+        ),
+        'update_agent_status': (
+            lambda: baseline.update_agent_status('#1234:0', True),
+            lambda: sdk._encode_body(sdk._update_agent_status_payload('#1234:0', True))
+        ),
+        'create_usage_token': (
+            lambda: baseline.create_usage_token(token()),
+            lambda: sdk._encode_body(sdk._create_usage_token_payload(token()))
+        ),
+        'record_usage': (
+            lambda: baseline.record_usage('#1234:0', 1),
+            lambda: sdk._encode_body(sdk._record_usage_payload('#1234:0', 1))
+        ),
+        'record_usage_with_command_id': (
+            lambda: baseline.record_usage('#1234:0', 1, '4f1c2e6a9b7d4e0f8a3b5c6d7e8f9a0b'),
+            lambda: sdk._encode_body(sdk._record_usage_payload('#1234:0', 1, '4f1c2e6a9b7d4e0f8a3b5c6d7e8f9a0b'))
+        ),
+    }
+
+
+def measure(call, number, repeat):
+    """Best-of-``repeat`` nanoseconds per call"""
+    return min(timeit.repeat(call, number=number, repeat=repeat)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark SDK command building and encoding')
+    parser.add_argument('--number', type=int, default=20000, help='Calls per timing run')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing runs per command (best is reported)')
+    parser.add_argument('--codec', choices=['auto', 'json', 'orjson'], default='auto', help='SDK JSON codec')
+    parser.add_argument('--output', default=None, help='Where to write the JSON results')
+    args = parser.parse_args()
+
+    sdk_module = load_module('agent_tokenization_sdk', 'sdks/agent-tokenization-python-sdk.py')
+    codec = {
+        'auto': sdk_module.default_json_codec,
+        'json': sdk_module.JSONCodec,
+        'orjson': sdk_module.OrjsonCodec
+    }[args.codec]()
+    sdk = sdk_module.AgentTokenizationSDK(package_id='bench-package-id', json_codec=codec)
+    baseline = BaselineCommands(sdk.package_id, sdk.party)
+
+    print(f"🧪 Per-command CPU cost ({codec.name} codec, best of {args.repeat} x {args.number})")
+    print(f"\n{'command':32} {'before ns':>12} {'after ns':>12} {'speedup':>9}")
+    results = {}
+    for name, (before_call, after_call) in scenarios(sdk, baseline).items():
+        before = measure(before_call, args.number, args.repeat)
+        after = measure(after_call, args.number, args.repeat)
+        results[name] = {'before_ns': round(before, 1), 'after_ns': round(after, 1), 'speedup': round(before / after, 2)}
+        print(f"{name:32} {before:>12.0f} {after:>12.0f} {before / after:>8.2f}x")
+
+    if args.output:
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'config': vars(args)
+            },
+            'results': results
+        }
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for the Python SDK and the healthcheck.py proxy
+
+Starts the offline mock JSON API (mock-json-api.py) in-process, optionally
+puts the healthcheck.py reverse proxy in front of it, and measures throughput
+and tail latency for every AgentTokenizationSDK method. Results are written
+as JSON so runs from different commits can be compared.
+
+Run with: python benchmark-sdk.py --output results.json
+          python benchmark-sdk.py --compare results.json --max-regression 20
+"""
+
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_module(name, relative_path):
+    """Import one of the repo's script-style modules by file path"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run_benchmark(call, iterations, concurrency, warmup):
+    """
+    Run ``call(worker, iteration)`` ``iterations`` times across ``concurrency`` threads
+
+    Returns throughput and latency percentiles in milliseconds.
+    """
+    for iteration in range(warmup):
+        call(0, -1 - iteration)
+
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(index):
+        local_latencies = []
+        local_errors = 0
+        while next(counter) < iterations:
+            started = time.perf_counter()
+            try:
+                call(index, len(local_latencies) + local_errors)
+            except Exception:
+                local_errors += 1
+                continue
+            local_latencies.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies) or [0.0]
+    return {
+        'iterations': iterations,
+        'concurrency': concurrency,
+        'errors': sum(errors),
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3)
+    }
+
+
+def sdk_scenarios(sdk, seeded_agents, concurrency, run_id):
+    """Build {method name: call(worker, iteration)} for every SDK method"""
+    agent_ids = [agent['argument']['agentId'] for agent in seeded_agents]
+    agent_cids = [agent['contractId'] for agent in seeded_agents]
+
+    def pick(worker, iteration, items):
+        return items[(worker * 7919 + iteration) % len(items)]
+
+    # Consuming choices hand back a new contract ID; each worker tracks its own
+    status_cids = {}
+    usage_cids = {}
+    for worker in range(concurrency):
+        agent = sdk.register_agent({
+            'agent_id': f"bench-{run_id}-status-{worker}", 'name': 'Status bench agent', 'agent_type': 'LLM'
+        })
+        status_cids[worker] = agent['result']['contractId']
+        token = sdk.create_usage_token({
+            'agent_id': agent_ids[0], 'token_id': f"bench-{run_id}-usage-{worker}",
+            'usage_type': 'API_CALLS', 'max_usage': 10 ** 9
+        })
+        usage_cids[worker] = token['result']['contractId']
+
+    def update_agent_status(worker, iteration):
+        result = sdk.update_agent_status(status_cids[worker], iteration % 2 == 0)
+        status_cids[worker] = result['result']['exerciseResult']
+
+    def record_usage(worker, iteration):
+        result = sdk.record_usage(usage_cids[worker], 1)
+        usage_cids[worker] = result['result']['exerciseResult']
+
+    return {
+        'health_check': lambda w, i: sdk.health_check(),
+        'get_parties': lambda w, i: sdk.get_parties(),
+        'register_agent': lambda w, i: sdk.register_agent({
+            'agent_id': f"bench-{run_id}-{w}-{i}", 'name': 'Bench agent', 'agent_type': 'LLM'
+        }),
+        'bulk_register_agents': lambda w, i: sdk.bulk_register_agents([
+            {'agent_id': f"bench-{run_id}-bulk-{w}-{i}-{n}", 'name': 'Bench agent', 'agent_type': 'LLM'}
+            for n in range(10)
+        ]),
+        'query_agents': lambda w, i: sdk.query_agents(),
+        'get_agent': lambda w, i: sdk.get_agent(pick(w, i, agent_cids)),
+        'get_agent_by_id': lambda w, i: sdk.get_agent_by_id(pick(w, i, agent_ids)),
+        'update_agent_status': update_agent_status,
+        'create_usage_token': lambda w, i: sdk.create_usage_token({
+            'agent_id': pick(w, i, agent_ids), 'token_id': f"bench-{run_id}-token-{w}-{i}",
+            'usage_type': 'API_CALLS', 'max_usage': 1000
+        }),
+        'query_usage_tokens': lambda w, i: sdk.query_usage_tokens({'agentId': pick(w, i, agent_ids)}),
+        'record_usage': record_usage,
+        'get_system_stats': lambda w, i: sdk.get_system_stats(),
+        'get_agent_data': lambda w, i: sdk.get_agent_data(pick(w, i, agent_ids)),
+        'get_usage_summary': lambda w, i: sdk.get_usage_summary(pick(w, i, agent_ids)),
+    }
+
+
+def start_proxy(mock_port):
+    """Start healthcheck.py's proxy in-process in front of the mock and return its base URL"""
+    os.environ['DAML_JSON_API_PORT'] = str(mock_port)
+    healthcheck = load_module('healthcheck', 'healthcheck.py')
+
+    class QuietProxyHandler(healthcheck.ProxyHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = healthcheck.ProxyServer(('127.0.0.1', 0), QuietProxyHandler)
+    threading.Thread(target=server.serve_forever, name='proxy', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, max_regression):
+    """Print p50/p99/throughput deltas against a previous run; return names that regressed"""
+    with open(baseline_path, 'r', encoding='utf-8') as fh:
+        baseline = json.load(fh)['results']
+
+    regressions = []
+    print(f"\n{'benchmark':40} {'p50 ms':>18} {'p99 ms':>18} {'ops/s':>18}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+
+        def delta(key):
+            before = previous[key]
+            change = ((current[key] - before) / before * 100) if before else 0.0
+            return f"{current[key]:>9.2f} ({change:+5.1f}%)", change
+
+        p50, p50_change = delta('p50_ms')
+        p99, _ = delta('p99_ms')
+        ops, ops_change = delta('throughput')
+        print(f"{name:40} {p50:>18} {p99:>18} {ops:>18}")
+        if max_regression is not None and (p50_change > max_regression or -ops_change > max_regression):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Python SDK and healthcheck.py proxy offline')
+    parser.add_argument('--suites', default='sdk,proxy', help='Comma-separated: sdk (direct), proxy (via healthcheck.py)')
+    parser.add_argument('--methods', default=None, help='Comma-separated SDK methods to run (default: all)')
+    parser.add_argument('--iterations', type=int, default=200, help='Calls per benchmark')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent client threads')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed calls before each benchmark')
+    parser.add_argument('--agents', type=int, default=1000, help='Agents seeded into the mock ledger')
+    parser.add_argument('--tokens-per-agent', type=int, default=5, help='Usage tokens seeded per agent')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mock JSON API latency per request (s)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Mock JSON API latency jitter (s)')
+    parser.add_argument('--output', default='benchmark-results.json', help='Where to write the JSON results')
+    parser.add_argument('--compare', default=None, help='Previous results file to compare against')
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help='Exit non-zero if p50 or throughput regresses by more than this percent')
+    args = parser.parse_args()
+
+    sdk_module = load_module('agent_tokenization_sdk', 'sdks/agent-tokenization-python-sdk.py')
+    mock_module = load_module('mock_json_api', 'mock-json-api.py')
+    sdk_module.logger.setLevel('CRITICAL')
+
+    mock = mock_module.start_mock_server(
+        latency=args.latency, jitter=args.jitter, agents=args.agents, tokens_per_agent=args.tokens_per_agent
+    )
+    targets = {'sdk': mock.base_url}
+    suites = [suite.strip() for suite in args.suites.split(',') if suite.strip()]
+    if 'proxy' in suites:
+        targets['proxy'] = start_proxy(mock.server_address[1])
+
+    print(f"🧪 Benchmarking against mock JSON API ({len(mock.ledger)} contracts seeded)")
+    results = {}
+    run_id = int(time.time())
+    for suite in suites:
+        sdk = sdk_module.AgentTokenizationSDK(
+            base_url=targets[suite], package_id=mock.ledger.package_id, pool_maxsize=max(10, args.concurrency)
+        )
+        seeded_agents = sdk.query_agents()[:args.agents]
+        scenarios = sdk_scenarios(sdk, seeded_agents, args.concurrency, f"{run_id}-{suite}")
+        if suite == 'proxy':
+            health_url = f"{targets[suite]}/health"
+            scenarios['proxy_health'] = lambda w, i: sdk.session.get(health_url, timeout=5).raise_for_status()
+        selected = args.methods.split(',') if args.methods else list(scenarios)
+
+        for name in selected:
+            if name not in scenarios:
+                continue
+            stats = run_benchmark(scenarios[name], args.iterations, args.concurrency, args.warmup)
+            results[f"{suite}.{name}"] = stats
+            print(f"  {suite + '.' + name:36} {stats['throughput']:>9.1f} ops/s  p50 {stats['p50_ms']:>8.2f} ms  "
+                  f"p99 {stats['p99_ms']:>8.2f} ms  errors {stats['errors']}")
+        sdk.session.close()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': vars(args)
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\n📄 Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.max_regression)
+        if regressions:
+            print(f"\n❌ Regressions beyond {args.max_regression}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,465 @@
 #!/usr/bin/env python3
 """Reverse proxy server that handles health checks and forwards to DAML JSON API"""
+import bisect
+import collections
+import hashlib
+import http.client
 import http.server
+import json
 import socketserver
 import os
+import socket
 import sys
-import urllib.request
-import urllib.error
+import threading
+import time
 
 PORT = int(os.environ.get('PORT', 8080))
-DAML_JSON_API_PORT = 7575
+DAML_JSON_API_PORT = int(os.environ.get('DAML_JSON_API_PORT', 7575))
+
+# Concurrency: every connection gets its own thread, but at most PROXY_WORKERS
+# of them may be waiting on the JSON API at once. Health checks never take a
+# worker slot, so slow ledger calls cannot starve them.
+PROXY_WORKERS = int(os.environ.get('PROXY_WORKERS', 32))
+PROXY_BACKLOG = int(os.environ.get('PROXY_BACKLOG', 128))
+PROXY_QUEUE_TIMEOUT = float(os.environ.get('PROXY_QUEUE_TIMEOUT', 10))
+UPSTREAM_TIMEOUT = float(os.environ.get('UPSTREAM_TIMEOUT', 30))
+
+# Keep-alive: idle upstream connections are reused for up to
+# UPSTREAM_IDLE_TIMEOUT seconds; idle client connections are closed after
+# CLIENT_KEEPALIVE_TIMEOUT seconds.
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', PROXY_WORKERS))
+UPSTREAM_IDLE_TIMEOUT = float(os.environ.get('UPSTREAM_IDLE_TIMEOUT', 60))
+CLIENT_KEEPALIVE_TIMEOUT = float(os.environ.get('CLIENT_KEEPALIVE_TIMEOUT', 15))
+
+# Streaming: bodies are piped through in PROXY_BUFFER_SIZE pieces instead of
+# being held in memory. Request bodies up to this size are still buffered so a
+# request can be replayed if a pooled upstream connection turns out stale.
+PROXY_BUFFER_SIZE = int(os.environ.get('PROXY_BUFFER_SIZE', 64 * 1024))
+
+# Response cache for idempotent reads: PROXY_CACHE_TTLS maps exact GET paths to
+# TTL seconds; PROXY_CACHE_QUERY_TTL > 0 also caches POST /v1/query responses,
+# keyed by a hash of body + Authorization. Memory is capped at
+# PROXY_CACHE_MAX_BYTES; larger responses than PROXY_CACHE_MAX_ENTRY_BYTES
+# are never stored.
+PROXY_CACHE_TTLS = os.environ.get('PROXY_CACHE_TTLS', '/v1/packages=300,/v1/parties=60,/readyz=1')
+PROXY_CACHE_QUERY_TTL = float(os.environ.get('PROXY_CACHE_QUERY_TTL', 0))
+PROXY_CACHE_MAX_BYTES = int(os.environ.get('PROXY_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+PROXY_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('PROXY_CACHE_MAX_ENTRY_BYTES', 1024 * 1024))
+
+# Request coalescing: identical concurrent POST /v1/query calls (same
+# Authorization, path and body) share one upstream request. The leader's
+# response is streamed to its own client; a copy is kept only if other clients
+# joined while it waited for response headers, and only up to
+# PROXY_COALESCE_MAX_BYTES. Waiters go upstream themselves when it is larger.
+PROXY_COALESCE = os.environ.get('PROXY_COALESCE', '1') == '1'
+PROXY_COALESCE_MAX_BYTES = int(os.environ.get('PROXY_COALESCE_MAX_BYTES', 1024 * 1024))
+
+# Prometheus text-format metrics, served without taking an upstream worker slot
+PROXY_METRICS = os.environ.get('PROXY_METRICS', '1') == '1'
+METRICS_PATH = os.environ.get('PROXY_METRICS_PATH', '/metrics')
+
+HEALTH_PATHS = ('/', '/health')
+
+# JSON API endpoints that get their own metrics label; anything else is 'other'
+JSON_API_ROUTES = frozenset([
+    '/v1/create', '/v1/exercise', '/v1/create-and-exercise', '/v1/query', '/v1/fetch',
+    '/v1/parties', '/v1/parties/allocate', '/v1/packages', '/v1/packages/dars', '/v1/user',
+    '/v1/users', '/v1/user/create', '/v1/user/delete', '/v1/user/rights', '/v1/user/rights/grant',
+    '/v1/user/rights/revoke', '/v1/metering-report', '/v1/stream/query', '/v1/stream/fetch',
+])
+
+# Headers that describe a single connection and must not be forwarded
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'transfer-encoding', 'upgrade'
+}
+
+upstream_slots = threading.BoundedSemaphore(PROXY_WORKERS)
+
+
+def parse_cache_ttls(spec):
+    """Parse 'path=seconds,path=seconds' into a dict"""
+    ttls = {}
+    for item in spec.split(','):
+        if '=' in item:
+            path, ttl = item.split('=', 1)
+            ttls[path.strip()] = float(ttl)
+    return ttls
+
+
+CachedResponse = collections.namedtuple(
+    'CachedResponse', ['status', 'reason', 'headers', 'body', 'etag', 'stored_at', 'expires_at']
+)
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of complete upstream responses"""
+
+    def __init__(self, max_bytes, max_entry_bytes):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(method, path, authorization, body):
+        digest = hashlib.sha256()
+        for part in (method.encode(), path.encode(), authorization.encode(), body or b''):
+            digest.update(part)
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        if len(entry.body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self._bytes -= len(self._entries.pop(key).body)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class SingleFlight:
+    """Collapses identical in-flight upstream requests into one call"""
+
+    class Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.entry = None
+            self.waiters = 0
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """Return (call, is_leader); only the leader goes upstream"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = SingleFlight.Call()
+            self.leaders += 1
+            return call, True
+
+    def seal(self, key, call):
+        """Stop new requests joining ``call`` and return how many already did"""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            return call.waiters
+
+    def finish(self, key, call, entry):
+        """Publish the leader's response (None if it could not be shared) to all waiters"""
+        self.seal(key, call)
+        call.entry = entry
+        call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'leaders': self.leaders, 'coalesced': self.coalesced}
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and two additions"""
+
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.BUCKETS + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+class Metrics:
+    """Process-local proxy metrics rendered in Prometheus text format"""
+
+    def __init__(self):
+        self.requests = collections.Counter()
+        self.upstream_errors = collections.Counter()
+        self.upstream_latency = collections.defaultdict(Histogram)
+        self.proxy_overhead = collections.defaultdict(Histogram)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.in_flight = 0
+        self.upstream_in_flight = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def route(path):
+        """Collapse a request path to a bounded set of route labels"""
+        path = path.split('?', 1)[0]
+        if path.startswith('/v1/packages/') and path != '/v1/packages/dars':
+            return '/v1/packages'
+        if path in JSON_API_ROUTES or path in HEALTH_PATHS or path in ('/readyz', '/livez', METRICS_PATH):
+            return path
+        return 'other'
+
+    @staticmethod
+    def label(value):
+        """Escape a label value for the Prometheus text format"""
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, route, method, status, total_seconds, upstream_seconds, bytes_in, bytes_out):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[(route, method, status)] += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            if upstream_seconds is not None:
+                self.upstream_latency[route].observe(upstream_seconds)
+                self.proxy_overhead[route].observe(max(total_seconds - upstream_seconds, 0.0))
+            else:
+                self.proxy_overhead[route].observe(total_seconds)
+
+    def upstream_started(self):
+        with self._lock:
+            self.upstream_in_flight += 1
+
+    def upstream_finished(self):
+        with self._lock:
+            self.upstream_in_flight -= 1
+
+    def upstream_error(self, route):
+        with self._lock:
+            self.upstream_errors[route] += 1
+
+    def render(self):
+        with self._lock:
+            lines = [
+                '# HELP proxy_requests_total Requests handled by the proxy',
+                '# TYPE proxy_requests_total counter'
+            ]
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(
+                    f'proxy_requests_total{{route="{self.label(route)}",method="{self.label(method)}",'
+                    f'status="{status}"}} {count}'
+                )
+
+            lines += [
+                '# HELP proxy_upstream_errors_total Requests that failed to reach or stream from the JSON API',
+                '# TYPE proxy_upstream_errors_total counter'
+            ]
+            for route, count in sorted(self.upstream_errors.items()):
+                lines.append(f'proxy_upstream_errors_total{{route="{self.label(route)}"}} {count}')
+
+            lines += [
+                '# HELP proxy_upstream_latency_seconds Time until the JSON API returned response headers',
+                '# TYPE proxy_upstream_latency_seconds histogram'
+            ]
+            for route, histogram in sorted(self.upstream_latency.items()):
+                lines += histogram.render('proxy_upstream_latency_seconds', f'route="{self.label(route)}"')
+
+            lines += [
+                '# HELP proxy_overhead_seconds Request handling time not spent waiting on the JSON API',
+                '# TYPE proxy_overhead_seconds histogram'
+            ]
+            for route, histogram in sorted(self.proxy_overhead.items()):
+                lines += histogram.render('proxy_overhead_seconds', f'route="{self.label(route)}"')
+
+            lines += [
+                '# TYPE proxy_in_flight_requests gauge',
+                f'proxy_in_flight_requests {self.in_flight}',
+                '# TYPE proxy_upstream_in_flight_requests gauge',
+                f'proxy_upstream_in_flight_requests {self.upstream_in_flight}',
+                '# TYPE proxy_upstream_workers gauge',
+                f'proxy_upstream_workers {PROXY_WORKERS}',
+                '# TYPE proxy_request_bytes_total counter',
+                f'proxy_request_bytes_total {self.bytes_in}',
+                '# TYPE proxy_response_bytes_total counter',
+                f'proxy_response_bytes_total {self.bytes_out}',
+            ]
+
+        pool = upstream_pool.stats()
+        cache = response_cache.stats()
+        flight = single_flight.stats()
+        lines += [
+            '# TYPE proxy_upstream_pool_idle_connections gauge',
+            f'proxy_upstream_pool_idle_connections {pool["idle"]}',
+            '# TYPE proxy_upstream_pool_connections_created_total counter',
+            f'proxy_upstream_pool_connections_created_total {pool["created"]}',
+            '# TYPE proxy_upstream_pool_connections_reused_total counter',
+            f'proxy_upstream_pool_connections_reused_total {pool["reused"]}',
+            '# TYPE proxy_upstream_pool_connections_evicted_total counter',
+            f'proxy_upstream_pool_connections_evicted_total {pool["evicted"]}',
+            '# TYPE proxy_cache_entries gauge',
+            f'proxy_cache_entries {cache["entries"]}',
+            '# TYPE proxy_cache_bytes gauge',
+            f'proxy_cache_bytes {cache["bytes"]}',
+            '# TYPE proxy_cache_hits_total counter',
+            f'proxy_cache_hits_total {cache["hits"]}',
+            '# TYPE proxy_cache_misses_total counter',
+            f'proxy_cache_misses_total {cache["misses"]}',
+            '# TYPE proxy_cache_evictions_total counter',
+            f'proxy_cache_evictions_total {cache["evictions"]}',
+            '# TYPE proxy_coalesce_leaders_total counter',
+            f'proxy_coalesce_leaders_total {flight["leaders"]}',
+            '# TYPE proxy_coalesced_requests_total counter',
+            f'proxy_coalesced_requests_total {flight["coalesced"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+class CountingWriter:
+    """Wraps the handler's wfile to count bytes sent to the client"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.count = 0
+
+    def write(self, data):
+        self.count += len(data)
+        return self.raw.write(data)
+
+    def flush(self):
+        return self.raw.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+metrics = Metrics()
+cache_ttls = parse_cache_ttls(PROXY_CACHE_TTLS)
+response_cache = ResponseCache(PROXY_CACHE_MAX_BYTES, PROXY_CACHE_MAX_ENTRY_BYTES)
+single_flight = SingleFlight()
+
+
+class UpstreamPool:
+    """Pool of persistent HTTP/1.1 connections to the DAML JSON API"""
+
+    def __init__(self, host, port, max_idle, idle_timeout, timeout):
+        self.host = host
+        self.port = port
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Return (connection, reused); the most recently used idle connection wins"""
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                conn, released_at = self._idle.pop()
+                if now - released_at < self.idle_timeout:
+                    self.reused += 1
+                    return conn, True
+                self.evicted += 1
+                conn.close()
+            self.created += 1
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout), False
+
+    def release(self, conn, reusable=True):
+        """Return a connection to the pool, or close it if it cannot be reused"""
+        if not reusable:
+            conn.close()
+            return
+        now = time.monotonic()
+        with self._lock:
+            # Oldest idle connections sit on the left; evict the expired ones
+            while self._idle and now - self._idle[0][1] >= self.idle_timeout:
+                self._idle.popleft()[0].close()
+                self.evicted += 1
+            if len(self._idle) < self.max_idle:
+                self._idle.append((conn, now))
+                return
+            self.evicted += 1
+        conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'idle': len(self._idle),
+                'created': self.created,
+                'reused': self.reused,
+                'evicted': self.evicted
+            }
+
+
+upstream_pool = UpstreamPool(
+    'localhost', DAML_JSON_API_PORT, UPSTREAM_POOL_SIZE, UPSTREAM_IDLE_TIMEOUT, UPSTREAM_TIMEOUT
+)
+
+
+class ProxyServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Thread-per-connection server with a configurable listen backlog"""
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = PROXY_BACKLOG
+
 
 class ProxyHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 lets clients reuse connections; every response is length- or chunk-delimited
+    protocol_version = 'HTTP/1.1'
+    timeout = CLIENT_KEEPALIVE_TIMEOUT
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; don't let Nagle hold the body back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.wfile = CountingWriter(self.wfile)
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
     def do_GET(self):
         self._proxy_request()
 
@@ -24,59 +473,396 @@ class ProxyHandler(http.server.BaseHTTPRequestHandler):
         self._proxy_request()
 
     def _proxy_request(self):
+        # Per-request accounting for /metrics
+        started = time.perf_counter()
+        self._route = Metrics.route(self.path)
+        self._status = 0
+        self._upstream_seconds = None
+        self._bytes_in = 0
+        self._body_unread = (
+            'chunked' in self.headers.get('Transfer-Encoding', '').lower()
+            or int(self.headers.get('Content-Length', 0) or 0) > 0
+        )
+        bytes_out = self.wfile.count
+        metrics.request_started()
+        try:
+            self._handle_request()
+        finally:
+            if self._body_unread:
+                # Replied before consuming the body; its bytes must not be parsed as the next request
+                self.close_connection = True
+            metrics.request_finished(
+                self._route, self.command, self._status, time.perf_counter() - started,
+                self._upstream_seconds, self._bytes_in, self.wfile.count - bytes_out
+            )
+
+    def _handle_request(self):
+        # Metrics endpoint - served locally like health checks
+        if PROXY_METRICS and self.path == METRICS_PATH:
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
         # Health check endpoint - respond immediately
-        if self.path == '/' or self.path == '/health':
+        if self.path in HEALTH_PATHS:
             self.send_response(200)
             self.send_header('Content-type', 'text/plain')
+            self.send_header('Content-Length', '2')
             self.end_headers()
             self.wfile.write(b'OK')
             return
 
-        # Forward all other requests to DAML JSON API on port 7575
+        # Read small bodies up front so slow uploads do not hold a worker slot
+        body = self._read_small_body()
+
+        cache_ttl = self._cache_ttl(body)
+        coalesce = (
+            PROXY_COALESCE and self.command == 'POST' and body is not None
+            and self.path.split('?', 1)[0] == '/v1/query'
+        )
+        key = None
+        if cache_ttl or coalesce:
+            key = ResponseCache.make_key(self.command, self.path, self.headers.get('Authorization', ''), body)
+
+        if cache_ttl and 'no-cache' not in self.headers.get('Cache-Control', '').lower():
+            entry = response_cache.get(key)
+            if entry is not None:
+                self._send_cached(entry, 'HIT')
+                return
+
+        call = None
+        if coalesce:
+            call, leader = single_flight.begin(key)
+            if not leader:
+                # Another client is already asking the same question; wait for its answer
+                waited = time.perf_counter()
+                call.done.wait(UPSTREAM_TIMEOUT + PROXY_QUEUE_TIMEOUT)
+                if call.entry is not None:
+                    # Time spent waiting on the leader is upstream time, not proxy overhead
+                    self._upstream_seconds = time.perf_counter() - waited
+                    self._send_cached(call.entry, 'COALESCED')
+                    return
+                call = None
+
+        entry = None
         try:
-            # Read request body if present
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length) if content_length > 0 else None
-
-            # Build target URL
-            target_url = f"http://localhost:{DAML_JSON_API_PORT}{self.path}"
-
-            # Create request
-            req = urllib.request.Request(target_url, data=body, method=self.command)
-
-            # Copy headers (except Host)
-            for header, value in self.headers.items():
-                if header.lower() not in ['host', 'connection']:
-                    req.add_header(header, value)
-
-            # Forward request
-            with urllib.request.urlopen(req, timeout=30) as response:
-                # Send response status
-                self.send_response(response.status)
-
-                # Copy response headers
-                for header, value in response.headers.items():
-                    if header.lower() not in ['connection', 'transfer-encoding']:
-                        self.send_header(header, value)
-                self.end_headers()
-
-                # Send response body
-                self.wfile.write(response.read())
-
-        except urllib.error.HTTPError as e:
-            # Forward HTTP errors from JSON API
-            self.send_response(e.code)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(e.read())
+            # Wait for a free upstream worker; shed load instead of queueing forever
+            if not upstream_slots.acquire(timeout=PROXY_QUEUE_TIMEOUT):
+                self._send_error_json(503, 'Proxy busy', f'All {PROXY_WORKERS} upstream workers are in use')
+                return
+            metrics.upstream_started()
+            try:
+                if cache_ttl:
+                    entry = self._forward_buffered(body, key, cache_ttl)
+                elif call is not None:
+                    entry = self._forward_shared(body, key, call)
+                else:
+                    self._forward_request(body)
+            finally:
+                metrics.upstream_finished()
+                upstream_slots.release()
+        finally:
+            if call is not None:
+                single_flight.finish(key, call, entry)
 
+    def _read_small_body(self):
+        """Read and return the request body if it fits in one buffer, else None (streamed later)"""
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            return None
+        content_length = int(self.headers.get('Content-Length', 0))
+        if content_length > PROXY_BUFFER_SIZE:
+            return None
+        body = self.rfile.read(content_length) if content_length > 0 else b''
+        self._bytes_in += len(body)
+        self._body_unread = len(body) < content_length
+        return body
+
+    def _cache_ttl(self, body):
+        """TTL in seconds if this request may be served from the response cache, else 0"""
+        path = self.path.split('?', 1)[0]
+        if self.command == 'GET':
+            return cache_ttls.get(path, 0)
+        if self.command == 'POST' and path == '/v1/query' and body is not None:
+            return PROXY_CACHE_QUERY_TTL
+        return 0
+
+    def _forward_request(self, body):
+        # Forward all other requests to DAML JSON API on port 7575
+        try:
+            conn, response = self._send_upstream(self._upstream_headers(), body)
         except Exception as e:
             # Handle connection errors (JSON API not ready yet)
-            self.send_response(503)
-            self.send_header('Content-type', 'application/json')
+            metrics.upstream_error(self._route)
+            self._send_error_json(503, 'Service unavailable', str(e))
+            return
+
+        try:
+            self._relay_response(response)
+        except Exception as e:
+            # Headers are already on the wire, so the only option is to drop the connection
+            sys.stderr.write(f"{self.address_string()} - error relaying {self.path}: {e}\n")
+            metrics.upstream_error(self._route)
+            self.close_connection = True
+            upstream_pool.release(conn, reusable=False)
+            return
+        # The body has been fully read; closing the response frees the connection for reuse
+        response.close()
+        upstream_pool.release(conn, reusable=not response.will_close)
+
+    def _upstream_headers(self):
+        # Copy headers (except Host and hop-by-hop headers)
+        skip = HOP_BY_HOP_HEADERS | {'host'} | {
+            name.strip().lower() for name in self.headers.get('Connection', '').split(',')
+        }
+        return [(header, value) for header, value in self.headers.items() if header.lower() not in skip]
+
+    def _send_upstream(self, headers, body):
+        """
+        Send request line, headers and body upstream; return (connection, response)
+
+        ``body`` is the already-read request body, or None to stream it from the
+        client. Only buffered bodies can be replayed on a fresh connection.
+        """
+        chunked = 'chunked' in self.headers.get('Transfer-Encoding', '').lower()
+        content_length = 0 if chunked else int(self.headers.get('Content-Length', 0))
+
+        while True:
+            conn, reused = upstream_pool.acquire()
+            try:
+                conn.putrequest(self.command, self.path, skip_accept_encoding=True)
+                for header, value in headers:
+                    conn.putheader(header, value)
+                if chunked:
+                    conn.putheader('Transfer-Encoding', 'chunked')
+                started = time.perf_counter()
+                # A buffered body goes out in the same packet as the headers
+                conn.endheaders(body or None)
+
+                if chunked:
+                    self._pipe_chunked_body(conn)
+                elif body is None:
+                    self._pipe_body(conn, content_length)
+                self._body_unread = False
+
+                response = conn.getresponse()
+                self._upstream_seconds = time.perf_counter() - started
+                return conn, response
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                upstream_pool.release(conn, reusable=False)
+                # A stale pooled connection; replay only if the body is still in hand
+                if reused and body is not None:
+                    continue
+                raise
+            except Exception:
+                upstream_pool.release(conn, reusable=False)
+                raise
+
+    def _pipe_body(self, conn, remaining):
+        """Stream a Content-Length delimited request body upstream"""
+        while remaining > 0:
+            data = self.rfile.read(min(PROXY_BUFFER_SIZE, remaining))
+            if not data:
+                raise ConnectionError('Client closed the connection mid-body')
+            conn.send(data)
+            self._bytes_in += len(data)
+            remaining -= len(data)
+
+    def _pipe_chunked_body(self, conn):
+        """Stream a chunked request body upstream, re-chunked in bounded pieces"""
+        while True:
+            size_line = self.rfile.readline(65537)
+            if not size_line:
+                raise ConnectionError('Client closed the connection mid-body')
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Discard trailers up to the terminating blank line
+                while self.rfile.readline(65537) not in (b'\r\n', b'\n', b''):
+                    pass
+                conn.send(b'0\r\n\r\n')
+                return
+            conn.send(b'%x\r\n' % size)
+            self._pipe_body(conn, size)
+            conn.send(b'\r\n')
+            self.rfile.readline(3)
+
+    def _forward_shared(self, body, key, call):
+        """
+        Stream a coalesced request's response to this client
+
+        A copy is kept for the waiters that joined before response headers
+        arrived, up to PROXY_COALESCE_MAX_BYTES. Returns that copy, or None
+        if nobody waited, it was too large, or the request failed.
+        """
+        try:
+            conn, response = self._send_upstream(self._upstream_headers(), body)
+        except Exception as e:
+            metrics.upstream_error(self._route)
+            self._send_error_json(503, 'Service unavailable', str(e))
+            return None
+
+        copy = [] if single_flight.seal(key, call) else None
+        copied = 0
+
+        def keep_copy(data):
+            nonlocal copy, copied
+            if copy is not None:
+                copied += len(data)
+                if copied > PROXY_COALESCE_MAX_BYTES:
+                    copy = None
+                else:
+                    copy.append(data)
+
+        try:
+            self._relay_response(response, extra_headers=[('X-Cache', 'BYPASS')], on_data=keep_copy)
+        except Exception as e:
+            sys.stderr.write(f"{self.address_string()} - error relaying {self.path}: {e}\n")
+            metrics.upstream_error(self._route)
+            self.close_connection = True
+            upstream_pool.release(conn, reusable=False)
+            return None
+        response.close()
+        upstream_pool.release(conn, reusable=not response.will_close)
+        if copy is None:
+            return None
+
+        data = b''.join(copy)
+        now = time.monotonic()
+        headers = [
+            (header, value) for header, value in response.getheaders()
+            if header.lower() not in HOP_BY_HOP_HEADERS and header.lower() != 'content-length'
+        ]
+        etag = response.getheader('ETag') or '"%s"' % hashlib.sha1(data).hexdigest()
+        return CachedResponse(response.status, response.reason, headers, data, etag, now, now)
+
+    def _forward_buffered(self, body, key, ttl):
+        """
+        Fetch and send a response that may be cached (and shared with coalesced waiters)
+
+        Small 200 responses are stored in the cache. Returns the buffered
+        response, or None if it was streamed or failed.
+        """
+        limit = PROXY_CACHE_MAX_ENTRY_BYTES
+        entry = None
+        try:
+            conn, response = self._send_upstream(self._upstream_headers(), body)
+        except Exception as e:
+            metrics.upstream_error(self._route)
+            self._send_error_json(503, 'Service unavailable', str(e))
+            return None
+
+        try:
+            data = response.read(limit + 1)
+            if len(data) > limit:
+                # Too large to buffer; stream the rest straight through
+                self._relay_response(response, prefix=data, extra_headers=[('X-Cache', 'BYPASS')])
+            else:
+                now = time.monotonic()
+                headers = [
+                    (header, value) for header, value in response.getheaders()
+                    if header.lower() not in HOP_BY_HOP_HEADERS and header.lower() != 'content-length'
+                ]
+                etag = response.getheader('ETag') or '"%s"' % hashlib.sha1(data).hexdigest()
+                entry = CachedResponse(response.status, response.reason, headers, data, etag, now, now + ttl)
+                if ttl and response.status == 200:
+                    response_cache.put(key, entry)
+                self._send_cached(entry, 'MISS')
+        except Exception as e:
+            sys.stderr.write(f"{self.address_string()} - error relaying {self.path}: {e}\n")
+            metrics.upstream_error(self._route)
+            self.close_connection = True
+            upstream_pool.release(conn, reusable=False)
+            return entry
+        response.close()
+        upstream_pool.release(conn, reusable=not response.will_close)
+        return entry
+
+    def _send_cached(self, entry, cache_status):
+        """Send a buffered response, answering 304 when If-None-Match matches its ETag"""
+        age = str(int(time.monotonic() - entry.stored_at))
+        if entry.status == 200 and self._etag_matches(entry.etag):
+            self.send_response(304)
+            self.send_header('ETag', entry.etag)
+            self.send_header('X-Cache', cache_status)
+            self.send_header('Age', age)
             self.end_headers()
-            error_msg = f'{{"error": "Service unavailable", "details": "{str(e)}"}}'
-            self.wfile.write(error_msg.encode())
+            return
+
+        self.send_response(entry.status, entry.reason)
+        for header, value in entry.headers:
+            if header.lower() != 'etag':
+                self.send_header(header, value)
+        if entry.status == 200:
+            self.send_header('ETag', entry.etag)
+        self.send_header('X-Cache', cache_status)
+        self.send_header('Age', age)
+        self.send_header('Content-Length', str(len(entry.body)))
+        self.end_headers()
+        self.wfile.write(entry.body)
+
+    def _etag_matches(self, etag):
+        if_none_match = self.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        candidates = {tag.strip() for tag in if_none_match.split(',')}
+        return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+    def _relay_response(self, response, prefix=b'', extra_headers=(), on_data=None):
+        """
+        Stream the upstream response to the client with bounded buffers
+
+        ``prefix`` is body data already read from ``response``; ``on_data``
+        is called with every body piece sent.
+        """
+        # Send response status
+        self.send_response(response.status, response.reason)
+
+        # Copy response headers
+        for header, value in list(response.getheaders()) + list(extra_headers):
+            if header.lower() not in HOP_BY_HOP_HEADERS:
+                self.send_header(header, value)
+
+        # Without a Content-Length the body is re-chunked for HTTP/1.1 clients;
+        # HTTP/1.0 clients get it delimited by closing the connection
+        has_body = self.command != 'HEAD' and response.status not in (204, 304) and response.status >= 200
+        chunked = has_body and response.getheader('Content-Length') is None
+        if chunked and self.request_version != 'HTTP/1.1':
+            chunked = False
+            self.close_connection = True
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        if not has_body:
+            return
+        data = prefix
+        while True:
+            if not data:
+                data = response.read1(PROXY_BUFFER_SIZE)
+                if not data:
+                    break
+            if on_data is not None:
+                on_data(data)
+            if chunked:
+                self.wfile.write(b'%x\r\n' % len(data))
+                self.wfile.write(data)
+                self.wfile.write(b'\r\n')
+            else:
+                self.wfile.write(data)
+            data = b''
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+
+    def _send_error_json(self, status, error, details):
+        body = json.dumps({'error': error, 'details': details}).encode()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
     def log_message(self, format, *args):
         # Log only errors and important requests
@@ -84,8 +870,10 @@ class ProxyHandler(http.server.BaseHTTPRequestHandler):
             sys.stderr.write(f"{self.address_string()} - {format % args}\n")
 
 if __name__ == '__main__':
-    with socketserver.TCPServer(("0.0.0.0", PORT), ProxyHandler) as httpd:
+    with ProxyServer(("0.0.0.0", PORT), ProxyHandler) as httpd:
         print(f"Reverse proxy server listening on 0.0.0.0:{PORT}")
         print(f"Forwarding requests to DAML JSON API on localhost:{DAML_JSON_API_PORT}")
+        print(f"Upstream workers: {PROXY_WORKERS}, listen backlog: {PROXY_BACKLOG}, "
+              f"upstream pool size: {UPSTREAM_POOL_SIZE}")
         sys.stdout.flush()
         httpd.serve_forever()
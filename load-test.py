@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator for the JSON API and the healthcheck.py proxy
+
+Replays a weighted mix of agent registrations, token creation, usage
+recording and queries through the Python SDK at fixed arrival rates,
+independent of how fast responses come back. Latency is measured from each
+request's scheduled start, so queueing inside the client counts against the
+stack rather than silently lowering the offered load. Rates can be stepped
+up to find the point where throughput stops tracking the target.
+
+Run with: python load-test.py --mock --rate 100,200,400 --step-duration 15
+          python load-test.py --base-url http://localhost:8080 --package-id <id> --rate 50
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = "record_usage=70,query_usage_tokens=10,get_usage_summary=5,get_agent_by_id=5,create_usage_token=5,register_agent=5"
+
+
+def load_module(name, relative_path):
+    """Import one of the repo's script-style modules by file path"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def parse_mix(spec):
+    """Parse 'operation=weight,...' into (operations, weights)"""
+    operations = []
+    weights = []
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition('=')
+        operations.append(name.strip())
+        weights.append(float(weight or 1))
+    return operations, weights
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Window:
+    """Outcomes completed during one reporting interval"""
+
+    def __init__(self):
+        self.latencies = []
+        self.operations = Counter()
+        self.errors = Counter()
+
+    def record(self, operation, latency, error=None):
+        self.operations[operation] += 1
+        if error:
+            self.errors[error] += 1
+        else:
+            self.latencies.append(latency)
+
+    def summary(self, elapsed):
+        ordered = sorted(self.latencies)
+        completed = sum(self.operations.values())
+        return {
+            'completed': completed,
+            'throughput': round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0,
+            'error_rate': round(sum(self.errors.values()) / completed, 4) if completed else 0.0,
+            'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+            'max_ms': round(ordered[-1] * 1000, 2) if ordered else 0.0,
+            'operations': dict(self.operations),
+            'errors': dict(self.errors)
+        }
+
+
+class Workload:
+    """Agent/token population the operations draw from, spread across parties"""
+
+    def __init__(self, sdk, parties, run_id):
+        self.sdk = sdk
+        self.parties = parties
+        self.run_id = run_id
+        self.agents = []
+        # Usage tokens are consumed and re-created by RecordUsage, so each one
+        # is checked out by a single request at a time and returned with its
+        # new contract ID. Too few tokens for the rate shows up as latency.
+        self.tokens = queue.Queue()
+        self._sequence = iter(range(1 << 62))
+        self._lock = threading.Lock()
+
+    def _next_id(self, kind):
+        with self._lock:
+            return f"load-{self.run_id}-{kind}-{next(self._sequence)}"
+
+    def setup(self, agent_count, tokens_per_agent, workers):
+        """Register ``agent_count`` agents, each with ``tokens_per_agent`` usage tokens"""
+        def create(index):
+            party = self.parties[index % len(self.parties)]
+            agent_id = self._next_id('agent')
+            self.sdk.register_agent({'agent_id': agent_id, 'name': 'Load test agent', 'agent_type': 'LLM'}, party)
+            for _ in range(tokens_per_agent):
+                token = self.sdk.create_usage_token({
+                    'agent_id': agent_id, 'token_id': self._next_id('token'),
+                    'usage_type': 'API_CALLS', 'max_usage': 10 ** 9
+                }, party)
+                self.tokens.put((party, token['result']['contractId']))
+            return party, agent_id
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            self.agents = list(executor.map(create, range(agent_count)))
+
+    def run(self, operation):
+        party, agent_id = random.choice(self.agents)
+        if operation == 'record_usage':
+            party, contract_id = self.tokens.get()
+            try:
+                result = self.sdk.record_usage(contract_id, 1, party)
+                contract_id = result['result']['exerciseResult'] or contract_id
+            finally:
+                self.tokens.put((party, contract_id))
+        elif operation == 'register_agent':
+            self.sdk.register_agent({'agent_id': self._next_id('agent'), 'name': 'Load test agent', 'agent_type': 'LLM'}, party)
+        elif operation == 'create_usage_token':
+            self.sdk.create_usage_token({
+                'agent_id': agent_id, 'token_id': self._next_id('token'), 'usage_type': 'API_CALLS', 'max_usage': 1000
+            }, party)
+        elif operation == 'query_agents':
+            self.sdk.query_agents(party=party)
+        elif operation == 'query_usage_tokens':
+            self.sdk.query_usage_tokens({'agentId': agent_id}, party)
+        elif operation == 'get_agent_by_id':
+            self.sdk.get_agent_by_id(agent_id, party)
+        elif operation == 'get_usage_summary':
+            self.sdk.get_usage_summary(agent_id, party)
+        elif operation == 'get_agent_data':
+            self.sdk.get_agent_data(agent_id, party)
+        else:
+            raise ValueError(f"Unknown operation: {operation}")
+
+
+class LoadGenerator:
+    """Schedules open-loop arrivals and aggregates outcomes per interval and per rate step"""
+
+    def __init__(self, workload, operations, weights, workers, max_outstanding, poisson, interval):
+        self.workload = workload
+        self.operations = operations
+        self.weights = weights
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='load')
+        self.max_outstanding = max_outstanding
+        self.poisson = poisson
+        self.interval = interval
+        self.outstanding = 0
+        self.timeline = []
+        self._window = Window()
+        self._step = Window()
+        self._lock = threading.Lock()
+
+    def _execute(self, operation, scheduled):
+        error = None
+        try:
+            self.workload.run(operation)
+        except Exception as e:
+            error = getattr(e, 'code', None) or type(e).__name__
+        latency = time.perf_counter() - scheduled
+        with self._lock:
+            self.outstanding -= 1
+            self._window.record(operation, latency, error)
+            self._step.record(operation, latency, error)
+
+    def _report(self, rate, started, stop):
+        window_started = time.perf_counter()
+        while not stop.wait(self.interval):
+            now = time.perf_counter()
+            with self._lock:
+                window, self._window = self._window, Window()
+                outstanding = self.outstanding
+            stats = window.summary(now - window_started)
+            stats.update(elapsed=round(now - started, 1), target_rate=rate, outstanding=outstanding)
+            self.timeline.append(stats)
+            window_started = now
+            print(f"  t={stats['elapsed']:>6.1f}s target {rate:>7.1f}/s  done {stats['throughput']:>7.1f}/s  "
+                  f"p50 {stats['p50_ms']:>7.1f} ms  p95 {stats['p95_ms']:>7.1f} ms  p99 {stats['p99_ms']:>7.1f} ms  "
+                  f"errors {stats['error_rate'] * 100:>5.1f}%  in-flight {outstanding}")
+
+    def run_step(self, rate, duration, started):
+        """Offer ``rate`` requests/second for ``duration`` seconds; return the step summary"""
+        with self._lock:
+            self._step = Window()
+        stop = threading.Event()
+        reporter = threading.Thread(target=self._report, args=(rate, started, stop), daemon=True)
+        reporter.start()
+
+        step_started = time.perf_counter()
+        deadline = step_started + duration
+        next_arrival = step_started
+        while next_arrival < deadline:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            operation = random.choices(self.operations, self.weights)[0]
+            with self._lock:
+                overloaded = self.outstanding >= self.max_outstanding
+                if overloaded:
+                    # Shed rather than queue without bound; counted as an error
+                    self._window.record(operation, 0.0, 'CLIENT_OVERLOAD')
+                    self._step.record(operation, 0.0, 'CLIENT_OVERLOAD')
+                else:
+                    self.outstanding += 1
+            if not overloaded:
+                self.executor.submit(self._execute, operation, next_arrival)
+            next_arrival += random.expovariate(rate) if self.poisson else 1.0 / rate
+
+        # Let in-flight requests land in this step before summarising it
+        while self.outstanding and time.perf_counter() < deadline + 30:
+            time.sleep(0.01)
+        stop.set()
+        reporter.join()
+        with self._lock:
+            summary = self._step.summary(time.perf_counter() - step_started)
+        summary['target_rate'] = rate
+        return summary
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Open-loop load generator for the Agent Tokenization stack')
+    parser.add_argument('--base-url', default='http://localhost:7575', help='JSON API or proxy URL')
+    parser.add_argument('--package-id', default=None, help='Package ID of the deployed DAR')
+    parser.add_argument('--mock', action='store_true', help='Start mock-json-api.py in-process and target it')
+    parser.add_argument('--proxy', action='store_true', help='With --mock, route traffic through healthcheck.py')
+    parser.add_argument('--mock-latency', type=float, default=0.0, help='Mock JSON API latency per request (s)')
+    parser.add_argument('--rate', default='50', help='Arrival rate(s) in requests/second, comma-separated steps')
+    parser.add_argument('--step-duration', type=float, default=30.0, help='Seconds to hold each rate')
+    parser.add_argument('--arrival', choices=('poisson', 'constant'), default='poisson', help='Inter-arrival distribution')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Weighted operations, e.g. record_usage=80,query_agents=20')
+    parser.add_argument('--parties', default='Alice', help='Comma-separated parties traffic is spread across')
+    parser.add_argument('--agents', type=int, default=50, help='Agents registered before the run')
+    parser.add_argument('--tokens-per-agent', type=int, default=2, help='Usage tokens created per agent')
+    parser.add_argument('--workers', type=int, default=64, help='Maximum concurrent requests')
+    parser.add_argument('--max-outstanding', type=int, default=1000, help='Shed arrivals beyond this many queued requests')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between progress reports')
+    parser.add_argument('--timeout', type=int, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible schedules')
+    parser.add_argument('--output', default=None, help='Write the timeline and per-step summaries as JSON')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    operations, weights = parse_mix(args.mix)
+    rates = [float(rate) for rate in args.rate.split(',') if rate.strip()]
+    parties = [party.strip() for party in args.parties.split(',') if party.strip()]
+
+    sdk_module = load_module('agent_tokenization_sdk', 'sdks/agent-tokenization-python-sdk.py')
+    sdk_module.logger.setLevel('CRITICAL')
+    base_url = args.base_url
+    package_id = args.package_id
+    if args.mock:
+        mock = load_module('mock_json_api', 'mock-json-api.py').start_mock_server(latency=args.mock_latency)
+        base_url = mock.base_url
+        package_id = package_id or mock.ledger.package_id
+        if args.proxy:
+            os.environ['DAML_JSON_API_PORT'] = str(mock.server_address[1])
+            healthcheck = load_module('healthcheck', 'healthcheck.py')
+
+            class QuietProxyHandler(healthcheck.ProxyHandler):
+                def log_message(self, format, *args):
+                    pass
+
+            proxy = healthcheck.ProxyServer(('127.0.0.1', 0), QuietProxyHandler)
+            threading.Thread(target=proxy.serve_forever, name='proxy', daemon=True).start()
+            base_url = f"http://127.0.0.1:{proxy.server_address[1]}"
+    if not package_id:
+        parser.error('--package-id is required unless --mock is used')
+
+    sdk = sdk_module.AgentTokenizationSDK(
+        base_url=base_url, party=parties[0], package_id=package_id, timeout=args.timeout, pool_maxsize=args.workers
+    )
+    workload = Workload(sdk, parties, int(time.time()))
+    print(f"🚀 Load test against {base_url}")
+    print(f"   setting up {args.agents} agents x {args.tokens_per_agent} tokens across {len(parties)} parties")
+    workload.setup(args.agents, args.tokens_per_agent, min(args.workers, 16))
+
+    generator = LoadGenerator(
+        workload, operations, weights, args.workers, args.max_outstanding, args.arrival == 'poisson', args.interval
+    )
+    steps = []
+    started = time.perf_counter()
+    try:
+        for rate in rates:
+            print(f"\n📈 {rate:.1f} req/s for {args.step_duration:.0f}s ({args.arrival} arrivals)")
+            steps.append(generator.run_step(rate, args.step_duration, started))
+    except KeyboardInterrupt:
+        print("\n⏹️  Interrupted")
+    finally:
+        generator.shutdown()
+        sdk.session.close()
+
+    print(f"\n{'target/s':>9} {'done/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for step in steps:
+        print(f"{step['target_rate']:>9.1f} {step['throughput']:>9.1f} {step['p50_ms']:>9.1f} {step['p95_ms']:>9.1f} "
+              f"{step['p99_ms']:>9.1f} {step['error_rate'] * 100:>7.1f}%")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump({
+                'meta': {'timestamp': datetime.now(timezone.utc).isoformat(), 'base_url': base_url, 'config': vars(args)},
+                'steps': steps,
+                'timeline': generator.timeline
+            }, fh, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the DAML JSON API
+
+Implements enough of /v1/create, /v1/query, /v1/fetch, /v1/exercise,
+/v1/parties, /v1/packages, /readyz and /livez for the Python SDK, the
+healthcheck.py proxy and the benchmark/load scripts to run without Canton.
+/v1/stream/query is served over a WebSocket (active contract set, then
+created/archived deltas with offsets; resumable from an offset) for
+ContractReplica and UsageProjection. Contracts live in memory; latency and
+the seeded dataset size are configurable so results are reproducible.
+
+Run with: python mock-json-api.py --port 7575 --agents 1000 --tokens-per-agent 5
+"""
+
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import random
+import select
+import socket
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODULE_NAME = "AgentTokenizationV2"
+DEFAULT_PACKAGE_ID = "mock-package-id"
+DEFAULT_PARTIES = ["Alice", "Bob", "SystemOrchestrator"]
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+STREAM_BATCH_SIZE = 500
+
+# Choices that archive the contract and re-create it with updated fields
+CONSUMING_CHOICES = {
+    "RecordUsage": lambda arg, choice_arg: dict(
+        arg, currentUsage=arg.get('currentUsage', 0) + choice_arg.get('usageAmount', 0)
+    ),
+    "Activate": lambda arg, choice_arg: dict(arg, isActive=True),
+    "Deactivate": lambda arg, choice_arg: dict(arg, isActive=False),
+}
+
+
+def template_key(template_id):
+    """Normalise 'pkg:Module:Entity', 'Module:Entity' or a templateId dict to 'Module:Entity'"""
+    if isinstance(template_id, dict):
+        return f"{template_id.get('moduleName')}:{template_id.get('entityName')}"
+    parts = str(template_id).split(':')
+    return ':'.join(parts[-2:])
+
+
+class DuplicateCommand(Exception):
+    """A command with this commandId was already accepted (ledger deduplication)"""
+
+
+class MockLedger:
+    """Thread-safe in-memory active contract set with an agentId index"""
+
+    def __init__(self, package_id=DEFAULT_PACKAGE_ID):
+        self.package_id = package_id
+        self.offset = 0
+        self._ids = itertools.count(1)
+        self._contracts = {}
+        self._by_template = {}
+        self._by_agent = {}
+        self._command_ids = set()
+        # (template key, event) per offset; the event at offset n is _events[n - 1]
+        self._events = []
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def _full_template_id(self, key):
+        return f"{self.package_id}:{key}"
+
+    def _add(self, key, argument, signatories):
+        contract = {
+            'contractId': f"#{next(self._ids)}:0",
+            'templateId': self._full_template_id(key),
+            'argument': argument,
+            'payload': argument,
+            'signatories': signatories,
+            'observers': [],
+            'agreementText': ''
+        }
+        self._contracts[contract['contractId']] = (key, contract)
+        self._by_template.setdefault(key, {})[contract['contractId']] = contract
+        agent_id = argument.get('agentId') if isinstance(argument, dict) else None
+        if agent_id is not None:
+            self._by_agent.setdefault((key, agent_id), {})[contract['contractId']] = contract
+        self._record(key, {'created': contract})
+        return contract
+
+    def _archive(self, contract_id):
+        key, contract = self._contracts.pop(contract_id)
+        self._by_template[key].pop(contract_id, None)
+        agent_id = contract['argument'].get('agentId') if isinstance(contract['argument'], dict) else None
+        if agent_id is not None:
+            self._by_agent.get((key, agent_id), {}).pop(contract_id, None)
+        self._record(key, {'archived': {'contractId': contract_id, 'templateId': contract['templateId']}})
+        return key, contract
+
+    def _record(self, key, event):
+        """Append an event at the next offset and wake streams; caller holds the lock"""
+        self._events.append((key, event))
+        self.offset += 1
+        self._changed.notify_all()
+
+    def _claim_command(self, command_id):
+        """Record a ledger commandId; raise DuplicateCommand if it was already submitted"""
+        if command_id is not None:
+            if command_id in self._command_ids:
+                raise DuplicateCommand(command_id)
+            self._command_ids.add(command_id)
+
+    def create(self, template_id, argument, party, command_id=None):
+        with self._lock:
+            self._claim_command(command_id)
+            return self._add(template_key(template_id), argument, [party])
+
+    def query(self, template_ids, query=None):
+        query = query or {}
+        results = []
+        with self._lock:
+            for template_id in template_ids:
+                key = template_key(template_id)
+                if 'agentId' in query:
+                    candidates = self._by_agent.get((key, query['agentId']), {}).values()
+                else:
+                    candidates = self._by_template.get(key, {}).values()
+                results.extend(
+                    contract for contract in candidates
+                    if all(contract['argument'].get(field) == value for field, value in query.items())
+                )
+        return results
+
+    def fetch(self, contract_id):
+        with self._lock:
+            entry = self._contracts.get(contract_id)
+            return entry[1] if entry else None
+
+    def snapshot(self, matches):
+        """(created events for active contracts accepted by ``matches(key, argument)``, offset)"""
+        with self._lock:
+            events = [
+                {'created': contract} for key, contract in self._contracts.values()
+                if matches(key, contract['argument'])
+            ]
+            return events, self.offset
+
+    def events_since(self, offset, matches, timeout=0.0):
+        """
+        (events after ``offset`` accepted by ``matches``, new offset), waiting
+        up to ``timeout`` seconds for one to happen; archives match on template only
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.offset > offset, timeout)
+            events = [
+                event for key, event in self._events[offset:]
+                if matches(key, event['created']['argument'] if 'created' in event else None)
+            ]
+            return events, self.offset
+
+    def exercise(self, contract_id, choice, choice_argument, command_id=None):
+        """
+        Return (exerciseResult, events); raise DuplicateCommand for a repeated
+        commandId and KeyError for unknown contracts
+        """
+        with self._lock:
+            if command_id in self._command_ids:
+                raise DuplicateCommand(command_id)
+            if contract_id not in self._contracts:
+                raise KeyError(contract_id)
+            self._claim_command(command_id)
+            update = CONSUMING_CHOICES.get(choice)
+            if update is None:
+                # Unknown choices behave as nonconsuming no-ops
+                return None, []
+            key, archived = self._archive(contract_id)
+            created = self._add(key, update(archived['argument'], choice_argument or {}), archived['signatories'])
+            events = [
+                {'archived': {'contractId': archived['contractId'], 'templateId': archived['templateId']}},
+                {'created': created}
+            ]
+            return created['contractId'], events
+
+    def seed(self, agents, tokens_per_agent, party="Alice"):
+        """Preload ``agents`` registrations, each with ``tokens_per_agent`` usage tokens"""
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            self._add(f"{MODULE_NAME}:SystemOrchestrator", {
+                'orchestrator': 'SystemOrchestrator',
+                'totalRegistrations': agents,
+                'systemVersion': '2.0.0-mock'
+            }, ['SystemOrchestrator'])
+            for index in range(agents):
+                agent_id = f"agent-{index:06d}"
+                self._add(f"{MODULE_NAME}:AgentRegistration", {
+                    'operator': party,
+                    'agentId': agent_id,
+                    'name': f"Agent {index}",
+                    'description': 'Seeded by mock-json-api.py',
+                    'agentType': 'LLM',
+                    'capabilities': ['text_generation'],
+                    'attributes': {},
+                    'isActive': True,
+                    'createdAt': now
+                }, [party])
+                for token_index in range(tokens_per_agent):
+                    self._add(f"{MODULE_NAME}:AgentUsageToken", {
+                        'operator': party,
+                        'agentId': agent_id,
+                        'tokenId': f"{agent_id}-token-{token_index}",
+                        'usageType': ('API_CALLS', 'TOKENS', 'COMPUTE')[token_index % 3],
+                        'maxUsage': 10000,
+                        'currentUsage': (index * 7 + token_index * 13) % 10000,
+                        'metadata': {},
+                        'isActive': True,
+                        'createdAt': now
+                    }, [party])
+
+    def __len__(self):
+        with self._lock:
+            return len(self._contracts)
+
+
+class MockJSONAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _party(self):
+        authorization = self.headers.get('Authorization', '')
+        return authorization[len('Bearer '):] if authorization.startswith('Bearer ') else 'Alice'
+
+    def _delay(self):
+        latency = self.server.latency
+        if self.server.jitter:
+            latency += random.uniform(0, self.server.jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        content_length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(content_length) if content_length > 0 else b''
+        return json.loads(raw) if raw else {}
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/v1/stream/query' and self.headers.get('Upgrade', '').lower() == 'websocket':
+            self._stream_query()
+            return
+        self._delay()
+        if path in ('/readyz', '/livez'):
+            self._send_json({'status': 'ok'})
+        elif path == '/v1/parties':
+            self._send_json({'status': 200, 'result': [
+                {'identifier': party, 'displayName': party, 'isLocal': True} for party in self.server.parties
+            ]})
+        elif path == '/v1/packages':
+            self._send_json({'status': 200, 'result': [self.server.ledger.package_id]})
+        else:
+            self._send_json({'status': 404, 'errors': [f'Unknown endpoint: {path}']}, 404)
+
+    def do_POST(self):
+        try:
+            request = self._read_json()
+        except ValueError as e:
+            self._send_json({'status': 400, 'errors': [f'Invalid JSON: {e}']}, 400)
+            return
+        self._delay()
+        ledger = self.server.ledger
+        path = self.path.split('?', 1)[0]
+
+        command_id = (request.get('meta') or {}).get('commandId')
+        if path == '/v1/create':
+            try:
+                contract = ledger.create(
+                    request['templateId'], request.get('argument', request.get('payload', {})), self._party(), command_id
+                )
+            except DuplicateCommand:
+                self._send_json({'status': 409, 'errors': [f'Duplicate command: {command_id}']}, 409)
+                return
+            self._send_json({'status': 200, 'result': contract})
+        elif path == '/v1/query':
+            template_ids = request.get('templateIds', [])
+            self._send_json({'status': 200, 'result': ledger.query(template_ids, request.get('query'))})
+        elif path == '/v1/fetch':
+            self._send_json({'status': 200, 'result': ledger.fetch(request.get('contractId'))})
+        elif path == '/v1/exercise':
+            try:
+                result, events = ledger.exercise(
+                    request['contractId'], request['choice'], request.get('argument'), command_id
+                )
+            except DuplicateCommand:
+                self._send_json({'status': 409, 'errors': [f'Duplicate command: {command_id}']}, 409)
+                return
+            except KeyError:
+                self._send_json({'status': 404, 'errors': [f"Contract not found: {request.get('contractId')}"]}, 404)
+                return
+            self._send_json({'status': 200, 'result': {'exerciseResult': result, 'events': events}})
+        else:
+            self._send_json({'status': 404, 'errors': [f'Unknown endpoint: {path}']}, 404)
+
+
+    # ========== WEBSOCKET STREAMS ==========
+
+    def _ws_accept(self):
+        """Complete the WebSocket handshake; returns the party from the jwt.token.<party> subprotocol"""
+        protocols = [p.strip() for p in self.headers.get('Sec-WebSocket-Protocol', '').split(',') if p.strip()]
+        accept = base64.b64encode(
+            hashlib.sha1((self.headers.get('Sec-WebSocket-Key', '') + WEBSOCKET_GUID).encode()).digest()
+        ).decode()
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        if 'daml.ws.auth' in protocols:
+            self.send_header('Sec-WebSocket-Protocol', 'daml.ws.auth')
+        self.end_headers()
+        self.close_connection = True
+        return next((p[len('jwt.token.'):] for p in protocols if p.startswith('jwt.token.')), 'Alice')
+
+    def _ws_read(self, size):
+        # Frames are read from the socket itself so select() sees everything still unread
+        data = b''
+        while len(data) < size:
+            chunk = self.connection.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('WebSocket closed by client')
+            data += chunk
+        return data
+
+    def _ws_receive(self):
+        """Read one client frame; returns (opcode, payload)"""
+        first, second = self._ws_read(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', self._ws_read(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', self._ws_read(8))[0]
+        mask = self._ws_read(4) if second & 0x80 else b''
+        payload = self._ws_read(length)
+        if mask:
+            payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+        return first & 0x0F, payload
+
+    def _ws_send(self, payload, opcode=0x1):
+        if opcode == 0x1:
+            payload = json.dumps(payload).encode()
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        self.wfile.write(header + payload)
+
+    def _stream_request(self, payload, ledger_offset):
+        """Parse a stream request into (offset or None, matches(key, argument))"""
+        request = json.loads(payload)
+        items = request if isinstance(request, list) else [request]
+        offset = None
+        queries = []
+        for item in items:
+            if 'templateIds' in item:
+                queries.append(({template_key(t) for t in item['templateIds']}, item.get('query') or {}))
+            elif 'offset' in item:
+                offset = int(item['offset'])
+                if not 0 <= offset <= ledger_offset:
+                    raise ValueError(f"offset {item['offset']} is beyond the ledger end {ledger_offset}")
+        if not queries:
+            raise ValueError('no templateIds requested')
+
+        def matches(key, argument):
+            return any(
+                key in keys and (argument is None or all(argument.get(f) == v for f, v in query.items()))
+                for keys, query in queries
+            )
+        return offset, matches
+
+    def _stream_query(self):
+        """
+        /v1/stream/query: the active contract set (without an offset) then
+        live deltas, each message carrying the offset it brings the client to
+        """
+        self._ws_accept()
+        ledger = self.server.ledger
+        try:
+            opcode, payload = self._ws_receive()
+            if opcode != 0x1:
+                return
+            try:
+                offset, matches = self._stream_request(payload, ledger.offset)
+            except (ValueError, TypeError, AttributeError) as e:
+                self._ws_send({'status': 400, 'errors': [f'Invalid stream request: {e}']})
+                self._ws_send(struct.pack('!H', 1008), opcode=0x8)
+                return
+
+            if offset is None:
+                active, offset = ledger.snapshot(matches)
+                for start in range(0, len(active), STREAM_BATCH_SIZE):
+                    self._ws_send({'events': active[start:start + STREAM_BATCH_SIZE]})
+                events = []
+            else:
+                events, offset = ledger.events_since(offset, matches)
+            # The first offset message marks the stream as live; later empty ones are heartbeats
+            self._ws_send({'events': events, 'offset': str(offset)})
+            last_sent = time.monotonic()
+
+            while True:
+                events, new_offset = ledger.events_since(offset, matches, timeout=0.25)
+                offset = new_offset
+                if events or time.monotonic() - last_sent >= self.server.stream_heartbeat:
+                    self._ws_send({'events': events, 'offset': str(offset)})
+                    last_sent = time.monotonic()
+                while select.select([self.connection], [], [], 0)[0]:
+                    opcode, payload = self._ws_receive()
+                    if opcode == 0x8:
+                        self._ws_send(payload[:2], opcode=0x8)
+                        return
+                    if opcode == 0x9:
+                        self._ws_send(payload, opcode=0xA)
+        except (ConnectionError, OSError):
+            return
+
+
+class MockJSONAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+    def __init__(self, address, ledger, latency=0.0, jitter=0.0, parties=None, verbose=False):
+        super().__init__(address, MockJSONAPIHandler)
+        self.ledger = ledger
+        self.latency = latency
+        self.jitter = jitter
+        self.parties = parties or list(DEFAULT_PARTIES)
+        self.verbose = verbose
+        self.stream_heartbeat = 5.0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_mock_server(
+    host='127.0.0.1',
+    port=0,
+    latency=0.0,
+    jitter=0.0,
+    agents=0,
+    tokens_per_agent=0,
+    package_id=DEFAULT_PACKAGE_ID,
+    verbose=False
+):
+    """Start a seeded mock server on a daemon thread and return it (port 0 picks a free port)"""
+    ledger = MockLedger(package_id)
+    ledger.seed(agents, tokens_per_agent)
+    server = MockJSONAPIServer((host, port), ledger, latency, jitter, verbose=verbose)
+    threading.Thread(target=server.serve_forever, name='mock-json-api', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline mock of the DAML JSON API')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=7575)
+    parser.add_argument('--latency', type=float, default=0.0, help='Fixed delay per request in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra uniform random delay in seconds')
+    parser.add_argument('--agents', type=int, default=100, help='Agent registrations to seed')
+    parser.add_argument('--tokens-per-agent', type=int, default=3, help='Usage tokens to seed per agent')
+    parser.add_argument('--package-id', default=DEFAULT_PACKAGE_ID)
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    ledger = MockLedger(args.package_id)
+    ledger.seed(args.agents, args.tokens_per_agent)
+    with MockJSONAPIServer((args.host, args.port), ledger, args.latency, args.jitter, verbose=args.verbose) as server:
+        print(f"🧪 Mock DAML JSON API listening on {args.host}:{args.port}")
+        print(f"   {len(ledger)} contracts seeded, package id {args.package_id}")
+        print(f"   latency {args.latency * 1000:.1f} ms + up to {args.jitter * 1000:.1f} ms jitter")
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -8,13 +8,44 @@ Version: 1.0.0
 Author: Agent Tokenization Platform
 """
 
+import codecs
 import json
+import os
+import random
+import re
+import sqlite3
+import sys
 import time
+import asyncio
+import functools
+import itertools
+import threading
+import uuid
 import requests
-from typing import Dict, List, Optional, Any, Union
+from array import array
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, Callable, Dict, Iterator, List, NamedTuple, Optional, Any, Union
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone
 import logging
+from contextlib import contextmanager
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency: pip install agent-tokenization-sdk[async]
+    aiohttp = None
+
+try:
+    import numpy
+except ImportError:  # Optional dependency: pip install agent-tokenization-sdk[numpy]
+    numpy = None
+
+try:
+    import orjson
+except ImportError:  # Optional dependency: pip install agent-tokenization-sdk[fast]
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -72,291 +103,1407 @@ class UsageSummary:
     utilization_rate: float
 
 
-class AgentTokenizationSDK:
+@dataclass
+class BulkRegistrationReport:
+    """Outcome of a parallel bulk registration, in input order"""
+    total: int
+    results: List[Optional[Dict]]
+    errors: Dict[int, Dict[str, str]]
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    first_failure: Optional[int] = None
+    start_index: int = 0
+
+    @property
+    def resume_index(self) -> Optional[int]:
+        """
+        Index to pass as ``start_index`` to resume, or None when every agent
+        from ``start_index`` on is registered (skipped agents are not counted)
+        """
+        if self.first_failure is not None:
+            return self.first_failure
+        for index in range(self.start_index, self.total):
+            if self.results[index] is None:
+                return index
+        return None
+
+
+@dataclass
+class FleetUsageSummary:
+    """Usage across many agents: per-agent summaries plus fleet-wide totals"""
+    summaries: Dict[str, UsageSummary]
+    agent_count: int
+    total_tokens: int
+    active_tokens: int
+    total_max_usage: int
+    total_current_usage: int
+    usage_by_type: Dict[str, Dict[str, Union[int, float]]]
+    utilization_rate: float
+
+
+@dataclass
+class AgentDetails:
+    """Joined view of one agent: registration, usage tokens, attributes and recent usage events"""
+    agent_id: str
+    agent: Optional[Dict]
+    tokens: List[Dict]
+    attributes: List[Dict]
+    usage_events: List[Dict]
+    summary: UsageSummary
+
+
+class _RateLimiter:
+    """Thread-safe limiter spacing calls evenly at ``max_per_second``"""
+
+    def __init__(self, max_per_second: float):
+        self.interval = 1.0 / max_per_second
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ContractCache:
     """
-    Python SDK for the Agent Tokenization platform
+    Read-through cache for /v1/query results
     
-    Provides easy-to-use methods for managing AI agents, usage tokens,
-    and system interactions through the DAML JSON API.
+    Entries are keyed by (party, templateId, query), expire after ``ttl``
+    seconds and are evicted least-recently-used once ``max_entries`` is
+    reached. Cached contract lists are shared between callers and must be
+    treated as read-only.
     """
-    
-    def __init__(
-        self,
-        base_url: str = "http://localhost:7575",
-        party: str = "Alice", 
-        package_id: str = "your-package-id",
-        timeout: int = 30,
-        headers: Optional[Dict[str, str]] = None
-    ):
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
         """
-        Initialize the SDK
-        
         Args:
-            base_url: Base URL of the DAML JSON API
-            party: Default party for transactions
-            package_id: Package ID of deployed DAR
-            timeout: Request timeout in seconds
-            headers: Additional headers for requests
+            ttl: Seconds a cached query result stays valid
+            max_entries: Maximum number of cached query results
         """
-        self.base_url = base_url.rstrip('/')
-        self.party = party
-        self.package_id = package_id
-        self.timeout = timeout
-        self.session = requests.Session()
-        
-        default_headers = {'Content-Type': 'application/json'}
-        if headers:
-            default_headers.update(headers)
-        self.session.headers.update(default_headers)
-
-    def _make_request(
-        self, 
-        endpoint: str, 
-        method: str = "GET", 
-        data: Optional[Dict] = None,
-        party: Optional[str] = None
-    ) -> Dict:
-        """Make HTTP request to DAML JSON API"""
-        url = f"{self.base_url}{endpoint}"
-        request_party = party or self.party
-        
-        headers = {'Authorization': f'Bearer {request_party}'}
-        
-        try:
-            if method.upper() == "GET":
-                response = self.session.get(url, headers=headers, timeout=self.timeout)
-            elif method.upper() == "POST":
-                response = self.session.post(url, headers=headers, json=data, timeout=self.timeout)
-            else:
-                response = self.session.request(method, url, headers=headers, json=data, timeout=self.timeout)
-            
-            response.raise_for_status()
-            
-            # Handle different content types
-            content_type = response.headers.get('content-type', '')
-            if 'application/json' in content_type:
-                return response.json()
-            else:
-                return {'result': response.text}
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {str(e)}")
-            raise AgentTokenizationError(f"Network error: {str(e)}", "NETWORK_ERROR", {"url": url})
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON response: {str(e)}")
-            raise AgentTokenizationError(f"Invalid JSON response: {str(e)}", "JSON_ERROR")
+        if max_entries < 1:
+            raise AgentTokenizationError("max_entries must be at least 1", "VALIDATION_ERROR")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
 
-    def health_check(self) -> Dict:
-        """Check if the API is ready"""
-        return self._make_request('/readyz')
+    @staticmethod
+    def make_key(party: str, template_id: str, query: Optional[Dict]) -> tuple:
+        """Build a cache key; the query is canonicalised so key order does not matter"""
+        return (party, template_id, json.dumps(query or {}, sort_keys=True, default=str))
 
-    def get_parties(self) -> List[str]:
-        """Get list of parties in the system"""
-        result = self._make_request('/v1/parties')
-        return result.get('result', result)
+    def get(self, key: tuple) -> Optional[List[Dict]]:
+        """Return the cached result or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
 
-    # ========== AGENT MANAGEMENT ==========
+    def put(self, key: tuple, value: List[Dict]):
+        """Store a query result, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
 
-    def register_agent(self, agent: Union[Agent, Dict], party: Optional[str] = None) -> Dict:
+    def invalidate(self, template_id: Optional[str] = None, party: Optional[str] = None) -> int:
         """
-        Register a new AI agent
+        Drop cached results matching a template and/or party
         
-        Args:
-            agent: Agent object or dictionary with agent data
-            party: Party to create agent for (optional)
-            
-        Returns:
-            Created agent contract
+        With no arguments the whole cache is cleared. Returns the number of
+        entries removed.
         """
-        if isinstance(agent, Agent):
-            agent_data = asdict(agent)
-        else:
-            agent_data = agent
-            
-        # Ensure required fields
-        required_fields = ['agent_id', 'name', 'agent_type']
-        for field in required_fields:
-            if field not in agent_data:
-                raise AgentTokenizationError(f"Missing required field: {field}", "VALIDATION_ERROR")
-        
-        # Set defaults
-        agent_data.setdefault('description', '')
-        agent_data.setdefault('capabilities', [])
-        agent_data.setdefault('attributes', {})
-        agent_data.setdefault('is_active', True)
-        agent_data.setdefault('created_at', datetime.now(timezone.utc).isoformat())
-        
-        payload = {
-            "templateId": {
-                "packageId": self.package_id,
-                "moduleName": "AgentTokenizationV2",
-                "entityName": "AgentRegistration"
-            },
-            "argument": {
-                "operator": party or self.party,
-                "agentId": agent_data['agent_id'],
-                "name": agent_data['name'],
-                "description": agent_data['description'],
-                "agentType": agent_data['agent_type'],
-                "capabilities": agent_data['capabilities'],
-                "attributes": agent_data['attributes'],
-                "isActive": agent_data['is_active'],
-                "createdAt": agent_data['created_at']
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if (template_id is None or key[1] == template_id)
+                and (party is None or key[0] == party)
+            ]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        """Remove every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0
             }
-        }
-        
-        return self._make_request('/v1/create', 'POST', payload, party)
 
-    def query_agents(self, filter_criteria: Optional[Dict] = None, party: Optional[str] = None) -> List[Dict]:
+
+@dataclass
+class RetryPolicy:
+    """
+    When and how the SDK transport retries a failed request
+    
+    Only transient failures are retried: connection errors, timeouts and the
+    HTTP statuses in ``retry_statuses``. Queries and fetches are always safe
+    to repeat; creates and exercises are retried only when they carry a ledger
+    command ID (which the ledger deduplicates) or ``retry_non_idempotent`` is
+    set. Delays grow exponentially with full jitter so clients recovering from
+    the same outage do not retry in lockstep. ``deadline`` bounds the total
+    time of one SDK request including retries.
+    """
+    max_attempts: int = 3
+    backoff: float = 0.1
+    max_backoff: float = 5.0
+    deadline: Optional[float] = None
+    retry_statuses: tuple = (429, 502, 503, 504)
+    retry_non_idempotent: bool = False
+
+    def is_retryable(self, error: 'AgentTokenizationError') -> bool:
+        if error.code != "NETWORK_ERROR":
+            return False
+        status = (error.details or {}).get('status')
+        return status is None or status in self.retry_statuses
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before attempt ``attempt + 1`` (full jitter)"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker for the SDK transport
+    
+    After ``failure_threshold`` consecutive transient failures (connection
+    errors, timeouts, 429 and 5xx) an endpoint's circuit opens and requests
+    to it fail fast with ``CIRCUIT_OPEN`` instead of queueing behind a
+    struggling JSON API. After ``reset_timeout`` seconds up to
+    ``half_open_max_calls`` probe requests are let through; a successful probe
+    closes the circuit, a failed one re-opens it; a probe that ends without
+    an outcome (cancelled, or a local error) is handed back with ``release``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, key: str) -> Dict:
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = {
+                'state': self.CLOSED, 'failures': 0, 'opened_at': 0.0, 'probes': 0, 'opens': 0, 'rejected': 0
+            }
+        return circuit
+
+    def allow(self, key: str) -> Optional[float]:
+        """None if a request to ``key`` may proceed, else seconds until the next probe"""
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit['state'] == self.OPEN:
+                remaining = circuit['opened_at'] + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    circuit['rejected'] += 1
+                    return remaining
+                circuit['state'] = self.HALF_OPEN
+                circuit['probes'] = 0
+            if circuit['state'] == self.HALF_OPEN:
+                if circuit['probes'] >= self.half_open_max_calls:
+                    circuit['rejected'] += 1
+                    return self.reset_timeout
+                circuit['probes'] += 1
+            return None
+
+    def release(self, key: str):
+        """Give back an allowed request's probe slot when it ended without an outcome (e.g. cancelled)"""
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit['state'] == self.HALF_OPEN and circuit['probes'] > 0:
+                circuit['probes'] -= 1
+
+    def record(self, key: str, success: bool):
+        """Report the outcome of an allowed request"""
+        with self._lock:
+            circuit = self._circuit(key)
+            if success:
+                circuit['state'] = self.CLOSED
+                circuit['failures'] = 0
+                return
+            circuit['failures'] += 1
+            if circuit['state'] == self.HALF_OPEN or circuit['failures'] >= self.failure_threshold:
+                if circuit['state'] != self.OPEN:
+                    circuit['opens'] += 1
+                circuit['state'] = self.OPEN
+                circuit['opened_at'] = time.monotonic()
+
+    @staticmethod
+    def is_failure(error: 'AgentTokenizationError') -> bool:
+        """Whether an error indicates an unhealthy upstream (client errors do not)"""
+        if error.code != "NETWORK_ERROR":
+            return False
+        status = (error.details or {}).get('status')
+        return status is None or status == 429 or status >= 500
+
+    def state(self, key: str) -> str:
+        with self._lock:
+            return self._circuit(key)['state']
+
+    def stats(self) -> Dict[str, Dict]:
+        """State, consecutive failures, open count and rejections per endpoint"""
+        with self._lock:
+            return {
+                key: {k: v for k, v in circuit.items() if k not in ('opened_at', 'probes')}
+                for key, circuit in self._circuits.items()
+            }
+
+
+@dataclass
+class RequestSpan:
+    """Timing breakdown of one JSON API call made by the SDK"""
+    operation: str
+    endpoint: str
+    template: Optional[str]
+    choice: Optional[str]
+    serialize_seconds: float = 0.0
+    network_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    total_seconds: float = 0.0
+    attempts: int = 1
+    status: Optional[int] = None
+    error: Optional[str] = None
+
+
+class Instrumentation:
+    """
+    Hook surface for SDK timing
+    
+    Subclass and override ``on_span`` (one call per HTTP request) and/or
+    ``on_operation`` (one call per public SDK method, covering all of its
+    requests). ``sample_rate`` is applied per operation, so either every
+    span of an operation is reported or none is.
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        self.sample_rate = sample_rate
+
+    def should_sample(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def on_span(self, span: RequestSpan):
+        """Called after every sampled HTTP request"""
+
+    def on_operation(self, operation: str, seconds: float, error: Optional[str]):
+        """Called after every sampled public SDK method"""
+
+
+class LatencyAggregator(Instrumentation):
+    """
+    Built-in Instrumentation keeping recent samples per SDK method and per
+    (endpoint, template, choice), reported as p50/p95/p99
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_samples: int = 10000):
         """
-        Query agents by criteria
-        
         Args:
-            filter_criteria: Dictionary of filter conditions
-            party: Party to query for (optional)
-            
-        Returns:
-            List of matching agent contracts
+            sample_rate: Fraction of operations to record (0.0 - 1.0)
+            max_samples: Samples kept per key; older samples are discarded
         """
-        payload = {
-            "templateIds": [f"{self.package_id}:AgentTokenizationV2:AgentRegistration"],
-            "query": filter_criteria or {}
-        }
-        
-        result = self._make_request('/v1/query', 'POST', payload, party)
-        return result.get('result', result)
+        super().__init__(sample_rate)
+        self.max_samples = max_samples
+        self._operations = {}
+        self._spans = {}
+        self._errors = Counter()
+        self._lock = threading.Lock()
 
-    def get_agent(self, contract_id: str, party: Optional[str] = None) -> Optional[Dict]:
-        """Get a specific agent by contract ID"""
-        agents = self.query_agents(party=party)
-        for agent in agents:
-            if agent.get('contractId') == contract_id:
-                return agent
-        return None
+    def on_span(self, span: RequestSpan):
+        key = (span.endpoint, span.template, span.choice)
+        with self._lock:
+            samples = self._spans.get(key)
+            if samples is None:
+                samples = self._spans[key] = deque(maxlen=self.max_samples)
+            samples.append((span.total_seconds, span.serialize_seconds, span.network_seconds, span.decode_seconds))
 
-    def get_agent_by_id(self, agent_id: str, party: Optional[str] = None) -> Optional[Dict]:
-        """Get a specific agent by agent ID"""
-        agents = self.query_agents({'agentId': agent_id}, party)
-        return agents[0] if agents else None
+    def on_operation(self, operation: str, seconds: float, error: Optional[str]):
+        with self._lock:
+            samples = self._operations.get(operation)
+            if samples is None:
+                samples = self._operations[operation] = deque(maxlen=self.max_samples)
+            samples.append(seconds)
+            if error:
+                self._errors[operation] += 1
 
-    def update_agent_status(self, contract_id: str, is_active: bool, party: Optional[str] = None) -> Dict:
-        """Update agent status (activate/deactivate)"""
-        payload = {
-            "templateId": {
-                "packageId": self.package_id,
-                "moduleName": "AgentTokenizationV2",
-                "entityName": "AgentRegistration"
-            },
-            "contractId": contract_id,
-            "choice": "Activate" if is_active else "Deactivate",
-            "argument": {}
+    @staticmethod
+    def _percentiles(values: List[float]) -> Dict[str, float]:
+        ordered = sorted(values)
+        last = len(ordered) - 1
+        return {
+            'count': len(ordered),
+            'mean': sum(ordered) / len(ordered),
+            'p50': ordered[int(last * 0.50)],
+            'p95': ordered[int(last * 0.95)],
+            'p99': ordered[int(last * 0.99)],
+            'max': ordered[last]
         }
-        
-        return self._make_request('/v1/exercise', 'POST', payload, party)
-
-    # ========== USAGE TOKEN MANAGEMENT ==========
 
-    def create_usage_token(self, token: Union[UsageToken, Dict], party: Optional[str] = None) -> Dict:
+    def report(self) -> Dict[str, Dict]:
         """
-        Create a usage token for an agent
+        Latency summary in seconds
         
-        Args:
-            token: UsageToken object or dictionary with token data
-            party: Party to create token for (optional)
-            
         Returns:
-            Created usage token contract
+            ``{'operations': {method: stats}, 'requests': {"endpoint template choice": stats}}``
+            where request stats also carry mean serialize/network/decode times
         """
-        if isinstance(token, UsageToken):
-            token_data = asdict(token)
-        else:
-            token_data = token
-            
-        # Ensure required fields
-        required_fields = ['agent_id', 'usage_type', 'max_usage']
-        for field in required_fields:
-            if field not in token_data:
-                raise AgentTokenizationError(f"Missing required field: {field}", "VALIDATION_ERROR")
-        
-        # Set defaults
-        token_data.setdefault('token_id', f"token-{int(time.time())}-{hash(str(token_data)) % 10000}")
-        token_data.setdefault('current_usage', 0)
-        token_data.setdefault('metadata', {})
-        token_data.setdefault('is_active', True)
-        token_data.setdefault('created_at', datetime.now(timezone.utc).isoformat())
-        
-        payload = {
-            "templateId": {
-                "packageId": self.package_id,
-                "moduleName": "AgentTokenizationV2", 
-                "entityName": "AgentUsageToken"
-            },
-            "argument": {
-                "operator": party or self.party,
-                "agentId": token_data['agent_id'],
-                "tokenId": token_data['token_id'],
-                "usageType": token_data['usage_type'],
-                "maxUsage": token_data['max_usage'],
-                "currentUsage": token_data['current_usage'],
-                "metadata": token_data['metadata'],
-                "isActive": token_data['is_active'],
-                "createdAt": token_data['created_at']
-            }
-        }
+        with self._lock:
+            operations = {name: list(samples) for name, samples in self._operations.items()}
+            spans = {key: list(samples) for key, samples in self._spans.items()}
+            errors = dict(self._errors)
         
-        return self._make_request('/v1/create', 'POST', payload, party)
+        report = {'operations': {}, 'requests': {}}
+        for name, samples in operations.items():
+            stats = self._percentiles(samples)
+            stats['errors'] = errors.get(name, 0)
+            report['operations'][name] = stats
+        for (endpoint, template, choice), samples in spans.items():
+            label = ' '.join(part for part in (endpoint, template, choice) if part)
+            stats = self._percentiles([sample[0] for sample in samples])
+            stats['serialize_mean'] = sum(sample[1] for sample in samples) / len(samples)
+            stats['network_mean'] = sum(sample[2] for sample in samples) / len(samples)
+            stats['decode_mean'] = sum(sample[3] for sample in samples) / len(samples)
+            report['requests'][label] = stats
+        return report
 
-    def query_usage_tokens(self, filter_criteria: Optional[Dict] = None, party: Optional[str] = None) -> List[Dict]:
-        """Query usage tokens by criteria"""
-        payload = {
-            "templateIds": [f"{self.package_id}:AgentTokenizationV2:AgentUsageToken"],
-            "query": filter_criteria or {}
-        }
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+            self._spans.clear()
+            self._errors.clear()
+
+
+def _instrumented(method):
+    """Attribute the wrapped SDK method's requests to it and time it when instrumentation is on"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        instrumentation = self.instrumentation
+        if instrumentation is None or getattr(self._local, 'operation', None) is not None:
+            return method(self, *args, **kwargs)
         
-        result = self._make_request('/v1/query', 'POST', payload, party)
-        return result.get('result', result)
+        # Outermost SDK call on this thread: decide sampling once for all its requests
+        sampled = instrumentation.should_sample()
+        self._local.operation = method.__name__ if sampled else ''
+        started = time.perf_counter()
+        error = None
+        try:
+            return method(self, *args, **kwargs)
+        except Exception as e:
+            error = getattr(e, 'code', None) or type(e).__name__
+            raise
+        finally:
+            self._local.operation = None
+            if sampled:
+                instrumentation.on_operation(method.__name__, time.perf_counter() - started, error)
+    return wrapper
 
-    def record_usage(self, contract_id: str, usage_amount: int, party: Optional[str] = None) -> Dict:
-        """Record usage against a token"""
-        payload = {
-            "templateId": {
-                "packageId": self.package_id,
-                "moduleName": "AgentTokenizationV2",
-                "entityName": "AgentUsageToken"
-            },
-            "contractId": contract_id,
-            "choice": "RecordUsage",
-            "argument": {
-                "usageAmount": usage_amount,
-                "timestamp": datetime.now(timezone.utc).isoformat()
+
+def _intern(value):
+    """Intern repeated identifier strings so every record shares one copy"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class AgentRecord(NamedTuple):
+    """Immutable, slotted AgentRegistration contract decoded from JSON API results"""
+    contract_id: str
+    template_id: str
+    agent_id: str
+    name: str
+    description: str
+    agent_type: str
+    operator: str
+    capabilities: tuple
+    attributes: tuple
+    is_active: bool
+    created_at: Optional[str]
+
+    @classmethod
+    def from_contract(cls, contract: Dict) -> 'AgentRecord':
+        arg = contract['argument']
+        return cls(
+            contract['contractId'],
+            _intern(contract.get('templateId')),
+            _intern(arg.get('agentId')),
+            arg.get('name', ''),
+            arg.get('description', ''),
+            _intern(arg.get('agentType', '')),
+            _intern(arg.get('operator', '')),
+            tuple(_intern(capability) for capability in arg.get('capabilities') or ()),
+            tuple((arg.get('attributes') or {}).items()),
+            bool(arg.get('isActive', True)),
+            arg.get('createdAt')
+        )
+
+    def to_contract(self) -> Dict:
+        """JSON API contract dict equivalent to this record"""
+        return {
+            'contractId': self.contract_id,
+            'templateId': self.template_id,
+            'argument': {
+                'operator': self.operator,
+                'agentId': self.agent_id,
+                'name': self.name,
+                'description': self.description,
+                'agentType': self.agent_type,
+                'capabilities': list(self.capabilities),
+                'attributes': dict(self.attributes),
+                'isActive': self.is_active,
+                'createdAt': self.created_at
             }
         }
-        
-        return self._make_request('/v1/exercise', 'POST', payload, party)
 
-    # ========== SYSTEM QUERIES ==========
 
-    def get_system_stats(self, party: Optional[str] = None) -> Optional[Dict]:
-        """Get system statistics and metrics"""
-        payload = {
-            "templateIds": [f"{self.package_id}:AgentTokenizationV2:SystemOrchestrator"]
+class UsageTokenRecord(NamedTuple):
+    """Immutable, slotted AgentUsageToken contract decoded from JSON API results"""
+    contract_id: str
+    template_id: str
+    token_id: str
+    agent_id: str
+    usage_type: str
+    operator: str
+    max_usage: int
+    current_usage: int
+    is_active: bool
+    created_at: Optional[str]
+    metadata: tuple
+
+    @classmethod
+    def from_contract(cls, contract: Dict) -> 'UsageTokenRecord':
+        arg = contract['argument']
+        return cls(
+            contract['contractId'],
+            _intern(contract.get('templateId')),
+            arg.get('tokenId'),
+            _intern(arg.get('agentId')),
+            _intern(arg.get('usageType', 'unknown')),
+            _intern(arg.get('operator', '')),
+            int(arg.get('maxUsage', 0)),
+            int(arg.get('currentUsage', 0)),
+            bool(arg.get('isActive', True)),
+            arg.get('createdAt'),
+            tuple((arg.get('metadata') or {}).items())
+        )
+
+    def to_contract(self) -> Dict:
+        """JSON API contract dict equivalent to this record"""
+        return {
+            'contractId': self.contract_id,
+            'templateId': self.template_id,
+            'argument': {
+                'operator': self.operator,
+                'agentId': self.agent_id,
+                'tokenId': self.token_id,
+                'usageType': self.usage_type,
+                'maxUsage': self.max_usage,
+                'currentUsage': self.current_usage,
+                'metadata': dict(self.metadata),
+                'isActive': self.is_active,
+                'createdAt': self.created_at
+            }
         }
-        
-        result = self._make_request('/v1/query', 'POST', payload, party)
-        contracts = result.get('result', result)
-        return contracts[0]['argument'] if contracts else None
 
-    # ========== CONVENIENCE METHODS ==========
 
-    def get_agent_data(self, agent_id: str, party: Optional[str] = None) -> Optional[Dict]:
-        """Get all data for an agent (agent + tokens + usage)"""
-        agents = self.query_agents({'agentId': agent_id}, party)
-        if not agents:
+class UsageTokenColumns:
+    """
+    Struct-of-arrays container for AgentUsageToken contracts
+    
+    Counters live in int64/int8 arrays and agentId, usageType and operator
+    party are interned, so a row costs a few list slots and array cells
+    instead of two dicts. Only the fields needed for usage accounting are
+    kept (no createdAt or metadata). Build from any iterable of contract
+    dicts, e.g. ``UsageTokenColumns(sdk.iter_usage_tokens())``.
+    """
+
+    def __init__(self, contracts=None):
+        self.template_id = None
+        self.contract_ids = []
+        self.token_ids = []
+        self.agent_ids = []
+        self.usage_types = []
+        self.operators = []
+        self.max_usage = array('q')
+        self.current_usage = array('q')
+        self.is_active = array('b')
+        if contracts is not None:
+            self.extend(contracts)
+
+    def append(self, contract: Dict):
+        arg = contract['argument']
+        if self.template_id is None:
+            self.template_id = _intern(contract.get('templateId'))
+        self.contract_ids.append(contract['contractId'])
+        self.token_ids.append(arg.get('tokenId'))
+        self.agent_ids.append(_intern(arg.get('agentId')))
+        self.usage_types.append(_intern(arg.get('usageType', 'unknown')))
+        self.operators.append(_intern(arg.get('operator', '')))
+        self.max_usage.append(int(arg.get('maxUsage', 0)))
+        self.current_usage.append(int(arg.get('currentUsage', 0)))
+        self.is_active.append(1 if arg.get('isActive', True) else 0)
+
+    def extend(self, contracts):
+        for contract in contracts:
+            self.append(contract)
+
+    def __len__(self) -> int:
+        return len(self.contract_ids)
+
+    def __getitem__(self, index: int) -> UsageTokenRecord:
+        return UsageTokenRecord(
+            self.contract_ids[index], self.template_id, self.token_ids[index], self.agent_ids[index],
+            self.usage_types[index], self.operators[index], self.max_usage[index], self.current_usage[index],
+            bool(self.is_active[index]), None, ()
+        )
+
+    def __iter__(self) -> Iterator[UsageTokenRecord]:
+        return (self[index] for index in range(len(self)))
+
+    def summarize(self, agent_ids: Optional[List[str]] = None, use_numpy: Optional[bool] = None) -> FleetUsageSummary:
+        """Per-agent summaries and totals, as AgentTokenizationSDK.get_fleet_usage"""
+        columns = _UsageColumns()
+        for row in zip(self.agent_ids, self.usage_types, self.max_usage, self.current_usage, self.is_active):
+            columns.add(*row)
+        return _AgentTokenizationCommands._build_fleet_summary(columns, agent_ids, use_numpy)
+
+
+class _UsageColumns:
+    """
+    Usage tokens as int64 array columns keyed by interned (agentId, usageType)
+    group codes, aggregated in one vectorized pass with NumPy when available
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.codes = array('q')
+        self.max_usage = array('q')
+        self.current_usage = array('q')
+        self.active = array('q')
+
+    def append(self, token: Dict):
+        arg = token['argument']
+        self.add(
+            arg.get('agentId'),
+            arg.get('usageType', 'unknown'),
+            int(arg.get('maxUsage', 0)),
+            int(arg.get('currentUsage', 0)),
+            1 if arg.get('isActive', True) else 0
+        )
+
+    def add(self, agent_id: str, usage_type: str, max_usage: int, current_usage: int, active: int):
+        key = (agent_id, usage_type)
+        code = self.groups.get(key)
+        if code is None:
+            code = self.groups[key] = len(self.groups)
+        self.codes.append(code)
+        self.max_usage.append(max_usage)
+        self.current_usage.append(current_usage)
+        self.active.append(active)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def totals(self, use_numpy: Optional[bool] = None) -> List[tuple]:
+        """(tokenCount, activeTokens, maxUsage, currentUsage) per group code"""
+        groups = len(self.groups)
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        if use_numpy and numpy is None:
+            raise AgentTokenizationError(
+                "numpy is required for use_numpy=True (pip install agent-tokenization-sdk[numpy])", "DEPENDENCY_ERROR"
+            )
+        if not groups:
+            return []
+        
+        if use_numpy:
+            codes = numpy.frombuffer(self.codes, dtype=numpy.int64)
+            counts = numpy.bincount(codes, minlength=groups)
+            # Sort once and reduce each group's run with exact int64 sums
+            order = numpy.argsort(codes, kind='stable')
+            sorted_codes = codes[order]
+            starts = numpy.flatnonzero(numpy.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+            present = sorted_codes[starts]
+            columns = []
+            for column in (self.active, self.max_usage, self.current_usage):
+                sums = numpy.zeros(groups, dtype=numpy.int64)
+                sums[present] = numpy.add.reduceat(numpy.frombuffer(column, dtype=numpy.int64)[order], starts)
+                columns.append(sums.tolist())
+            return list(zip(counts.tolist(), *columns))
+        
+        totals = [[0, 0, 0, 0] for _ in range(groups)]
+        for code, active, max_usage, current_usage in zip(self.codes, self.active, self.max_usage, self.current_usage):
+            group = totals[code]
+            group[0] += 1
+            group[1] += active
+            group[2] += max_usage
+            group[3] += current_usage
+        return [tuple(group) for group in totals]
+
+
+def _json_object_pattern(depth: int) -> bytes:
+    """Regex matching one JSON object with containers nested at most ``depth`` levels"""
+    string = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+    plain = rb'[^"{}\[\]]*'
+    container = rb'(?!)'
+    for _ in range(depth - 1):
+        container = rb'[{\[]' + plain + rb'(?:(?:' + string + rb'|' + container + rb')' + plain + rb')*[}\]]'
+    return rb'\{' + plain + rb'(?:(?:' + string + rb'|' + container + rb')' + plain + rb')*\}'
+
+
+class LazyContract(dict):
+    """
+    Contract dict whose ``argument``/``payload`` are decoded on first access
+    
+    The envelope (contractId, templateId, signatories, ...) is decoded
+    eagerly; deferred members are held as raw JSON bytes until read by
+    key, and iterating or copying the contract decodes them all. Encode it
+    with the SDK codec or the ``json`` module; orjson called directly
+    without OPT_PASSTHROUGH_SUBCLASS only sees the envelope.
+    """
+    __slots__ = ('_pending', '_codec')
+
+    def __init__(self, members: Dict, pending: Dict[str, bytes], codec: 'JSONCodec'):
+        dict.__init__(self, members)
+        self._pending = pending
+        self._codec = codec
+
+    def _load_key(self, key):
+        raw = self._pending.get(key) if isinstance(key, str) else None
+        if raw is not None:
+            dict.__setitem__(self, key, self._codec.loads(raw))
+            self._pending.pop(key, None)
+
+    def _load(self) -> 'LazyContract':
+        for key in list(self._pending):
+            self._load_key(key)
+        return self
+
+    def __getitem__(self, key):
+        self._load_key(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        self._load_key(key)
+        return dict.get(self, key, default)
+
+    def __contains__(self, key) -> bool:
+        return key in self._pending or dict.__contains__(self, key)
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + len(self._pending)
+
+    def __repr__(self) -> str:
+        return dict.__repr__(self._load())
+
+    def __reduce__(self):
+        return dict, (dict(self._load()),)
+
+
+def _materializing(name: str):
+    method = getattr(dict, name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return method(self._load(), *args, **kwargs)
+    return wrapper
+
+
+for _name in (
+    '__setitem__', '__delitem__', '__iter__', '__eq__', '__ne__',
+    'keys', 'values', 'items', 'copy', 'pop', 'popitem', 'setdefault', 'update', 'clear'
+):
+    setattr(LazyContract, _name, _materializing(_name))
+
+
+class JSONCodec:
+    """
+    Standard library JSON codec used by the SDK transport
+    
+    Subclass and override ``loads``/``dumps`` to plug in another library;
+    ``loads`` must accept bytes or str and raise json.JSONDecodeError on
+    malformed input, ``dumps`` must return UTF-8 bytes.
+    """
+    name = "json"
+
+    _LAZY_MEMBER = re.compile(rb'([{,]\s*"(?:argument|payload)"\s*:\s*)(' + _json_object_pattern(16) + rb')')
+    _PLACEHOLDER = '\x00lazy:'
+    _ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._ENCODER.encode(obj).encode('utf-8')
+
+    def loads_lazy(self, data: bytes) -> Any:
+        """
+        Decode a /v1/query or /v1/fetch response, deferring contract payloads
+        
+        ``argument``/``payload`` objects are cut out of the body in one
+        regex pass and the remaining envelope is decoded; contracts under
+        ``result`` come back as LazyContract dicts holding those members
+        as raw bytes until first accessed. Responses whose deferred
+        members cannot all be put back are decoded eagerly.
+        """
+        raws = []
+
+        def defer(match):
+            raws.append(match.group(2))
+            return match.group(1) + b'"\\u0000lazy:%d"' % (len(raws) - 1)
+
+        response = self.loads(self._LAZY_MEMBER.sub(defer, data))
+        if not raws:
+            return response
+        
+        result = response.get('result') if isinstance(response, dict) else None
+        contracts = result if isinstance(result, list) else [result]
+        restored = 0
+        try:
+            for index, contract in enumerate(contracts):
+                if not isinstance(contract, dict):
+                    continue
+                pending = {}
+                for key in ('argument', 'payload'):
+                    value = contract.get(key)
+                    if isinstance(value, str) and value.startswith(self._PLACEHOLDER):
+                        pending[key] = raws[int(value[len(self._PLACEHOLDER):])]
+                        del contract[key]
+                if pending:
+                    contracts[index] = LazyContract(contract, pending, self)
+                    restored += len(pending)
+        except (ValueError, IndexError):
+            restored = -1
+        if restored != len(raws):
+            return self.loads(data)
+        if not isinstance(result, list):
+            response['result'] = contracts[0]
+        return response
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    orjson-backed codec: decodes straight from response bytes in C
+    
+    Integers beyond 64 bits decode as floats and unsupported types fall
+    back to the standard library encoder.
+    """
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise AgentTokenizationError(
+                "orjson is required for OrjsonCodec (pip install agent-tokenization-sdk[fast])",
+                "DEPENDENCY_ERROR"
+            )
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=_materialize, option=orjson.OPT_PASSTHROUGH_SUBCLASS)
+        except TypeError:
+            return super().dumps(obj)
+
+
+def _materialize(obj):
+    if isinstance(obj, LazyContract):
+        return dict(obj._load())
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def default_json_codec() -> JSONCodec:
+    """Fastest installed codec: OrjsonCodec when orjson is available, else JSONCodec"""
+    return OrjsonCodec() if orjson is not None else JSONCodec()
+
+
+# Generated token IDs: a random per-process salt (renewed in forked children)
+# keeps processes that start their counters together from colliding
+_TOKEN_SEQUENCE = itertools.count()
+_TOKEN_SALT = uuid.uuid4().hex[:8]
+
+
+def _renew_token_salt():
+    global _TOKEN_SALT
+    _TOKEN_SALT = uuid.uuid4().hex[:8]
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_renew_token_salt)
+
+_timestamp_prefix = (None, '')
+
+
+def _utc_timestamp() -> str:
+    """Same string as datetime.now(timezone.utc).isoformat(), formatting the date part once per second"""
+    global _timestamp_prefix
+    seconds, micros = divmod(round(time.time() * 1000000), 1000000)
+    cached_seconds, prefix = _timestamp_prefix
+    if cached_seconds != seconds:
+        prefix = datetime.fromtimestamp(seconds, timezone.utc).isoformat()[:19]
+        _timestamp_prefix = (seconds, prefix)
+    return f"{prefix}.{micros:06d}+00:00" if micros else f"{prefix}+00:00"
+
+
+def _encode_value(value: Any, codec: JSONCodec) -> bytes:
+    """JSON-encode one identifier, skipping the codec for plain printable ASCII strings"""
+    if type(value) is str and value.isascii() and value.isprintable() and '"' not in value and '\\' not in value:
+        return b'"' + value.encode('ascii') + b'"'
+    return codec.dumps(value)
+
+
+class EncodedCommand(dict):
+    """
+    Command payload dict that carries its pre-encoded JSON body
+    
+    The transport sends ``body`` as-is instead of re-serializing the dict.
+    Top-level mutation drops the body so the payload is encoded normally.
+    """
+    body = None
+
+
+def _invalidating(name: str):
+    method = getattr(dict, name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.body = None
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+for _name in ('__setitem__', '__delitem__', 'pop', 'popitem', 'setdefault', 'update', 'clear'):
+    setattr(EncodedCommand, _name, _invalidating(_name))
+
+
+class _CommandTemplate:
+    """Pre-encoded JSON skeleton of one create or exercise command"""
+    __slots__ = ('template_id', 'choice', '_head')
+
+    def __init__(self, template_id: Dict[str, str], choice: Optional[str] = None):
+        self.template_id = template_id
+        self.choice = choice
+        head = b'{"templateId":' + json.dumps(template_id, separators=(',', ':')).encode('utf-8')
+        if choice is not None:
+            head += b',"choice":' + json.dumps(choice).encode('utf-8') + b',"contractId":'
+        self._head = head
+
+    def render(
+        self,
+        codec: JSONCodec,
+        argument: Dict,
+        contract_id: Optional[str] = None,
+        command_id: Optional[str] = None
+    ) -> EncodedCommand:
+        """Splice the variable fields into the skeleton"""
+        payload = {"templateId": self.template_id}
+        if self.choice is None:
+            body = self._head + b',"argument":' + codec.dumps(argument)
+        else:
+            payload["contractId"] = contract_id
+            payload["choice"] = self.choice
+            body = self._head + _encode_value(contract_id, codec) + b',"argument":' + codec.dumps(argument)
+        payload["argument"] = argument
+        if command_id is not None:
+            payload["meta"] = {"commandId": command_id}
+            body += b',"meta":{"commandId":' + _encode_value(command_id, codec) + b'}'
+        command = EncodedCommand(payload)
+        command.body = body + b'}'
+        return command
+
+
+class _ResultStreamParser:
+    """
+    Incremental parser for JSON API responses of the form
+    ``{"result": [item, ...], ...}``
+    
+    ``feed()`` takes decoded text as it arrives and returns the ``result``
+    items completed so far; only the unparsed tail is buffered, so memory is
+    bounded by the largest single item rather than the whole response. Other
+    top-level keys (``status``, ``warnings``, ...) are kept in ``extras``.
+    """
+
+    _WHITESPACE = ' \t\n\r'
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._state = 'start'
+        self._key = None
+        self.extras = {}
+
+    def _skip_whitespace(self):
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in self._WHITESPACE:
+            self._pos += 1
+
+    def _decode_value(self, final: bool):
+        """Decode one complete value at the cursor, or return (False, None) if more input is needed"""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return False, None
+        if end == len(self._buffer) and not final and isinstance(value, (int, float)):
+            # A number at the end of the buffer may continue in the next chunk
+            return False, None
+        self._pos = end
+        return True, value
+
+    def feed(self, text: str, final: bool = False) -> List[Any]:
+        """Consume ``text``; returns completed result items. ``final`` marks end of input"""
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        items = []
+        while True:
+            self._skip_whitespace()
+            if self._pos >= len(self._buffer):
+                break
+            char = self._buffer[self._pos]
+            state = self._state
+            if state == 'start':
+                if char != '{':
+                    raise json.JSONDecodeError("Expected response object", self._buffer, self._pos)
+                self._pos += 1
+                self._state = 'key'
+            elif state == 'key':
+                if char == '}':
+                    self._pos += 1
+                    self._state = 'done'
+                    continue
+                complete, self._key = self._decode_value(final)
+                if not complete:
+                    break
+                self._state = 'colon'
+            elif state == 'colon':
+                if char != ':':
+                    raise json.JSONDecodeError("Expected ':'", self._buffer, self._pos)
+                self._pos += 1
+                self._state = 'items_start' if self._key == 'result' else 'value'
+            elif state == 'value':
+                complete, value = self._decode_value(final)
+                if not complete:
+                    break
+                self.extras[self._key] = value
+                self._state = 'after_value'
+            elif state == 'items_start':
+                if char != '[':
+                    # Non-list result (e.g. a single fetched contract)
+                    complete, value = self._decode_value(final)
+                    if not complete:
+                        break
+                    if value is not None:
+                        items.append(value)
+                    self._state = 'after_value'
+                    continue
+                self._pos += 1
+                self._state = 'item'
+            elif state == 'item':
+                if char == ']':
+                    self._pos += 1
+                    self._state = 'after_value'
+                    continue
+                complete, value = self._decode_value(final)
+                if not complete:
+                    break
+                items.append(value)
+                self._state = 'after_item'
+            elif state == 'after_item':
+                self._pos += 1
+                if char == ']':
+                    self._state = 'after_value'
+                elif char == ',':
+                    self._state = 'item'
+                else:
+                    raise json.JSONDecodeError("Expected ',' or ']'", self._buffer, self._pos - 1)
+            elif state == 'after_value':
+                self._pos += 1
+                if char == '}':
+                    self._state = 'done'
+                elif char == ',':
+                    self._state = 'key'
+                else:
+                    raise json.JSONDecodeError("Expected ',' or '}'", self._buffer, self._pos - 1)
+            else:
+                raise json.JSONDecodeError("Unexpected data after response", self._buffer, self._pos)
+        if final and self._state != 'done':
+            raise json.JSONDecodeError("Truncated response", self._buffer, self._pos)
+        return items
+
+
+class _AgentTokenizationCommands:
+    """
+    Command builders and result shaping shared by the sync and async SDKs
+
+    Subclasses provide ``package_id``, ``party`` and ``summary_source``
+    attributes; everything here is pure and never touches the network.
+    """
+
+    MODULE_NAME = "AgentTokenizationV2"
+    summary_source = None
+    retry_policy = None
+    circuit_breaker = None
+    json_codec = JSONCodec()
+    lazy_payloads = False
+    _command_templates = {}
+
+    # ========== TRANSPORT POLICY ==========
+
+    def _encode_body(self, data: Dict) -> bytes:
+        """Request body: the pre-encoded one for EncodedCommand payloads, else the codec's"""
+        body = data.body if type(data) is EncodedCommand else None
+        return body if body is not None else self.json_codec.dumps(data)
+
+    def _decode_body(self, endpoint: str, body: bytes) -> Any:
+        """Decode a JSON response body with the configured codec"""
+        if self.lazy_payloads and endpoint in ('/v1/query', '/v1/fetch'):
+            return self.json_codec.loads_lazy(body)
+        return self.json_codec.loads(body)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._transport_stats[name] += amount
+
+    def transport_stats(self) -> Dict[str, Any]:
+        """Attempt, retry, deadline and circuit breaker counters"""
+        with self._stats_lock:
+            stats = dict(self._transport_stats)
+        if self.circuit_breaker is not None:
+            stats['circuits'] = self.circuit_breaker.stats()
+        return stats
+
+    def _call_deadline(self, deadline: Optional[float] = None) -> Optional[float]:
+        """Earliest of an inherited deadline and the policy's per-request deadline"""
+        if self.retry_policy is not None and self.retry_policy.deadline is not None:
+            policy_deadline = time.monotonic() + self.retry_policy.deadline
+            deadline = policy_deadline if deadline is None else min(deadline, policy_deadline)
+        return deadline
+
+    def _before_attempt(self, endpoint: str, deadline: Optional[float], timeout: float) -> float:
+        """Check the deadline and circuit for one attempt; returns the attempt timeout"""
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count('deadline_exceeded')
+                raise AgentTokenizationError(f"Deadline exceeded calling {endpoint}", "DEADLINE_EXCEEDED", {"endpoint": endpoint})
+            timeout = min(timeout, remaining)
+        if self.circuit_breaker is not None:
+            retry_after = self.circuit_breaker.allow(endpoint)
+            if retry_after is not None:
+                self._count('circuit_rejections')
+                raise AgentTokenizationError(
+                    f"Circuit open for {endpoint}", "CIRCUIT_OPEN", {"endpoint": endpoint, "retry_after": retry_after}
+                )
+        self._count('attempts')
+        return timeout
+
+    def _after_attempt(
+        self,
+        endpoint: str,
+        method: str,
+        data: Optional[Dict],
+        error: Optional['AgentTokenizationError'],
+        attempt: int,
+        deadline: Optional[float]
+    ) -> Optional[float]:
+        """Record an attempt's outcome; returns the delay before retrying, or None to stop"""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(endpoint, error is None or not CircuitBreaker.is_failure(error))
+        policy = self.retry_policy
+        if error is None or policy is None or attempt >= policy.max_attempts or not policy.is_retryable(error):
+            return None
+        idempotent = (
+            method.upper() == "GET"
+            or endpoint in ('/v1/query', '/v1/fetch')
+            or bool(data and (data.get('meta') or {}).get('commandId'))
+        )
+        if not idempotent and not policy.retry_non_idempotent:
+            return None
+        delay = policy.delay(attempt)
+        if deadline is not None and time.monotonic() + delay >= deadline:
             return None
+        self._count('retries')
+        return delay
+
+    def _abandon_attempt(self, endpoint: str):
+        """An attempt ended without an outcome (cancelled or a local error); free its circuit probe"""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.release(endpoint)
+
+    def _template_id(self, entity_name: str) -> Dict[str, str]:
+        """Structured templateId used by /v1/create and /v1/exercise"""
+        return {
+            "packageId": self.package_id,
+            "moduleName": self.MODULE_NAME,
+            "entityName": entity_name
+        }
+
+    def _command_template(self, entity_name: str, choice: Optional[str] = None) -> _CommandTemplate:
+        """Cached pre-encoded skeleton for a create (choice=None) or exercise command"""
+        key = (self.package_id, self.MODULE_NAME, entity_name, choice)
+        template = self._command_templates.get(key)
+        if template is None:
+            template = self._command_templates[key] = _CommandTemplate(self._template_id(entity_name), choice)
+        return template
+
+    def _template_ref(self, entity_name: str) -> str:
+        """Colon-separated templateId used by /v1/query"""
+        return f"{self.package_id}:{self.MODULE_NAME}:{entity_name}"
+
+    def _query_payload(self, entity_name: str, filter_criteria: Optional[Dict] = None) -> Dict:
+        """Payload for /v1/query against a single template"""
+        return {
+            "templateIds": [self._template_ref(entity_name)],
+            "query": filter_criteria or {}
+        }
+
+    def _register_agent_payload(self, agent: Union[Agent, Dict], party: Optional[str] = None) -> Dict:
+        """Validate agent data and build the AgentRegistration create command"""
+        if isinstance(agent, Agent):
+            agent_data = asdict(agent)
+        else:
+            agent_data = agent
             
-        agent = agents[0]
-        tokens = self.query_usage_tokens({'agentId': agent_id}, party)
+        # Ensure required fields
+        required_fields = ['agent_id', 'name', 'agent_type']
+        for field in required_fields:
+            if field not in agent_data:
+                raise AgentTokenizationError(f"Missing required field: {field}", "VALIDATION_ERROR")
+        
+        # Set defaults
+        agent_data.setdefault('description', '')
+        agent_data.setdefault('capabilities', [])
+        agent_data.setdefault('attributes', {})
+        agent_data.setdefault('is_active', True)
+        if 'created_at' not in agent_data:
+            agent_data['created_at'] = _utc_timestamp()
+        
+        return self._command_template("AgentRegistration").render(self.json_codec, {
+            "operator": party or self.party,
+            "agentId": agent_data['agent_id'],
+            "name": agent_data['name'],
+            "description": agent_data['description'],
+            "agentType": agent_data['agent_type'],
+            "capabilities": agent_data['capabilities'],
+            "attributes": agent_data['attributes'],
+            "isActive": agent_data['is_active'],
+            "createdAt": agent_data['created_at']
+        })
+
+    def _update_agent_status_payload(self, contract_id: str, is_active: bool) -> Dict:
+        """Build the Activate/Deactivate exercise command"""
+        template = self._command_template("AgentRegistration", "Activate" if is_active else "Deactivate")
+        return template.render(self.json_codec, {}, contract_id)
+
+    def _create_usage_token_payload(self, token: Union[UsageToken, Dict], party: Optional[str] = None) -> Dict:
+        """Validate token data and build the AgentUsageToken create command"""
+        if isinstance(token, UsageToken):
+            token_data = asdict(token)
+        else:
+            token_data = token
+            
+        # Ensure required fields
+        required_fields = ['agent_id', 'usage_type', 'max_usage']
+        for field in required_fields:
+            if field not in token_data:
+                raise AgentTokenizationError(f"Missing required field: {field}", "VALIDATION_ERROR")
+        
+        # Set defaults
+        if 'token_id' not in token_data:
+            token_data['token_id'] = f"token-{int(time.time())}-{_TOKEN_SALT}-{next(_TOKEN_SEQUENCE)}"
+        token_data.setdefault('current_usage', 0)
+        token_data.setdefault('metadata', {})
+        token_data.setdefault('is_active', True)
+        if 'created_at' not in token_data:
+            token_data['created_at'] = _utc_timestamp()
+        
+        return self._command_template("AgentUsageToken").render(self.json_codec, {
+            "operator": party or self.party,
+            "agentId": token_data['agent_id'],
+            "tokenId": token_data['token_id'],
+            "usageType": token_data['usage_type'],
+            "maxUsage": token_data['max_usage'],
+            "currentUsage": token_data['current_usage'],
+            "metadata": token_data['metadata'],
+            "isActive": token_data['is_active'],
+            "createdAt": token_data['created_at']
+        })
+
+    def _record_usage_payload(self, contract_id: str, usage_amount: int, command_id: Optional[str] = None) -> Dict:
+        """Build the RecordUsage exercise command"""
+        return self._command_template("AgentUsageToken", "RecordUsage").render(
+            self.json_codec,
+            {"usageAmount": usage_amount, "timestamp": _utc_timestamp()},
+            contract_id,
+            command_id
+        )
+
+    @staticmethod
+    def _with_command_id(payload: Dict, command_id: Optional[str]) -> Dict:
+        """Attach a ledger command ID (JSON API ``meta.commandId``) used for deduplication"""
+        if command_id is None:
+            return payload
+        if type(payload) is EncodedCommand and payload.body is not None and "meta" not in payload:
+            # Splice into the pre-encoded body rather than re-encoding it
+            dict.__setitem__(payload, "meta", {"commandId": command_id})
+            payload.body = payload.body[:-1] + b',"meta":{"commandId":' + json.dumps(command_id).encode('utf-8') + b'}}'
+            return payload
+        payload["meta"] = {"commandId": command_id}
+        return payload
+
+    def _fetch_payload(self, entity_name: str, contract_id: str) -> Dict:
+        """Payload for /v1/fetch by contract ID"""
+        return {
+            "templateId": self._template_ref(entity_name),
+            "contractId": contract_id
+        }
+
+    def _system_stats_payload(self) -> Dict:
+        """Payload for the SystemOrchestrator query"""
+        return {
+            "templateIds": [self._template_ref("SystemOrchestrator")]
+        }
+
+    def _maintained_usage_summary(self, agent_id: str, party: Optional[str] = None) -> Optional[UsageSummary]:
+        """Summary from ``summary_source`` when it is ready and covers ``party``, else None"""
+        source = self.summary_source
+        if source is None or not source.ready.is_set():
+            return None
+        if getattr(source, 'party', None) not in (None, party or self.party):
+            return None
+        return source.get_usage_summary(agent_id)
+
+    DETAIL_TEMPLATES = ("AgentRegistration", "AgentUsageToken", "AttributeDefinition")
+
+    @staticmethod
+    def _usage_summary_from_types(
+        agent_id: str,
+        usage_by_type: Dict[str, Dict[str, int]],
+        active_tokens: int
+    ) -> UsageSummary:
+        """UsageSummary from per-type {'maxUsage', 'currentUsage', 'tokenCount'} totals"""
+        total_max_usage = sum(entry['maxUsage'] for entry in usage_by_type.values())
+        total_current_usage = sum(entry['currentUsage'] for entry in usage_by_type.values())
+        return UsageSummary(
+            agent_id=agent_id,
+            total_tokens=sum(entry['tokenCount'] for entry in usage_by_type.values()),
+            active_tokens=active_tokens,
+            total_max_usage=total_max_usage,
+            total_current_usage=total_current_usage,
+            usage_by_type=usage_by_type,
+            utilization_rate=(total_current_usage / total_max_usage * 100) if total_max_usage > 0 else 0
+        )
+
+    @classmethod
+    def _build_fleet_summary(
+        cls,
+        columns: _UsageColumns,
+        agent_ids: Optional[List[str]] = None,
+        use_numpy: Optional[bool] = None
+    ) -> FleetUsageSummary:
+        """Per-agent summaries and fleet totals from usage token columns"""
+        per_agent = {agent_id: ({}, [0]) for agent_id in (agent_ids or [])}
+        fleet_by_type = {}
+        for (agent_id, usage_type), (count, active, max_usage, current_usage) in zip(columns.groups, columns.totals(use_numpy)):
+            by_type, active_tokens = per_agent.setdefault(agent_id, ({}, [0]))
+            by_type[usage_type] = {'maxUsage': max_usage, 'currentUsage': current_usage, 'tokenCount': count}
+            active_tokens[0] += active
+            fleet = fleet_by_type.setdefault(usage_type, {'maxUsage': 0, 'currentUsage': 0, 'tokenCount': 0})
+            fleet['maxUsage'] += max_usage
+            fleet['currentUsage'] += current_usage
+            fleet['tokenCount'] += count
         
+        summaries = {
+            agent_id: cls._usage_summary_from_types(agent_id, by_type, active_tokens[0])
+            for agent_id, (by_type, active_tokens) in per_agent.items()
+        }
+        fleet = cls._usage_summary_from_types('', fleet_by_type, sum(summary.active_tokens for summary in summaries.values()))
+        return FleetUsageSummary(
+            summaries=summaries,
+            agent_count=len(summaries),
+            total_tokens=fleet.total_tokens,
+            active_tokens=fleet.active_tokens,
+            total_max_usage=fleet.total_max_usage,
+            total_current_usage=fleet.total_current_usage,
+            usage_by_type=fleet.usage_by_type,
+            utilization_rate=fleet.utilization_rate
+        )
+
+    @staticmethod
+    def _group_by(contracts: List[Dict], field: str, wanted: set) -> Dict[str, List[Dict]]:
+        """Bucket contracts by an argument field, keeping only wanted values"""
+        grouped = {}
+        for contract in contracts:
+            value = contract['argument'].get(field)
+            if value in wanted:
+                grouped.setdefault(value, []).append(contract)
+        return grouped
+
+    def _build_agent_details(
+        self,
+        agent_ids: List[str],
+        by_template: Dict[str, Dict[str, List[Dict]]],
+        events_by_token: Dict[str, List[Dict]],
+        max_events: Optional[int]
+    ) -> Dict[str, AgentDetails]:
+        """Join per-template results (grouped by agentId) and usage events (grouped by tokenId)"""
+        details = {}
+        for agent_id in agent_ids:
+            agents = by_template["AgentRegistration"].get(agent_id, [])
+            if not agents:
+                continue
+            tokens = by_template["AgentUsageToken"].get(agent_id, [])
+            events = [
+                event for token in tokens
+                for event in events_by_token.get(token['argument'].get('tokenId'), [])
+            ]
+            events.sort(key=lambda event: str(event['argument'].get('timestamp', '')), reverse=True)
+            details[agent_id] = AgentDetails(
+                agent_id=agent_id,
+                agent=agents[0],
+                tokens=tokens,
+                attributes=by_template["AttributeDefinition"].get(agent_id, []),
+                usage_events=events if max_events is None else events[:max_events],
+                summary=self._build_usage_summary(agent_id, tokens)
+            )
+        return details
+
+    @staticmethod
+    def _build_agent_data(agent: Dict, tokens: List[Dict]) -> Dict:
+        """Join an agent contract with its usage token contracts"""
         token_data = []
         total_usage = 0
         max_usage = 0
@@ -378,22 +1525,9 @@ class AgentTokenizationSDK:
             'maxUsage': max_usage
         }
 
-    def bulk_register_agents(self, agents: List[Union[Agent, Dict]], party: Optional[str] = None) -> List[Dict]:
-        """Bulk register multiple agents"""
-        results = []
-        for agent in agents:
-            try:
-                result = self.register_agent(agent, party)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Failed to register agent: {str(e)}")
-                results.append({'error': str(e)})
-        return results
-
-    def get_usage_summary(self, agent_id: str, party: Optional[str] = None) -> UsageSummary:
-        """Get usage summary for an agent"""
-        tokens = self.query_usage_tokens({'agentId': agent_id}, party)
-        
+    @staticmethod
+    def _build_usage_summary(agent_id: str, tokens: List[Dict]) -> UsageSummary:
+        """Aggregate usage token contracts into a UsageSummary"""
         total_max_usage = 0
         total_current_usage = 0
         usage_by_type = {}
@@ -435,16 +1569,2665 @@ class AgentTokenizationSDK:
             utilization_rate=utilization_rate
         )
 
-    # ========== CONTEXT MANAGER SUPPORT ==========
-
-    def __enter__(self):
-        """Context manager entry"""
-        return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit"""
-        if hasattr(self.session, 'close'):
-            self.session.close()
+class AgentTokenizationSDK(_AgentTokenizationCommands):
+    """
+    Python SDK for the Agent Tokenization platform
+    
+    Provides easy-to-use methods for managing AI agents, usage tokens,
+    and system interactions through the DAML JSON API.
+    """
+    
+    def __init__(
+        self,
+        base_url: str = "http://localhost:7575",
+        party: str = "Alice", 
+        package_id: str = "your-package-id",
+        timeout: int = 30,
+        headers: Optional[Dict[str, str]] = None,
+        pool_maxsize: int = 10,
+        cache: Optional[ContractCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        summary_source: Optional[Any] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        json_codec: Optional[JSONCodec] = None,
+        lazy_payloads: bool = False
+    ):
+        """
+        Initialize the SDK
+        
+        Args:
+            base_url: Base URL of the DAML JSON API
+            party: Default party for transactions
+            package_id: Package ID of deployed DAR
+            timeout: Request timeout in seconds
+            headers: Additional headers for requests
+            pool_maxsize: Keep-alive connections kept per host; raise it to
+                match ``max_workers`` when using parallel bulk operations
+            cache: Optional ContractCache serving repeated queries locally
+            instrumentation: Optional Instrumentation receiving per-request
+                timing spans (e.g. LatencyAggregator); None disables timing
+            summary_source: Optional maintained usage aggregate (e.g. a
+                ContractReplica) exposing a ``ready`` event and
+                ``get_usage_summary(agent_id)``; get_usage_summary reads it
+                instead of downloading every token once it is ready
+            retry_policy: Optional RetryPolicy; None makes a single attempt
+            circuit_breaker: Optional CircuitBreaker applied per endpoint
+            json_codec: JSONCodec encoding requests and decoding responses;
+                None picks the fastest installed (see default_json_codec)
+            lazy_payloads: Return query/fetch contracts as LazyContract
+                dicts that decode ``argument``/``payload`` on first access
+        """
+        self.base_url = base_url.rstrip('/')
+        self.party = party
+        self.package_id = package_id
+        self.timeout = timeout
+        self.json_codec = json_codec or default_json_codec()
+        self.lazy_payloads = lazy_payloads
+        self.cache = cache
+        self.instrumentation = instrumentation
+        self.summary_source = summary_source
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self._transport_stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._pool_maxsize = pool_maxsize
+        self._fan_out_pool = None
+        self._fan_out_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        default_headers = {'Content-Type': 'application/json'}
+        if headers:
+            default_headers.update(headers)
+        self.session.headers.update(default_headers)
+
+    def _make_request(
+        self, 
+        endpoint: str, 
+        method: str = "GET", 
+        data: Optional[Dict] = None,
+        party: Optional[str] = None
+    ) -> Dict:
+        """Make HTTP request to DAML JSON API"""
+        if self.instrumentation is None:
+            return self._send_with_policy(endpoint, method, data, party)
+        
+        operation = getattr(self._local, 'operation', None)
+        if operation == '' or (operation is None and not self.instrumentation.should_sample()):
+            return self._send_with_policy(endpoint, method, data, party)
+        
+        template_id = None
+        choice = None
+        if data:
+            template_id = data.get('templateId') or (data.get('templateIds') or [None])[0]
+            if isinstance(template_id, dict):
+                template_id = template_id.get('entityName')
+            elif template_id:
+                template_id = template_id.rsplit(':', 1)[-1]
+            choice = data.get('choice')
+        span = RequestSpan(operation or endpoint, endpoint, template_id, choice)
+        started = time.perf_counter()
+        try:
+            return self._send_with_policy(endpoint, method, data, party, span)
+        except AgentTokenizationError as e:
+            span.error = e.code
+            raise
+        finally:
+            span.total_seconds = time.perf_counter() - started
+            self.instrumentation.on_span(span)
+
+    @contextmanager
+    def deadline(self, seconds: float):
+        """
+        Bound every request made in this block (on this thread), retries
+        included, to finish within ``seconds``; nested deadlines keep the
+        earlier one
+        """
+        previous = getattr(self._local, 'deadline', None)
+        deadline = time.monotonic() + seconds
+        self._local.deadline = deadline if previous is None else min(previous, deadline)
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def _send_with_policy(
+        self,
+        endpoint: str,
+        method: str,
+        data: Optional[Dict],
+        party: Optional[str],
+        span: Optional[RequestSpan] = None
+    ) -> Dict:
+        """Send under the retry policy, circuit breaker and active deadline"""
+        deadline = self._call_deadline(getattr(self._local, 'deadline', None))
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._before_attempt(endpoint, deadline, self.timeout)
+            if span:
+                span.attempts = attempt
+            try:
+                result = self._send(endpoint, method, data, party, span, timeout)
+            except AgentTokenizationError as e:
+                delay = self._after_attempt(endpoint, method, data, e, attempt, deadline)
+                if delay is None:
+                    raise
+                logger.warning(f"Retrying {endpoint} in {delay:.2f}s after attempt {attempt}: {str(e)}")
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self._abandon_attempt(endpoint)
+                raise
+            self._after_attempt(endpoint, method, data, None, attempt, deadline)
+            return result
+
+    def _send(
+        self,
+        endpoint: str,
+        method: str,
+        data: Optional[Dict],
+        party: Optional[str],
+        span: Optional[RequestSpan] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """Serialize, send and decode one request, filling in span timings when given"""
+        url = f"{self.base_url}{endpoint}"
+        request_party = party or self.party
+        
+        headers = {'Authorization': f'Bearer {request_party}'}
+        timeout = self.timeout if timeout is None else timeout
+        
+        try:
+            started = time.perf_counter() if span else 0.0
+            body = self._encode_body(data) if data is not None and method.upper() != "GET" else None
+            if span:
+                sent = time.perf_counter()
+                span.serialize_seconds = sent - started
+            
+            if method.upper() == "GET":
+                response = self.session.get(url, headers=headers, timeout=timeout)
+            elif method.upper() == "POST":
+                response = self.session.post(url, headers=headers, data=body, timeout=timeout)
+            else:
+                response = self.session.request(method, url, headers=headers, data=body, timeout=timeout)
+            
+            if span:
+                received = time.perf_counter()
+                span.network_seconds = received - sent
+                span.status = response.status_code
+            
+            response.raise_for_status()
+            
+            # Handle different content types
+            content_type = response.headers.get('content-type', '')
+            if 'application/json' in content_type:
+                result = self._decode_body(endpoint, response.content)
+            else:
+                result = {'result': response.text}
+            if span:
+                span.decode_seconds = time.perf_counter() - received
+            return result
+                
+        except requests.exceptions.RequestException as e:
+            logger.error(f"API request failed: {str(e)}")
+            status = e.response.status_code if getattr(e, 'response', None) is not None else None
+            raise AgentTokenizationError(f"Network error: {str(e)}", "NETWORK_ERROR", {"url": url, "status": status})
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON response: {str(e)}")
+            raise AgentTokenizationError(f"Invalid JSON response: {str(e)}", "JSON_ERROR")
+
+    def _query(self, entity_name: str, filter_criteria: Optional[Dict] = None, party: Optional[str] = None) -> List[Dict]:
+        """Run a /v1/query, reading through the cache when one is configured"""
+        payload = self._query_payload(entity_name, filter_criteria)
+        if self.cache is None:
+            result = self._make_request('/v1/query', 'POST', payload, party)
+            return result.get('result', result)
+        
+        key = ContractCache.make_key(party or self.party, self._template_ref(entity_name), filter_criteria)
+        contracts = self.cache.get(key)
+        if contracts is None:
+            result = self._make_request('/v1/query', 'POST', payload, party)
+            contracts = result.get('result', result)
+            self.cache.put(key, contracts)
+        return list(contracts)
+
+    def _fetch(self, entity_name: str, contract_id: str, party: Optional[str] = None) -> Optional[Dict]:
+        """Fetch one active contract by ID via /v1/fetch, reading through the cache"""
+        payload = self._fetch_payload(entity_name, contract_id)
+        key = None
+        if self.cache is not None:
+            key = ContractCache.make_key(party or self.party, self._template_ref(entity_name), {'contractId': contract_id})
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached[0] if cached else None
+        
+        result = self._make_request('/v1/fetch', 'POST', payload, party)
+        contract = result.get('result') if isinstance(result, dict) else None
+        if key is not None:
+            self.cache.put(key, [contract] if contract else [])
+        return contract
+
+    def _invalidate(self, entity_name: str):
+        """Drop cached queries for a template after a write (all parties may observe it)"""
+        if self.cache is not None:
+            self.cache.invalidate(self._template_ref(entity_name))
+
+    @_instrumented
+    def health_check(self) -> Dict:
+        """Check if the API is ready"""
+        return self._make_request('/readyz')
+
+    @_instrumented
+    def get_parties(self) -> List[str]:
+        """Get list of parties in the system"""
+        result = self._make_request('/v1/parties')
+        return result.get('result', result)
+
+    # ========== AGENT MANAGEMENT ==========
+
+    @_instrumented
+    def register_agent(self, agent: Union[Agent, Dict], party: Optional[str] = None) -> Dict:
+        """
+        Register a new AI agent
+        
+        Args:
+            agent: Agent object or dictionary with agent data
+            party: Party to create agent for (optional)
+            
+        Returns:
+            Created agent contract
+        """
+        payload = self._register_agent_payload(agent, party)
+        result = self._make_request('/v1/create', 'POST', payload, party)
+        self._invalidate("AgentRegistration")
+        return result
+
+    @_instrumented
+    def query_agents(self, filter_criteria: Optional[Dict] = None, party: Optional[str] = None) -> List[Dict]:
+        """
+        Query agents by criteria
+        
+        Args:
+            filter_criteria: Dictionary of filter conditions
+            party: Party to query for (optional)
+            
+        Returns:
+            List of matching agent contracts
+        """
+        return self._query("AgentRegistration", filter_criteria, party)
+
+    @_instrumented
+    def get_agent(self, contract_id: str, party: Optional[str] = None) -> Optional[Dict]:
+        """
+        Get a specific agent by contract ID
+        
+        Uses the JSON API's fetch-by-ID endpoint, so the cost does not grow
+        with the number of registrations visible to the party.
+        """
+        return self._fetch("AgentRegistration", contract_id, party)
+
+    @_instrumented
+    def get_agent_by_id(self, agent_id: str, party: Optional[str] = None) -> Optional[Dict]:
+        """Get a specific agent by agent ID"""
+        agents = self.query_agents({'agentId': agent_id}, party)
+        return agents[0] if agents else None
+
+    @_instrumented
+    def update_agent_status(self, contract_id: str, is_active: bool, party: Optional[str] = None) -> Dict:
+        """Update agent status (activate/deactivate)"""
+        payload = self._update_agent_status_payload(contract_id, is_active)
+        result = self._make_request('/v1/exercise', 'POST', payload, party)
+        self._invalidate("AgentRegistration")
+        return result
+
+    # ========== USAGE TOKEN MANAGEMENT ==========
+
+    @_instrumented
+    def create_usage_token(self, token: Union[UsageToken, Dict], party: Optional[str] = None) -> Dict:
+        """
+        Create a usage token for an agent
+        
+        Args:
+            token: UsageToken object or dictionary with token data
+            party: Party to create token for (optional)
+            
+        Returns:
+            Created usage token contract
+        """
+        payload = self._create_usage_token_payload(token, party)
+        result = self._make_request('/v1/create', 'POST', payload, party)
+        self._invalidate("AgentUsageToken")
+        return result
+
+    @_instrumented
+    def query_usage_tokens(self, filter_criteria: Optional[Dict] = None, party: Optional[str] = None) -> List[Dict]:
+        """Query usage tokens by criteria"""
+        return self._query("AgentUsageToken", filter_criteria, party)
+
+    # ========== STREAMING QUERIES ==========
+
+    def _open_stream(self, endpoint: str, data: Dict, party: Optional[str]) -> requests.Response:
+        """POST with a streamed response body, under the retry policy and circuit breaker"""
+        url = f"{self.base_url}{endpoint}"
+        headers = {'Authorization': f'Bearer {party or self.party}'}
+        body = self.json_codec.dumps(data)
+        deadline = self._call_deadline(getattr(self._local, 'deadline', None))
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._before_attempt(endpoint, deadline, self.timeout)
+            response = None
+            try:
+                response = self.session.post(url, headers=headers, data=body, timeout=timeout, stream=True)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                status = response.status_code if response is not None else None
+                if response is not None:
+                    response.close()
+                error = AgentTokenizationError(f"Network error: {str(e)}", "NETWORK_ERROR", {"url": url, "status": status})
+                delay = self._after_attempt(endpoint, 'POST', data, error, attempt, deadline)
+                if delay is None:
+                    logger.error(f"API request failed: {str(e)}")
+                    raise error
+                time.sleep(delay)
+                continue
+            except BaseException:
+                if response is not None:
+                    response.close()
+                self._abandon_attempt(endpoint)
+                raise
+            self._after_attempt(endpoint, 'POST', data, None, attempt, deadline)
+            return response
+
+    def iter_query(
+        self,
+        entity_name: str,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        predicate: Optional[Callable[[Dict], bool]] = None,
+        chunk_size: int = 64 * 1024
+    ) -> Iterator[Dict]:
+        """
+        Yield contracts of a template one at a time as the response streams in
+        
+        The response body is parsed incrementally, so memory stays bounded by
+        one contract regardless of how many match and the first contract is
+        available before the download finishes. The cache is bypassed.
+        
+        Args:
+            entity_name: Template entity name, e.g. "AgentRegistration"
+            filter_criteria: JSON API query, evaluated by the server
+            party: Party to query for (optional)
+            predicate: Client-side filter applied to each contract (optional)
+            chunk_size: Bytes read from the socket at a time
+        """
+        response = self._open_stream('/v1/query', self._query_payload(entity_name, filter_criteria), party)
+        parser = _ResultStreamParser()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            for chunk in response.iter_content(chunk_size):
+                for contract in parser.feed(decoder.decode(chunk)):
+                    if predicate is None or predicate(contract):
+                        yield contract
+            for contract in parser.feed(decoder.decode(b'', final=True), final=True):
+                if predicate is None or predicate(contract):
+                    yield contract
+        except requests.exceptions.RequestException as e:
+            logger.error(f"API request failed: {str(e)}")
+            raise AgentTokenizationError(f"Network error: {str(e)}", "NETWORK_ERROR", {"url": response.url, "status": None})
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON response: {str(e)}")
+            raise AgentTokenizationError(f"Invalid JSON response: {str(e)}", "JSON_ERROR")
+        finally:
+            response.close()
+
+    def iter_agents(
+        self,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        predicate: Optional[Callable[[Dict], bool]] = None
+    ) -> Iterator[Dict]:
+        """Stream agent registrations (see iter_query)"""
+        return self.iter_query("AgentRegistration", filter_criteria, party, predicate)
+
+    def iter_usage_tokens(
+        self,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        predicate: Optional[Callable[[Dict], bool]] = None
+    ) -> Iterator[Dict]:
+        """Stream usage tokens (see iter_query)"""
+        return self.iter_query("AgentUsageToken", filter_criteria, party, predicate)
+
+    def query_usage_token_columns(
+        self,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        predicate: Optional[Callable[[Dict], bool]] = None
+    ) -> UsageTokenColumns:
+        """
+        Query usage tokens straight into a UsageTokenColumns container
+        
+        Each contract is decoded from the stream and appended to the columns,
+        so no list of per-contract dicts is ever materialised.
+        
+        Args:
+            filter_criteria: Query filters (optional)
+            party: Party to query for (optional)
+            predicate: Client-side filter applied before appending (optional)
+            
+        Returns:
+            UsageTokenColumns holding the matching tokens
+        """
+        return UsageTokenColumns(self.iter_usage_tokens(filter_criteria, party, predicate))
+
+    @_instrumented
+    def record_usage(
+        self,
+        contract_id: str,
+        usage_amount: int,
+        party: Optional[str] = None,
+        command_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Record usage against a token
+        
+        Args:
+            contract_id: Usage token contract ID
+            usage_amount: Amount of usage to add
+            party: Party exercising the choice (optional)
+            command_id: Ledger command ID; resubmitting with the same ID is
+                deduplicated by the ledger (optional)
+        """
+        payload = self._record_usage_payload(contract_id, usage_amount, command_id)
+        result = self._make_request('/v1/exercise', 'POST', payload, party)
+        self._invalidate("AgentUsageToken")
+        return result
+
+    # ========== SYSTEM QUERIES ==========
+
+    @_instrumented
+    def get_system_stats(self, party: Optional[str] = None) -> Optional[Dict]:
+        """Get system statistics and metrics"""
+        result = self._make_request('/v1/query', 'POST', self._system_stats_payload(), party)
+        contracts = result.get('result', result)
+        return contracts[0]['argument'] if contracts else None
+
+    # ========== CONVENIENCE METHODS ==========
+
+    def _fan_out(self, calls: List[Callable[[], Any]]) -> List[Any]:
+        """Run independent calls concurrently, carrying this thread's operation and deadline"""
+        if len(calls) <= 1:
+            return [call() for call in calls]
+        with self._fan_out_lock:
+            if self._fan_out_pool is None:
+                self._fan_out_pool = ThreadPoolExecutor(max_workers=self._pool_maxsize, thread_name_prefix="sdk-fan-out")
+            pool = self._fan_out_pool
+        operation = getattr(self._local, 'operation', None)
+        deadline = getattr(self._local, 'deadline', None)
+        
+        def run(call):
+            self._local.operation = operation
+            self._local.deadline = deadline
+            try:
+                return call()
+            finally:
+                self._local.operation = None
+                self._local.deadline = None
+        
+        futures = [pool.submit(run, call) for call in calls]
+        return [future.result() for future in futures]
+
+    @_instrumented
+    def get_agent_data(self, agent_id: str, party: Optional[str] = None) -> Optional[Dict]:
+        """Get all data for an agent (agent + tokens + usage); both queries run concurrently"""
+        agents, tokens = self._fan_out([
+            lambda: self.query_agents({'agentId': agent_id}, party),
+            lambda: self.query_usage_tokens({'agentId': agent_id}, party)
+        ])
+        if not agents:
+            return None
+        return self._build_agent_data(agents[0], tokens)
+
+    @_instrumented
+    def get_agent_details(
+        self,
+        agent_id: str,
+        party: Optional[str] = None,
+        max_events: Optional[int] = 50
+    ) -> Optional[AgentDetails]:
+        """
+        Agent registration, usage tokens, attributes and most recent usage
+        events in one call; returns None if the agent does not exist
+        """
+        return self.get_agents_details([agent_id], party, max_events).get(agent_id)
+
+    @_instrumented
+    def get_agents_details(
+        self,
+        agent_ids: List[str],
+        party: Optional[str] = None,
+        max_events: Optional[int] = 50,
+        scan_threshold: int = 20
+    ) -> Dict[str, AgentDetails]:
+        """
+        Composite fetch joined by agentId
+        
+        AgentRegistration, AgentUsageToken and AttributeDefinition queries run
+        concurrently, followed by the UsageEvent queries for the agents'
+        tokens (events reference tokens, not agents), so latency is roughly
+        two of the slowest queries rather than the sum of all of them.
+        
+        Args:
+            agent_ids: Agents to fetch
+            party: Party to query for (optional)
+            max_events: Most recent usage events kept per agent (None keeps all)
+            scan_threshold: Above this many agents (or tokens), each template is
+                streamed once and filtered locally instead of being queried
+                per agent (or per token)
+            
+        Returns:
+            AgentDetails keyed by agentId; unknown agents are omitted
+        """
+        agent_ids = list(dict.fromkeys(agent_ids))
+        wanted = set(agent_ids)
+        if len(agent_ids) <= scan_threshold:
+            calls = [
+                functools.partial(self._query, entity, {'agentId': agent_id}, party)
+                for entity in self.DETAIL_TEMPLATES for agent_id in agent_ids
+            ]
+        else:
+            calls = [
+                functools.partial(list, self.iter_query(
+                    entity, None, party, lambda contract: contract['argument'].get('agentId') in wanted
+                ))
+                for entity in self.DETAIL_TEMPLATES
+            ]
+        results = self._fan_out(calls)
+        per_template = len(results) // len(self.DETAIL_TEMPLATES) if results else 0
+        by_template = {
+            entity: self._group_by(
+                [contract for chunk in results[index * per_template:(index + 1) * per_template] for contract in chunk],
+                'agentId', wanted
+            )
+            for index, entity in enumerate(self.DETAIL_TEMPLATES)
+        }
+        
+        token_ids = [
+            token['argument'].get('tokenId')
+            for tokens in by_template["AgentUsageToken"].values() for token in tokens
+        ]
+        token_set = set(token_ids)
+        if not token_ids:
+            events = []
+        elif len(token_ids) <= scan_threshold:
+            events = [
+                event for chunk in self._fan_out([
+                    functools.partial(self._query, "UsageEvent", {'tokenId': token_id}, party) for token_id in token_ids
+                ])
+                for event in chunk
+            ]
+        else:
+            events = list(self.iter_query(
+                "UsageEvent", None, party, lambda event: event['argument'].get('tokenId') in token_set
+            ))
+        return self._build_agent_details(agent_ids, by_template, self._group_by(events, 'tokenId', token_set), max_events)
+
+    def bulk_register_agents(
+        self,
+        agents: List[Union[Agent, Dict]],
+        party: Optional[str] = None,
+        max_workers: int = 1
+    ) -> List[Dict]:
+        """
+        Bulk register multiple agents
+        
+        Args:
+            agents: Agents to register
+            party: Party to create agents for (optional)
+            max_workers: Number of concurrent registrations (1 = sequential)
+            
+        Returns:
+            One result per agent in input order; failures are ``{'error': ...}`` dicts
+        """
+        if max_workers > 1:
+            report = self.parallel_bulk_register_agents(agents, party, max_workers=max_workers)
+            return [
+                result if result is not None else {'error': report.errors[index]['message']}
+                for index, result in enumerate(report.results)
+            ]
+        
+        results = []
+        for agent in agents:
+            try:
+                result = self.register_agent(agent, party)
+                results.append(result)
+            except Exception as e:
+                logger.error(f"Failed to register agent: {str(e)}")
+                results.append({'error': str(e)})
+        return results
+
+    def parallel_bulk_register_agents(
+        self,
+        agents: List[Union[Agent, Dict]],
+        party: Optional[str] = None,
+        max_workers: int = 8,
+        chunk_size: int = 500,
+        max_per_second: Optional[float] = None,
+        start_index: int = 0,
+        stop_on_error: bool = False,
+        previous_report: Optional[BulkRegistrationReport] = None
+    ) -> BulkRegistrationReport:
+        """
+        Register agents concurrently with a worker pool
+        
+        Agents are submitted in chunks of ``chunk_size``; each chunk completes
+        before the next is started, so ``stop_on_error`` halts at a chunk
+        boundary and everything after it is left unattempted.
+        
+        Args:
+            agents: Agents to register
+            party: Party to create agents for (optional)
+            max_workers: Size of the worker pool
+            chunk_size: Number of agents submitted per chunk
+            max_per_second: Cap on registrations started per second (optional)
+            start_index: Skip agents before this index, e.g. a previous
+                report's ``resume_index``
+            stop_on_error: Stop after the first chunk containing a failure
+            previous_report: Report from an earlier run over the same list;
+                agents it already registered are carried over, not resubmitted
+            
+        Returns:
+            BulkRegistrationReport with results in input order
+        """
+        if max_workers < 1 or chunk_size < 1:
+            raise AgentTokenizationError("max_workers and chunk_size must be at least 1", "VALIDATION_ERROR")
+        if max_per_second is not None and max_per_second <= 0:
+            raise AgentTokenizationError("max_per_second must be positive", "VALIDATION_ERROR")
+        
+        report = BulkRegistrationReport(total=len(agents), results=[None] * len(agents), errors={})
+        report.skipped = min(start_index, len(agents))
+        report.start_index = report.skipped
+        if previous_report is not None:
+            if previous_report.total != len(agents):
+                raise AgentTokenizationError("previous_report does not match agents", "VALIDATION_ERROR")
+            report.results = list(previous_report.results)
+        limiter = _RateLimiter(max_per_second) if max_per_second else None
+        
+        def register(index: int):
+            if limiter:
+                limiter.acquire()
+            try:
+                report.results[index] = self.register_agent(agents[index], party)
+            except Exception as e:
+                logger.error(f"Failed to register agent at index {index}: {str(e)}")
+                report.errors[index] = {
+                    'code': getattr(e, 'code', None) or 'UNKNOWN_ERROR',
+                    'message': str(e)
+                }
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for chunk_start in range(report.skipped, len(agents), chunk_size):
+                indices = [
+                    index for index in range(chunk_start, min(chunk_start + chunk_size, len(agents)))
+                    if report.results[index] is None
+                ]
+                list(executor.map(register, indices))
+                if stop_on_error and report.errors:
+                    break
+        
+        report.failed = len(report.errors)
+        report.succeeded = sum(1 for result in report.results if result is not None)
+        report.first_failure = min(report.errors) if report.errors else None
+        return report
+
+    @_instrumented
+    def get_usage_summary(self, agent_id: str, party: Optional[str] = None) -> UsageSummary:
+        """
+        Get usage summary for an agent
+        
+        Served from ``summary_source`` in time independent of the agent's
+        token count when one is configured and ready; otherwise every token
+        contract for the agent is queried and summed.
+        """
+        summary = self._maintained_usage_summary(agent_id, party)
+        if summary is not None:
+            return summary
+        tokens = self.query_usage_tokens({'agentId': agent_id}, party)
+        return self._build_usage_summary(agent_id, tokens)
+
+    @_instrumented
+    def get_fleet_usage(
+        self,
+        agent_ids: Optional[List[str]] = None,
+        party: Optional[str] = None,
+        use_numpy: Optional[bool] = None
+    ) -> FleetUsageSummary:
+        """
+        Usage summaries for many agents from a single streamed token query
+        
+        Tokens are read in one pass into array columns and grouped by agentId
+        and usageType (vectorized with NumPy when installed), instead of one
+        /v1/query per agent.
+        
+        Args:
+            agent_ids: Agents to summarise; None covers every agent holding a
+                usage token visible to the party. Requested agents without
+                tokens get an empty summary.
+            party: Party to query for (optional)
+            use_numpy: Force (True) or disable (False) NumPy aggregation;
+                None uses it when available
+            
+        Returns:
+            FleetUsageSummary with per-agent UsageSummary objects and totals
+        """
+        wanted = set(agent_ids) if agent_ids is not None else None
+        predicate = None if wanted is None else (lambda token: token['argument'].get('agentId') in wanted)
+        columns = _UsageColumns()
+        for token in self.iter_usage_tokens(None, party, predicate):
+            columns.append(token)
+        return self._build_fleet_summary(columns, agent_ids, use_numpy)
+
+    def close(self):
+        """Close the pooled session and shut down the fan-out thread pool"""
+        if hasattr(self.session, 'close'):
+            self.session.close()
+        with self._fan_out_lock:
+            pool, self._fan_out_pool = self._fan_out_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    # ========== CONTEXT MANAGER SUPPORT ==========
+
+    def __enter__(self):
+        """Context manager entry"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        self.close()
+
+
+class AsyncAgentTokenizationSDK(_AgentTokenizationCommands):
+    """
+    Asyncio variant of AgentTokenizationSDK
+    
+    Exposes the same methods as coroutines on top of a pooled aiohttp
+    connector (HTTP/1.1 keep-alive). A semaphore caps the number of
+    in-flight requests so one process can drive the JSON API hard without
+    opening an unbounded number of sockets.
+    
+    Requires the ``async`` extra (``pip install agent-tokenization-sdk[async]``).
+    """
+    
+    def __init__(
+        self,
+        base_url: str = "http://localhost:7575",
+        party: str = "Alice",
+        package_id: str = "your-package-id",
+        timeout: float = 30,
+        headers: Optional[Dict[str, str]] = None,
+        max_connections: int = 100,
+        max_in_flight: int = 100,
+        keepalive_timeout: float = 30.0,
+        summary_source: Optional[Any] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        json_codec: Optional[JSONCodec] = None,
+        lazy_payloads: bool = False
+    ):
+        """
+        Initialize the async SDK
+        
+        Args:
+            base_url: Base URL of the DAML JSON API
+            party: Default party for transactions
+            package_id: Package ID of deployed DAR
+            timeout: Default per-request timeout in seconds
+            headers: Additional headers for requests
+            max_connections: Size of the keep-alive connection pool
+            max_in_flight: Maximum number of concurrent requests
+            keepalive_timeout: Seconds an idle pooled connection is kept open
+            summary_source: Optional maintained usage aggregate consulted by
+                get_usage_summary (see AgentTokenizationSDK)
+            retry_policy: Optional RetryPolicy; None makes a single attempt
+            circuit_breaker: Optional CircuitBreaker applied per endpoint
+            json_codec: JSONCodec for request and response bodies (see
+                AgentTokenizationSDK)
+            lazy_payloads: Defer decoding of query/fetch contract payloads
+        """
+        if aiohttp is None:
+            raise AgentTokenizationError(
+                "aiohttp is required for AsyncAgentTokenizationSDK "
+                "(pip install agent-tokenization-sdk[async])",
+                "DEPENDENCY_ERROR"
+            )
+        if max_in_flight < 1:
+            raise AgentTokenizationError("max_in_flight must be at least 1", "VALIDATION_ERROR")
+        
+        self.base_url = base_url.rstrip('/')
+        self.party = party
+        self.package_id = package_id
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_in_flight = max_in_flight
+        self.keepalive_timeout = keepalive_timeout
+        self.json_codec = json_codec or default_json_codec()
+        self.lazy_payloads = lazy_payloads
+        self.summary_source = summary_source
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self._transport_stats = Counter()
+        self._stats_lock = threading.Lock()
+        
+        self.headers = {'Content-Type': 'application/json'}
+        if headers:
+            self.headers.update(headers)
+        
+        # Created lazily so the session and semaphore bind to the running loop
+        self.session = None
+        self._semaphore = None
+
+    async def _get_session(self):
+        """Return the pooled client session, creating it on first use"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self.session
+
+    async def _make_request(
+        self,
+        endpoint: str,
+        method: str = "GET",
+        data: Optional[Dict] = None,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """Make HTTP request to DAML JSON API under the retry policy and circuit breaker"""
+        deadline = self._call_deadline()
+        attempt = 0
+        while True:
+            attempt += 1
+            attempt_timeout = self._before_attempt(endpoint, deadline, timeout if timeout is not None else self.timeout)
+            try:
+                result = await self._send(endpoint, method, data, party, attempt_timeout)
+            except AgentTokenizationError as e:
+                delay = self._after_attempt(endpoint, method, data, e, attempt, deadline)
+                if delay is None:
+                    raise
+                logger.warning(f"Retrying {endpoint} in {delay:.2f}s after attempt {attempt}: {str(e)}")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Includes cancellation (e.g. asyncio.wait_for), which must not strand a half-open probe
+                self._abandon_attempt(endpoint)
+                raise
+            self._after_attempt(endpoint, method, data, None, attempt, deadline)
+            return result
+
+    async def _send(
+        self,
+        endpoint: str,
+        method: str,
+        data: Optional[Dict],
+        party: Optional[str],
+        timeout: float
+    ) -> Dict:
+        """Send and decode one request"""
+        session = await self._get_session()
+        url = f"{self.base_url}{endpoint}"
+        request_party = party or self.party
+        
+        headers = {'Authorization': f'Bearer {request_party}'}
+        request_timeout = aiohttp.ClientTimeout(total=timeout)
+        
+        try:
+            async with self._semaphore:
+                async with session.request(
+                    method.upper(),
+                    url,
+                    headers=headers,
+                    data=self._encode_body(data) if data is not None and method.upper() != "GET" else None,
+                    timeout=request_timeout
+                ) as response:
+                    response.raise_for_status()
+                    
+                    # Handle different content types
+                    content_type = response.headers.get('content-type', '')
+                    if 'application/json' in content_type:
+                        return self._decode_body(endpoint, await response.read())
+                    else:
+                        return {'result': await response.text()}
+                    
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"API request failed: {str(e) or type(e).__name__}")
+            raise AgentTokenizationError(
+                f"Network error: {str(e) or type(e).__name__}", "NETWORK_ERROR",
+                {"url": url, "status": getattr(e, 'status', None)}
+            )
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON response: {str(e)}")
+            raise AgentTokenizationError(f"Invalid JSON response: {str(e)}", "JSON_ERROR")
+
+    async def health_check(self, timeout: Optional[float] = None) -> Dict:
+        """Check if the API is ready"""
+        return await self._make_request('/readyz', timeout=timeout)
+
+    async def get_parties(self, timeout: Optional[float] = None) -> List[str]:
+        """Get list of parties in the system"""
+        result = await self._make_request('/v1/parties', timeout=timeout)
+        return result.get('result', result)
+
+    # ========== AGENT MANAGEMENT ==========
+
+    async def register_agent(
+        self,
+        agent: Union[Agent, Dict],
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """Register a new AI agent"""
+        payload = self._register_agent_payload(agent, party)
+        return await self._make_request('/v1/create', 'POST', payload, party, timeout)
+
+    async def _query(
+        self,
+        entity_name: str,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict]:
+        """Run a /v1/query against a single template"""
+        payload = self._query_payload(entity_name, filter_criteria)
+        result = await self._make_request('/v1/query', 'POST', payload, party, timeout)
+        return result.get('result', result)
+
+    async def query_agents(
+        self,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict]:
+        """Query agents by criteria"""
+        return await self._query("AgentRegistration", filter_criteria, party, timeout)
+
+    async def get_agent(
+        self,
+        contract_id: str,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Get a specific agent by contract ID via /v1/fetch"""
+        payload = self._fetch_payload("AgentRegistration", contract_id)
+        result = await self._make_request('/v1/fetch', 'POST', payload, party, timeout)
+        return result.get('result') if isinstance(result, dict) else None
+
+    async def get_agent_by_id(
+        self,
+        agent_id: str,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Get a specific agent by agent ID"""
+        agents = await self.query_agents({'agentId': agent_id}, party, timeout)
+        return agents[0] if agents else None
+
+    async def update_agent_status(
+        self,
+        contract_id: str,
+        is_active: bool,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """Update agent status (activate/deactivate)"""
+        payload = self._update_agent_status_payload(contract_id, is_active)
+        return await self._make_request('/v1/exercise', 'POST', payload, party, timeout)
+
+    # ========== USAGE TOKEN MANAGEMENT ==========
+
+    async def create_usage_token(
+        self,
+        token: Union[UsageToken, Dict],
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """Create a usage token for an agent"""
+        payload = self._create_usage_token_payload(token, party)
+        return await self._make_request('/v1/create', 'POST', payload, party, timeout)
+
+    async def query_usage_tokens(
+        self,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict]:
+        """Query usage tokens by criteria"""
+        return await self._query("AgentUsageToken", filter_criteria, party, timeout)
+
+    # ========== STREAMING QUERIES ==========
+
+    async def iter_query(
+        self,
+        entity_name: str,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        predicate: Optional[Callable[[Dict], bool]] = None,
+        timeout: Optional[float] = None,
+        chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[Dict]:
+        """
+        Yield contracts one at a time as the response streams in
+        
+        See AgentTokenizationSDK.iter_query. ``timeout`` bounds connecting and
+        each socket read rather than the whole download. Not retried, since
+        contracts may already have been yielded when a failure occurs.
+        """
+        session = await self._get_session()
+        url = f"{self.base_url}/v1/query"
+        headers = {'Authorization': f'Bearer {party or self.party}'}
+        payload = self._query_payload(entity_name, filter_criteria)
+        read_timeout = self._before_attempt('/v1/query', self._call_deadline(), timeout if timeout is not None else self.timeout)
+        parser = _ResultStreamParser()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        responded = False
+        settled = False
+
+        def settle(success: bool):
+            # The circuit sees exactly one outcome per request, as in _send_with_policy
+            nonlocal settled
+            if not settled:
+                settled = True
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record('/v1/query', success)
+        
+        try:
+            async with self._semaphore:
+                async with session.post(
+                    url,
+                    headers=headers,
+                    data=self.json_codec.dumps(payload),
+                    timeout=aiohttp.ClientTimeout(total=None, sock_connect=read_timeout, sock_read=read_timeout)
+                ) as response:
+                    response.raise_for_status()
+                    responded = True
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        for contract in parser.feed(decoder.decode(chunk)):
+                            if predicate is None or predicate(contract):
+                                yield contract
+                    for contract in parser.feed(decoder.decode(b'', final=True), final=True):
+                        if predicate is None or predicate(contract):
+                            yield contract
+            settle(True)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"API request failed: {str(e) or type(e).__name__}")
+            error = AgentTokenizationError(
+                f"Network error: {str(e) or type(e).__name__}", "NETWORK_ERROR",
+                {"url": url, "status": getattr(e, 'status', None)}
+            )
+            settle(not CircuitBreaker.is_failure(error))
+            raise error
+        except json.JSONDecodeError as e:
+            settle(True)
+            logger.error(f"Invalid JSON response: {str(e)}")
+            raise AgentTokenizationError(f"Invalid JSON response: {str(e)}", "JSON_ERROR")
+        except BaseException:
+            # The consumer stopped early or the task was cancelled: a response
+            # means the endpoint is healthy, otherwise there is no outcome
+            if responded:
+                settle(True)
+            elif not settled:
+                settled = True
+                self._abandon_attempt('/v1/query')
+            raise
+
+    def iter_agents(
+        self,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        predicate: Optional[Callable[[Dict], bool]] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict]:
+        """Stream agent registrations (see iter_query)"""
+        return self.iter_query("AgentRegistration", filter_criteria, party, predicate, timeout)
+
+    def iter_usage_tokens(
+        self,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        predicate: Optional[Callable[[Dict], bool]] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict]:
+        """Stream usage tokens (see iter_query)"""
+        return self.iter_query("AgentUsageToken", filter_criteria, party, predicate, timeout)
+
+    async def query_usage_token_columns(
+        self,
+        filter_criteria: Optional[Dict] = None,
+        party: Optional[str] = None,
+        predicate: Optional[Callable[[Dict], bool]] = None,
+        timeout: Optional[float] = None
+    ) -> UsageTokenColumns:
+        """Query usage tokens straight into columns (see AgentTokenizationSDK.query_usage_token_columns)"""
+        columns = UsageTokenColumns()
+        async for token in self.iter_usage_tokens(filter_criteria, party, predicate, timeout):
+            columns.append(token)
+        return columns
+
+    async def record_usage(
+        self,
+        contract_id: str,
+        usage_amount: int,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None,
+        command_id: Optional[str] = None
+    ) -> Dict:
+        """Record usage against a token (``command_id`` enables ledger deduplication)"""
+        payload = self._record_usage_payload(contract_id, usage_amount, command_id)
+        return await self._make_request('/v1/exercise', 'POST', payload, party, timeout)
+
+    # ========== SYSTEM QUERIES ==========
+
+    async def get_system_stats(
+        self,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Get system statistics and metrics"""
+        result = await self._make_request('/v1/query', 'POST', self._system_stats_payload(), party, timeout)
+        contracts = result.get('result', result)
+        return contracts[0]['argument'] if contracts else None
+
+    # ========== CONVENIENCE METHODS ==========
+
+    async def get_agent_data(
+        self,
+        agent_id: str,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[Dict]:
+        """Get all data for an agent (agent + tokens + usage)"""
+        agents, tokens = await asyncio.gather(
+            self.query_agents({'agentId': agent_id}, party, timeout),
+            self.query_usage_tokens({'agentId': agent_id}, party, timeout)
+        )
+        if not agents:
+            return None
+        return self._build_agent_data(agents[0], tokens)
+
+    async def get_agent_details(
+        self,
+        agent_id: str,
+        party: Optional[str] = None,
+        max_events: Optional[int] = 50,
+        timeout: Optional[float] = None
+    ) -> Optional[AgentDetails]:
+        """Agent, tokens, attributes and recent usage events (see AgentTokenizationSDK.get_agent_details)"""
+        details = await self.get_agents_details([agent_id], party, max_events, timeout=timeout)
+        return details.get(agent_id)
+
+    async def _scan(self, entity_name: str, party: Optional[str], predicate, timeout: Optional[float]) -> List[Dict]:
+        return [contract async for contract in self.iter_query(entity_name, None, party, predicate, timeout)]
+
+    async def get_agents_details(
+        self,
+        agent_ids: List[str],
+        party: Optional[str] = None,
+        max_events: Optional[int] = 50,
+        scan_threshold: int = 20,
+        timeout: Optional[float] = None
+    ) -> Dict[str, AgentDetails]:
+        """Composite fetch joined by agentId (see AgentTokenizationSDK.get_agents_details)"""
+        agent_ids = list(dict.fromkeys(agent_ids))
+        wanted = set(agent_ids)
+        if len(agent_ids) <= scan_threshold:
+            calls = [
+                self._query(entity, {'agentId': agent_id}, party, timeout)
+                for entity in self.DETAIL_TEMPLATES for agent_id in agent_ids
+            ]
+        else:
+            calls = [
+                self._scan(entity, party, lambda contract: contract['argument'].get('agentId') in wanted, timeout)
+                for entity in self.DETAIL_TEMPLATES
+            ]
+        results = await asyncio.gather(*calls)
+        per_template = len(results) // len(self.DETAIL_TEMPLATES) if results else 0
+        by_template = {
+            entity: self._group_by(
+                [contract for chunk in results[index * per_template:(index + 1) * per_template] for contract in chunk],
+                'agentId', wanted
+            )
+            for index, entity in enumerate(self.DETAIL_TEMPLATES)
+        }
+        
+        token_ids = [
+            token['argument'].get('tokenId')
+            for tokens in by_template["AgentUsageToken"].values() for token in tokens
+        ]
+        token_set = set(token_ids)
+        if not token_ids:
+            events = []
+        elif len(token_ids) <= scan_threshold:
+            chunks = await asyncio.gather(*(
+                self._query("UsageEvent", {'tokenId': token_id}, party, timeout) for token_id in token_ids
+            ))
+            events = [event for chunk in chunks for event in chunk]
+        else:
+            events = await self._scan(
+                "UsageEvent", party, lambda event: event['argument'].get('tokenId') in token_set, timeout
+            )
+        return self._build_agent_details(agent_ids, by_template, self._group_by(events, 'tokenId', token_set), max_events)
+
+    async def bulk_register_agents(
+        self,
+        agents: List[Union[Agent, Dict]],
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict]:
+        """Bulk register multiple agents concurrently (bounded by max_in_flight)"""
+        async def register(agent):
+            try:
+                return await self.register_agent(agent, party, timeout)
+            except Exception as e:
+                logger.error(f"Failed to register agent: {str(e)}")
+                return {'error': str(e)}
+        
+        return list(await asyncio.gather(*(register(agent) for agent in agents)))
+
+    async def get_usage_summary(
+        self,
+        agent_id: str,
+        party: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> UsageSummary:
+        """Get usage summary for an agent, from ``summary_source`` when ready"""
+        summary = self._maintained_usage_summary(agent_id, party)
+        if summary is not None:
+            return summary
+        tokens = await self.query_usage_tokens({'agentId': agent_id}, party, timeout)
+        return self._build_usage_summary(agent_id, tokens)
+
+    async def get_fleet_usage(
+        self,
+        agent_ids: Optional[List[str]] = None,
+        party: Optional[str] = None,
+        use_numpy: Optional[bool] = None,
+        timeout: Optional[float] = None
+    ) -> FleetUsageSummary:
+        """Usage summaries for many agents in one pass (see AgentTokenizationSDK.get_fleet_usage)"""
+        wanted = set(agent_ids) if agent_ids is not None else None
+        predicate = None if wanted is None else (lambda token: token['argument'].get('agentId') in wanted)
+        columns = _UsageColumns()
+        async for token in self.iter_usage_tokens(None, party, predicate, timeout):
+            columns.append(token)
+        return self._build_fleet_summary(columns, agent_ids, use_numpy)
+
+    # ========== CONTEXT MANAGER SUPPORT ==========
+
+    async def close(self):
+        """Close the pooled session and its connections"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self):
+        """Async context manager entry"""
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit"""
+        await self.close()
+
+
+class UsageRecorder:
+    """
+    Batching front end for record_usage
+    
+    ``record()`` only buffers: usage is summed per token contract and a
+    background thread submits one RecordUsage exercise per token every
+    ``window`` seconds, or sooner once ``max_batch`` records are waiting, so
+    thousands of metering calls become a handful of ledger transactions.
+    
+    Delivery is at-least-once and deduplicated by the ledger. A failed
+    submission is retried with the same ledger command ID: if an earlier
+    attempt actually landed, the ledger rejects the retry as a duplicate
+    (409), which counts as delivered. Optional ``dedup_id``s drop repeated
+    deliveries from the metering pipeline itself.
+    
+    RecordUsage archives the token and creates a replacement; callers keep
+    using the contract ID they started with and the recorder tracks the
+    latest one. The first submission for a token fetches it once to learn its
+    ``tokenId``; when the tracked contract turns out to be stale (404, a
+    duplicate, or a batch about to be given up), the live contract is
+    re-resolved by ``tokenId`` so later batches go to it.
+    
+    Once ``max_buffered`` records are undelivered, ``record()`` blocks
+    (back-pressure) until submissions catch up. ``close()`` flushes
+    everything still buffered; whatever is left when its timeout expires is
+    reported to ``on_error``.
+    """
+
+    def __init__(
+        self,
+        sdk: 'AgentTokenizationSDK',
+        window: float = 1.0,
+        max_batch: int = 1000,
+        max_buffered: int = 100000,
+        party: Optional[str] = None,
+        max_workers: int = 4,
+        max_attempts: int = 5,
+        dedup_size: int = 100000,
+        on_error: Optional[Callable[[str, int, Exception], None]] = None
+    ):
+        """
+        Args:
+            sdk: AgentTokenizationSDK used for submission
+            window: Seconds usage is accumulated before it is submitted
+            max_batch: Buffered records that trigger an early flush
+            max_buffered: Undelivered records at which record() blocks
+            party: Party exercising RecordUsage (defaults to the SDK party)
+            max_workers: Tokens submitted concurrently during a flush
+            max_attempts: Submissions of one batch before it is given up and
+                reported to ``on_error``
+            dedup_size: Number of recent ``dedup_id``s remembered
+            on_error: ``callback(contract_id, amount, error)`` for batches
+                given up after ``max_attempts`` or abandoned by ``close()``
+        """
+        if window <= 0 or max_batch < 1 or max_buffered < 1 or max_workers < 1 or max_attempts < 1:
+            raise AgentTokenizationError("Invalid UsageRecorder limits", "VALIDATION_ERROR")
+        self.sdk = sdk
+        self.window = window
+        self.max_batch = max_batch
+        self.max_buffered = max_buffered
+        self.party = party
+        self.max_attempts = max_attempts
+        self.dedup_size = dedup_size
+        self.on_error = on_error
+        
+        # Keyed by the contract ID callers use; _latest maps it to the live contract
+        self._pending = {}
+        self._retries = deque()
+        self._latest = {}
+        self._origin = {}
+        self._token_ids = {}
+        self._seen = OrderedDict()
+        self._buffered = 0
+        self._flush_requested = False
+        self._closed = False
+        self._abandon = False
+        self._cond = threading.Condition()
+        self._stats = Counter()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._thread = threading.Thread(target=self._run, name="usage-recorder", daemon=True)
+        self._thread.start()
+
+    def record(
+        self,
+        contract_id: str,
+        usage_amount: int,
+        dedup_id: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Buffer usage for a token
+        
+        Args:
+            contract_id: Usage token contract ID (the original ID stays valid
+                after the recorder has exercised it)
+            usage_amount: Amount of usage to add
+            dedup_id: Identifier of this usage record; repeats are ignored
+            timeout: Seconds to wait when the buffer is full (None waits forever)
+            
+        Returns:
+            False if ``dedup_id`` was already seen, True otherwise
+        """
+        with self._cond:
+            if self._closed:
+                raise AgentTokenizationError("UsageRecorder is closed", "VALIDATION_ERROR")
+            if dedup_id is not None:
+                if dedup_id in self._seen:
+                    self._seen.move_to_end(dedup_id)
+                    self._stats['duplicates'] += 1
+                    return False
+            
+            if self._buffered >= self.max_buffered:
+                self._stats['backpressure_waits'] += 1
+                if not self._cond.wait_for(lambda: self._buffered < self.max_buffered or self._closed, timeout):
+                    raise AgentTokenizationError(
+                        "Usage recorder buffer is full", "BACKPRESSURE", {"buffered": self._buffered}
+                    )
+                if self._closed:
+                    raise AgentTokenizationError("UsageRecorder is closed", "VALIDATION_ERROR")
+            
+            if dedup_id is not None:
+                self._seen[dedup_id] = None
+                if len(self._seen) > self.dedup_size:
+                    self._seen.popitem(last=False)
+            contract_id = self._origin.get(contract_id, contract_id)
+            entry = self._pending.setdefault(contract_id, [0, 0])
+            entry[0] += usage_amount
+            entry[1] += 1
+            self._buffered += 1
+            self._stats['records'] += 1
+            if self._buffered >= self.max_batch:
+                self._flush_requested = True
+                self._cond.notify_all()
+            return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Submit everything buffered now and wait until it is delivered or given up"""
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._buffered == 0, timeout)
+
+    def current_contract_id(self, contract_id: str) -> str:
+        """Latest contract ID for a token the recorder has exercised"""
+        with self._cond:
+            origin = self._origin.get(contract_id, contract_id)
+            return self._latest.get(origin, origin)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Records, duplicates, submissions, retries, failures and current buffer size"""
+        with self._cond:
+            return dict(self._stats, buffered=self._buffered)
+
+    # ========== SUBMISSION ==========
+
+    def _take_batches(self) -> List[List]:
+        """Retries first, then new pending usage for tokens without a retry; caller holds the lock"""
+        batches = []
+        retrying = set()
+        while self._retries:
+            batch = self._retries.popleft()
+            retrying.add(batch[0])
+            batches.append(batch)
+        for contract_id in [key for key in self._pending if key not in retrying]:
+            amount, records = self._pending.pop(contract_id)
+            # [contract ID, amount, command ID, attempts, records]
+            batches.append([contract_id, amount, f"usage-{uuid.uuid4().hex}", 0, records])
+        return batches
+
+    def _token_id(self, contract_id: str, current: str) -> Optional[str]:
+        """tokenId of the token first recorded as ``contract_id``, fetched once"""
+        token_id = self._token_ids.get(contract_id)
+        if token_id is None:
+            try:
+                contract = self.sdk._fetch("AgentUsageToken", current, self.party)
+            except AgentTokenizationError as e:
+                logger.warning(f"Could not fetch usage token {current}: {str(e)}")
+                return None
+            token_id = ((contract or {}).get('argument') or (contract or {}).get('payload') or {}).get('tokenId')
+            if token_id is not None:
+                self._token_ids[contract_id] = token_id
+        return token_id
+
+    def _resolve(self, contract_id: str, current: str) -> Optional[str]:
+        """Query the token's live contract by tokenId and track it; None if unknown"""
+        token_id = self._token_ids.get(contract_id)
+        if token_id is None:
+            return None
+        self.sdk._invalidate("AgentUsageToken")
+        try:
+            contracts = self.sdk.query_usage_tokens({'tokenId': token_id}, self.party)
+        except AgentTokenizationError as e:
+            logger.warning(f"Could not re-resolve usage token {token_id}: {str(e)}")
+            return None
+        if len(contracts) != 1:
+            return None
+        live = contracts[0]['contractId']
+        self._advance(contract_id, current, live)
+        return live
+
+    def _advance(self, contract_id: str, current: str, new_contract_id: str):
+        """Point ``contract_id`` (and lookups by ``current``) at ``new_contract_id``"""
+        if new_contract_id == current:
+            return
+        with self._cond:
+            self._origin.pop(current, None)
+            self._origin[new_contract_id] = contract_id
+            self._latest[contract_id] = new_contract_id
+
+    def _submit(self, batch: List):
+        contract_id, amount, command_id, attempts, records = batch
+        current = self.current_contract_id(contract_id)
+        self._token_id(contract_id, current)
+        try:
+            result = self.sdk.record_usage(current, amount, self.party, command_id=command_id)
+        except Exception as e:
+            status = (getattr(e, 'details', None) or {}).get('status')
+            if status == 409:
+                # Duplicate command: an earlier attempt landed but its response was lost
+                self._resolve(contract_id, current)
+                self._delivered(records)
+                return
+            batch[3] = attempts + 1
+            retry = batch[3] < self.max_attempts and getattr(e, 'code', None) != "VALIDATION_ERROR"
+            if status == 404 or not retry:
+                # The token moved on (possibly by this very command); the retry
+                # goes to the live contract and the ledger deduplicates it
+                self._resolve(contract_id, current)
+            if retry:
+                with self._cond:
+                    self._stats['retries'] += 1
+                    self._retries.append(batch)
+                return
+            logger.error(f"Giving up recording {amount} usage on {contract_id}: {str(e)}")
+            if self.on_error:
+                self.on_error(contract_id, amount, e)
+            with self._cond:
+                self._stats['failed_records'] += records
+                self._buffered -= records
+                self._cond.notify_all()
+            return
+        
+        new_contract_id = (result.get('result') or {}).get('exerciseResult')
+        if isinstance(new_contract_id, str):
+            self._advance(contract_id, current, new_contract_id)
+        self._delivered(records)
+
+    def _delivered(self, records: int):
+        with self._cond:
+            self._stats['submissions'] += 1
+            self._stats['delivered_records'] += records
+            self._buffered -= records
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and not self._flush_requested:
+                    self._cond.wait(self.window)
+                if self._abandon:
+                    break
+                self._flush_requested = False
+                batches = self._take_batches()
+                if not batches and self._closed:
+                    break
+            if batches:
+                list(self._executor.map(self._submit, batches))
+                if self._retries and not self._closed:
+                    time.sleep(min(self.window, 1.0))
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Flush buffered usage (retrying up to max_attempts) and stop the
+        flusher; usage still undelivered after ``timeout`` seconds is
+        reported to ``on_error`` and counted as ``abandoned_records``
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # The flusher stops before its next flush; submissions in flight finish first
+            with self._cond:
+                self._abandon = True
+                self._cond.notify_all()
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+        batches = []
+        with self._cond:
+            # Pending usage for a token with a queued retry is only handed out by the next call
+            while self._pending or self._retries:
+                batches += self._take_batches()
+        if not batches:
+            return
+        error = AgentTokenizationError("UsageRecorder closed before usage was delivered", "DEADLINE_EXCEEDED")
+        for contract_id, amount, _, _, records in batches:
+            logger.error(f"Abandoning {amount} usage on {contract_id}: {str(error)}")
+            if self.on_error:
+                self.on_error(contract_id, amount, error)
+            with self._cond:
+                self._stats['abandoned_records'] += records
+                self._buffered -= records
+                self._cond.notify_all()
+
+    def __enter__(self):
+        """Context manager entry"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit (flushes)"""
+        self.close()
+
+
+class CommandLog:
+    """
+    Durable local write-ahead log for usage and create commands
+    
+    ``append_*`` writes the fully built JSON API command to an append-only
+    JSON-lines file (fsync'd by default) and returns its ID immediately; a
+    background thread drains the log to the ledger in order, retrying with
+    exponential backoff while the JSON API or proxy is unavailable. Caller
+    latency is the cost of a local append, independent of the ledger.
+    
+    The command ID doubles as the ledger ``commandId``, so a command that was
+    submitted but not yet marked done before a crash is deduplicated by the
+    ledger when it is replayed on restart (a 409 counts as delivered).
+    Commands still failing after ``max_attempts``, and commands the JSON API
+    rejects outright (4xx other than 408/429), are moved aside as failed so
+    they do not hold up the commands behind them; ``retry_failed()``
+    re-queues them, nothing is dropped. Contract IDs re-created by
+    RecordUsage are tracked and persisted, so later usage appended against
+    the original ID still reaches the live contract. When that tracking is
+    stale (a duplicate whose response was lost, or a 404) the live contract
+    is re-resolved by the token's ``tokenId``.
+    """
+
+    def __init__(
+        self,
+        sdk: 'AgentTokenizationSDK',
+        path: str = "agent-commands.log",
+        fsync: bool = True,
+        max_attempts: int = 20,
+        retry_delay: float = 0.5,
+        max_retry_delay: float = 30.0,
+        compact_bytes: int = 16 * 1024 * 1024,
+        on_error: Optional[Callable[[Dict, Exception], None]] = None
+    ):
+        """
+        Args:
+            sdk: AgentTokenizationSDK used to build and submit commands
+            path: Log file; commands left in it by a previous run are replayed
+            fsync: fsync every append so acknowledged commands survive power loss
+            max_attempts: Submissions of one command before it is marked failed
+            retry_delay: Initial delay between retries of the head command
+            max_retry_delay: Upper bound for the exponential retry delay
+            compact_bytes: Rewrite the log once it is drained and larger than this
+            on_error: ``callback(command, error)`` when a command is marked failed
+        """
+        self.sdk = sdk
+        self.path = path
+        self.fsync = fsync
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.compact_bytes = compact_bytes
+        self.on_error = on_error
+        
+        self._queue = deque()
+        self._failed = OrderedDict()
+        self._latest = {}
+        self._origin = {}
+        self._token_ids = {}
+        self._stats = Counter()
+        self._cond = threading.Condition()
+        self._closed = False
+        # Set only when close() gives up on the backlog; cuts a retry backoff short
+        self._abandoned = threading.Event()
+        self._file = None
+        self._replay()
+        self._thread = threading.Thread(target=self._drain, name="command-log", daemon=True)
+        self._thread.start()
+
+    # ========== APPENDS ==========
+
+    def append_usage(self, contract_id: str, usage_amount: int, party: Optional[str] = None) -> str:
+        """Log a RecordUsage exercise; returns the command ID"""
+        command_id = uuid.uuid4().hex
+        payload = self.sdk._record_usage_payload(contract_id, usage_amount, command_id)
+        return self._append(command_id, '/v1/exercise', "AgentUsageToken", payload, party)
+
+    def append_agent(self, agent: Union[Agent, Dict], party: Optional[str] = None) -> str:
+        """Log an AgentRegistration create; returns the command ID"""
+        command_id = uuid.uuid4().hex
+        payload = self.sdk._with_command_id(self.sdk._register_agent_payload(agent, party), command_id)
+        return self._append(command_id, '/v1/create', "AgentRegistration", payload, party)
+
+    def append_usage_token(self, token: Union[UsageToken, Dict], party: Optional[str] = None) -> str:
+        """Log an AgentUsageToken create; returns the command ID"""
+        command_id = uuid.uuid4().hex
+        payload = self.sdk._with_command_id(self.sdk._create_usage_token_payload(token, party), command_id)
+        return self._append(command_id, '/v1/create', "AgentUsageToken", payload, party)
+
+    def _append(self, command_id: str, endpoint: str, entity: str, payload: Dict, party: Optional[str]) -> str:
+        command = {
+            'type': 'command', 'id': command_id, 'endpoint': endpoint,
+            'entity': entity, 'party': party, 'payload': payload
+        }
+        with self._cond:
+            if self._closed:
+                raise AgentTokenizationError("CommandLog is closed", "VALIDATION_ERROR")
+            self._write(command, sync=self.fsync)
+            self._queue.append(command)
+            self._stats['appended'] += 1
+            self._cond.notify_all()
+        return command_id
+
+    # ========== STATE ==========
+
+    @property
+    def pending(self) -> int:
+        """Commands not yet delivered (excluding failed ones)"""
+        with self._cond:
+            return len(self._queue)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Appended, delivered, retried and failed command counts plus backlog"""
+        with self._cond:
+            return dict(self._stats, pending=len(self._queue), failed=len(self._failed))
+
+    def failed(self) -> List[Dict]:
+        """Commands that exhausted max_attempts"""
+        with self._cond:
+            return list(self._failed.values())
+
+    def retry_failed(self) -> int:
+        """Re-queue every failed command; returns how many were re-queued"""
+        with self._cond:
+            commands = list(self._failed.values())
+            for command in commands:
+                self._write({'type': 'requeue', 'id': command['id']}, sync=self.fsync)
+                self._queue.append(command)
+            self._failed.clear()
+            self._cond.notify_all()
+            return len(commands)
+
+    def current_contract_id(self, contract_id: str) -> str:
+        """Latest contract ID for a token the log has exercised"""
+        with self._cond:
+            origin = self._origin.get(contract_id, contract_id)
+            return self._latest.get(origin, origin)
+
+    def wait_drained(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued command has been delivered or marked failed"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue, timeout)
+
+    # ========== FILE HANDLING ==========
+
+    def _write(self, record: Dict, sync: bool = False):
+        """Append one record; caller holds the lock"""
+        self._file.write(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n')
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def _set_alias(self, origin: str, current: str, contract_id: str):
+        self._origin.pop(current, None)
+        self._origin[contract_id] = origin
+        self._latest[origin] = contract_id
+
+    def _replay(self):
+        """Rebuild the queue, failures and contract aliases from an existing log"""
+        commands = OrderedDict()
+        good_end = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final write from a crash; everything before it is intact
+                        logger.warning(f"Ignoring incomplete record at byte {good_end} of {self.path}")
+                        break
+                    good_end += len(line)
+                    kind = record.get('type')
+                    if kind == 'command':
+                        commands[record['id']] = record
+                    elif kind == 'done':
+                        commands.pop(record['id'], None)
+                        self._failed.pop(record['id'], None)
+                    elif kind == 'failed' and record['id'] in commands:
+                        self._failed[record['id']] = commands.pop(record['id'])
+                    elif kind == 'requeue' and record['id'] in self._failed:
+                        commands[record['id']] = self._failed.pop(record['id'])
+                    if record.get('contractId') and record.get('origin'):
+                        self._set_alias(record['origin'], record.get('previous', record['origin']), record['contractId'])
+                    if record.get('tokenId') and record.get('origin'):
+                        self._token_ids[record['origin']] = record['tokenId']
+        self._queue.extend(commands.values())
+        self._file = open(self.path, 'ab')
+        self._file.truncate(good_end)
+        if self._queue:
+            logger.info(f"Replaying {len(self._queue)} undelivered commands from {self.path}")
+
+    def _compact(self):
+        """Rewrite the log with only live state once it is drained; caller holds the lock"""
+        if self._queue or self._file.tell() < self.compact_bytes:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            for origin, contract_id in self._latest.items():
+                alias = {'type': 'alias', 'origin': origin, 'contractId': contract_id}
+                if origin in self._token_ids:
+                    alias['tokenId'] = self._token_ids[origin]
+                fh.write(json.dumps(alias).encode('utf-8') + b'\n')
+            for command in self._failed.values():
+                fh.write(json.dumps(command).encode('utf-8') + b'\n')
+                fh.write(json.dumps({'type': 'failed', 'id': command['id']}).encode('utf-8') + b'\n')
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'ab')
+        self._stats['compactions'] += 1
+
+    # ========== DRAINING ==========
+
+    def _token_id(self, origin: str, current: str, party: Optional[str]) -> Optional[str]:
+        """tokenId of the token first exercised as ``origin``, fetched once"""
+        token_id = self._token_ids.get(origin)
+        if token_id is None:
+            try:
+                contract = self.sdk._fetch("AgentUsageToken", current, party)
+            except AgentTokenizationError as e:
+                logger.warning(f"Could not fetch usage token {current}: {str(e)}")
+                return None
+            token_id = ((contract or {}).get('argument') or (contract or {}).get('payload') or {}).get('tokenId')
+            if token_id is not None:
+                with self._cond:
+                    self._token_ids[origin] = token_id
+        return token_id
+
+    def _resolve(self, origin: str, party: Optional[str]) -> Optional[str]:
+        """Live contract ID of the token first exercised as ``origin``, queried by tokenId"""
+        token_id = self._token_ids.get(origin)
+        if token_id is None:
+            return None
+        self.sdk._invalidate("AgentUsageToken")
+        try:
+            contracts = self.sdk.query_usage_tokens({'tokenId': token_id}, party)
+        except AgentTokenizationError as e:
+            logger.warning(f"Could not re-resolve usage token {token_id}: {str(e)}")
+            return None
+        return contracts[0]['contractId'] if len(contracts) == 1 else None
+
+    @staticmethod
+    def _is_rejected(error: Exception) -> bool:
+        """Failures resubmitting cannot fix: validation errors and 4xx other than 408/429"""
+        if not isinstance(error, AgentTokenizationError):
+            return False
+        if error.code == "VALIDATION_ERROR":
+            return True
+        status = (error.details or {}).get('status')
+        return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+    def _submit(self, command: Dict) -> Optional[tuple]:
+        """Send one command; returns (origin, previous, new contract ID) for exercises"""
+        payload = command['payload']
+        party = command.get('party')
+        origin = None
+        if command['endpoint'] == '/v1/exercise':
+            origin = self._origin.get(payload['contractId'], payload['contractId'])
+            payload = dict(payload, contractId=self.current_contract_id(payload['contractId']))
+            self._token_id(origin, payload['contractId'], party)
+        try:
+            result = self.sdk._make_request(command['endpoint'], 'POST', payload, party)
+        except AgentTokenizationError as e:
+            status = (e.details or {}).get('status')
+            if status != 409 and (status != 404 or origin is None):
+                raise
+            live = self._resolve(origin, party) if origin is not None else None
+            if status == 409:
+                # Already accepted under this command ID before a crash or lost
+                # response; its re-created contract is found by tokenId
+                logger.warning(f"Command {command['id']} was already submitted; treating it as delivered")
+                return (origin, payload['contractId'], live) if live else None
+            if live is None or live == payload['contractId']:
+                raise
+            # The token moved on (possibly by this very command); resubmit to the
+            # live contract and let the ledger deduplicate the command ID
+            with self._cond:
+                self._set_alias(origin, payload['contractId'], live)
+            return self._submit(command)
+        finally:
+            self.sdk._invalidate(command['entity'])
+        if origin is not None:
+            new_contract_id = (result.get('result') or {}).get('exerciseResult')
+            if isinstance(new_contract_id, str):
+                return origin, payload['contractId'], new_contract_id
+        return None
+
+    def _drain(self):
+        attempts = 0
+        delay = self.retry_delay
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue or self._abandoned.is_set():
+                    return
+                command = self._queue[0]
+            try:
+                alias = self._submit(command)
+            except Exception as e:
+                attempts += 1
+                rejected = self._is_rejected(e)
+                if attempts < self.max_attempts and not rejected:
+                    self._stats['retries'] += 1
+                    # Not the condition: appends notify it and must not end the backoff
+                    if self._abandoned.wait(delay):
+                        return
+                    delay = min(delay * 2, self.max_retry_delay)
+                    continue
+                if rejected:
+                    logger.error(f"Command {command['id']} was rejected: {str(e)}")
+                else:
+                    logger.error(f"Command {command['id']} failed after {attempts} attempts: {str(e)}")
+                if self.on_error:
+                    self.on_error(command, e)
+                with self._cond:
+                    self._write({'type': 'failed', 'id': command['id'], 'error': str(e)}, sync=self.fsync)
+                    self._failed[command['id']] = self._queue.popleft()
+                    self._stats['failed_commands'] += 1
+                    self._cond.notify_all()
+            else:
+                with self._cond:
+                    done = {'type': 'done', 'id': command['id']}
+                    if alias is not None:
+                        origin, previous, contract_id = alias
+                        self._set_alias(origin, previous, contract_id)
+                        done.update(origin=origin, previous=previous, contractId=contract_id)
+                        if origin in self._token_ids:
+                            done['tokenId'] = self._token_ids[origin]
+                    # A lost done marker only causes a deduplicated resubmission
+                    self._write(done)
+                    self._queue.popleft()
+                    self._stats['delivered'] += 1
+                    self._compact()
+                    self._cond.notify_all()
+            attempts = 0
+            delay = self.retry_delay
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """
+        Stop accepting commands and wait up to ``timeout`` seconds (None waits
+        through every retry) for the backlog to drain; anything undelivered
+        stays in the log for the next run
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Undrained commands are already durable; the next run replays them
+            self._abandoned.set()
+            with self._cond:
+                self._cond.notify_all()
+            self._thread.join()
+        with self._cond:
+            self._file.close()
+
+    def __enter__(self):
+        """Context manager entry"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit (drains the backlog for up to 10 seconds)"""
+        self.close()
+
+
+class ContractReplica:
+    """
+    Live local replica of ledger contracts fed by the JSON API stream
+    
+    Subscribes to ``/v1/stream/query`` over a WebSocket and applies created
+    and archived events as deltas, so reads are served from memory instead
+    of polling ``/v1/query``. The last ledger offset is tracked; saving a
+    checkpoint and passing it back on restart resumes the stream from that
+    offset instead of re-downloading the active contract set.
+    
+    Per-agent, per-usage-type totals over AgentUsageToken contracts are
+    maintained as deltas arrive, so get_usage_summary costs the same for an
+    agent with thousands of tokens as for one with a single token. Pass the
+    replica as an SDK's ``summary_source`` to serve get_usage_summary from it.
+    
+    With ``compact=True`` AgentRegistration and AgentUsageToken contracts are
+    held as AgentRecord / UsageTokenRecord tuples with interned identifiers
+    instead of the raw JSON dicts, and reads return those records.
+    
+    Runs on asyncio (``await replica.run()``) or in a background thread
+    (``replica.start()``). Any stream failure (a dropped connection, an error
+    reported by the JSON API, an undecodable message or a raising callback)
+    clears ``ready`` until the stream is live again, is kept in
+    ``last_error``, and is followed by a reconnect from the last offset.
+    Requires the ``async`` extra.
+    """
+
+    DEFAULT_TEMPLATES = ("AgentRegistration", "AgentUsageToken", "UsageEvent")
+    RECORD_TYPES = {"AgentRegistration": AgentRecord, "AgentUsageToken": UsageTokenRecord}
+
+    def __init__(
+        self,
+        sdk: _AgentTokenizationCommands,
+        templates: Optional[List[str]] = None,
+        party: Optional[str] = None,
+        offset: Optional[str] = None,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_interval: float = 30.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        compact: bool = False
+    ):
+        """
+        Args:
+            sdk: AgentTokenizationSDK or AsyncAgentTokenizationSDK supplying
+                base_url, party and package_id
+            templates: Template entity names to replicate
+            party: Party whose view is replicated (defaults to the SDK party)
+            offset: Ledger offset to resume from (requires a matching state)
+            checkpoint_path: File holding offset + contracts; loaded on
+                construction if present and rewritten periodically and on stop
+            checkpoint_interval: Minimum seconds between automatic checkpoints
+            reconnect_delay: Initial delay before reconnecting after a drop
+            max_reconnect_delay: Upper bound for the exponential reconnect delay
+            compact: Store agents and usage tokens as immutable records
+        """
+        if aiohttp is None:
+            raise AgentTokenizationError(
+                "aiohttp is required for ContractReplica (pip install agent-tokenization-sdk[async])",
+                "DEPENDENCY_ERROR"
+            )
+        self.sdk = sdk
+        self.party = party or sdk.party
+        self.templates = list(templates or self.DEFAULT_TEMPLATES)
+        self.offset = offset
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.compact = compact
+        
+        self.ready = threading.Event()
+        self.last_error = None
+        self._contracts = {}
+        self._by_template = {name: {} for name in self.templates}
+        self._usage = {}
+        self._lock = threading.RLock()
+        self._created_callbacks = []
+        self._archived_callbacks = []
+        self._offset_callbacks = []
+        self._last_checkpoint = time.monotonic()
+        self._stopping = False
+        self._loop = None
+        self._stopped = None
+        self._task = None
+        self._thread = None
+        
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self.load_checkpoint(checkpoint_path)
+
+    # ========== CALLBACKS ==========
+
+    def on_created(self, callback: Callable[[Dict], None]):
+        """Register ``callback(contract)`` for every created contract"""
+        self._created_callbacks.append(callback)
+        return callback
+
+    def on_archived(self, callback: Callable[[str, Optional[Dict]], None]):
+        """Register ``callback(contract_id, contract)``; contract is None if it was never seen"""
+        self._archived_callbacks.append(callback)
+        return callback
+
+    def on_offset(self, callback: Callable[[str], None]):
+        """Register ``callback(offset)`` for every offset the stream reports"""
+        self._offset_callbacks.append(callback)
+        return callback
+
+    # ========== READS ==========
+
+    @staticmethod
+    def _entity_name(template_id: Union[str, Dict]) -> str:
+        if isinstance(template_id, dict):
+            return template_id.get('entityName', '')
+        return str(template_id).rsplit(':', 1)[-1]
+
+    def get(self, contract_id: str) -> Optional[Dict]:
+        """Active contract by ID, or None (a record for compacted templates)"""
+        with self._lock:
+            return self._contracts.get(contract_id)
+
+    def contracts(self, template: str) -> List[Dict]:
+        """All active contracts of a replicated template"""
+        with self._lock:
+            return list(self._by_template.get(template, {}).values())
+
+    def agents(self) -> List[Dict]:
+        """Active AgentRegistration contracts"""
+        return self.contracts("AgentRegistration")
+
+    def usage_tokens(self, agent_id: Optional[str] = None) -> List[Dict]:
+        """Active AgentUsageToken contracts, optionally for one agent"""
+        tokens = self.contracts("AgentUsageToken")
+        if agent_id is None:
+            return tokens
+        if self.compact:
+            return [token for token in tokens if token.agent_id == agent_id]
+        return [token for token in tokens if token['argument'].get('agentId') == agent_id]
+
+    def usage_events(self, token_id: Optional[str] = None) -> List[Dict]:
+        """Active UsageEvent contracts, optionally for one token"""
+        events = self.contracts("UsageEvent")
+        if token_id is None:
+            return events
+        return [event for event in events if event['argument'].get('tokenId') == token_id]
+
+    def get_usage_summary(self, agent_id: str) -> UsageSummary:
+        """Usage summary from the maintained per-type totals, independent of token count"""
+        with self._lock:
+            totals = self._usage.get(agent_id, {})
+            usage_by_type = {
+                usage_type: {'maxUsage': counts[2], 'currentUsage': counts[3], 'tokenCount': counts[0]}
+                for usage_type, counts in totals.items()
+            }
+            active_tokens = sum(counts[1] for counts in totals.values())
+        return _AgentTokenizationCommands._usage_summary_from_types(agent_id, usage_by_type, active_tokens)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._contracts)
+
+    # ========== DELTA APPLICATION ==========
+
+    def _reset(self):
+        with self._lock:
+            self._contracts.clear()
+            self._usage.clear()
+            for contracts in self._by_template.values():
+                contracts.clear()
+
+    def _apply_usage(self, token: Union[Dict, UsageTokenRecord], sign: int):
+        """Add (sign=1) or remove (sign=-1) a usage token from the per-agent totals; caller holds the lock"""
+        if isinstance(token, UsageTokenRecord):
+            agent_id, usage_type, is_active = token.agent_id, token.usage_type, token.is_active
+            max_usage, current_usage = token.max_usage, token.current_usage
+        else:
+            arg = token['argument']
+            agent_id = arg.get('agentId')
+            usage_type = arg.get('usageType', 'unknown')
+            is_active = arg.get('isActive', True)
+            max_usage, current_usage = arg.get('maxUsage', 0), arg.get('currentUsage', 0)
+        totals = self._usage.setdefault(agent_id, {})
+        # [tokenCount, activeTokens, maxUsage, currentUsage]
+        counts = totals.setdefault(usage_type, [0, 0, 0, 0])
+        counts[0] += sign
+        counts[1] += sign if is_active else 0
+        counts[2] += sign * max_usage
+        counts[3] += sign * current_usage
+        if counts[0] <= 0:
+            del totals[usage_type]
+            if not totals:
+                del self._usage[agent_id]
+
+    @staticmethod
+    def _check_message(message: Dict):
+        if message.get('errors'):
+            raise AgentTokenizationError(
+                f"Stream error: {message['errors']}", "STREAM_ERROR", {"status": message.get('status')}
+            )
+        if message.get('warnings'):
+            logger.warning(f"Stream warnings: {message['warnings']}")
+
+    def apply_message(self, message: Dict):
+        """Apply one stream message (events and/or offset) to the replica"""
+        self._check_message(message)
+        
+        for event in message.get('events', []):
+            if 'created' in event:
+                contract = event['created']
+                entity = self._entity_name(contract.get('templateId', ''))
+                record_type = self.RECORD_TYPES.get(entity) if self.compact else None
+                with self._lock:
+                    if contract['contractId'] in self._contracts:
+                        continue
+                # Stored only once every callback succeeded, so a replay after a
+                # failing callback delivers the contract again
+                for callback in self._created_callbacks:
+                    callback(contract)
+                stored = record_type.from_contract(contract) if record_type else contract
+                with self._lock:
+                    self._contracts[contract['contractId']] = stored
+                    self._by_template.setdefault(entity, {})[contract['contractId']] = stored
+                    if entity == "AgentUsageToken":
+                        self._apply_usage(stored, 1)
+            elif 'archived' in event:
+                archived = event['archived']
+                contract_id = archived['contractId']
+                entity = self._entity_name(archived.get('templateId', ''))
+                with self._lock:
+                    contract = self._contracts.get(contract_id)
+                for callback in self._archived_callbacks:
+                    callback(contract_id, contract)
+                with self._lock:
+                    contract = self._contracts.pop(contract_id, None)
+                    self._by_template.get(entity, {}).pop(contract_id, None)
+                    if contract is not None and entity == "AgentUsageToken":
+                        self._apply_usage(contract, -1)
+        
+        if 'offset' in message and message['offset'] is not None:
+            self.offset = message['offset']
+            self.ready.set()
+            for callback in self._offset_callbacks:
+                callback(self.offset)
+            if self.checkpoint_path and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+                self.save_checkpoint(self.checkpoint_path)
+
+    # ========== CHECKPOINTS ==========
+
+    def save_checkpoint(self, path: str):
+        """Atomically write the offset and active contracts to ``path``"""
+        with self._lock:
+            contracts = [
+                contract.to_contract() if isinstance(contract, tuple) else contract
+                for contract in self._contracts.values()
+            ]
+            state = {'offset': self.offset, 'party': self.party, 'contracts': contracts}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(state, fh)
+        os.replace(tmp_path, path)
+        self._last_checkpoint = time.monotonic()
+
+    def load_checkpoint(self, path: str):
+        """Restore offset and contracts written by save_checkpoint"""
+        with open(path, 'r', encoding='utf-8') as fh:
+            state = json.load(fh)
+        if state.get('party') not in (None, self.party):
+            raise AgentTokenizationError("Checkpoint belongs to a different party", "VALIDATION_ERROR")
+        self._reset()
+        self.apply_message({'events': [{'created': contract} for contract in state.get('contracts', [])]})
+        self.offset = state.get('offset')
+
+    # ========== STREAM LIFECYCLE ==========
+
+    def _stream_url(self) -> str:
+        base_url = self.sdk.base_url
+        if base_url.startswith('https://'):
+            base_url = 'wss://' + base_url[len('https://'):]
+        elif base_url.startswith('http://'):
+            base_url = 'ws://' + base_url[len('http://'):]
+        return f"{base_url}/v1/stream/query"
+
+    def _stream_request(self) -> List[Dict]:
+        query = {"templateIds": [self.sdk._template_ref(name) for name in self.templates]}
+        if self.offset is not None:
+            return [{"offset": self.offset}, query]
+        return [query]
+
+    async def _stream_once(self):
+        if self.offset is None:
+            # No offset means the active contract set is replayed from scratch
+            self._reset()
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(
+                self._stream_url(),
+                protocols=(f"jwt.token.{self.party}", "daml.ws.auth"),
+                heartbeat=30.0
+            ) as ws:
+                await ws.send_json(self._stream_request())
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        self.apply_message(self.sdk.json_codec.loads(msg.data))
+                    elif msg.type == aiohttp.WSMsgType.ERROR:
+                        raise ws.exception()
+
+    async def run(self):
+        """Stream until stop() is called, reconnecting with backoff from the last offset"""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        delay = self.reconnect_delay
+        try:
+            while not self._stopping:
+                # A task, so stop() can cancel it while it is still connecting
+                self._task = asyncio.ensure_future(self._stream_once())
+                try:
+                    await self._task
+                    delay = self.reconnect_delay
+                except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError) as e:
+                    logger.warning(f"Contract stream disconnected: {str(e) or type(e).__name__}")
+                    self.last_error = e
+                except asyncio.CancelledError:
+                    if not self._stopping:
+                        raise
+                except Exception as e:
+                    # Stream errors, undecodable messages and callback failures; events
+                    # after the last applied offset are re-delivered on reconnect
+                    logger.error(f"Contract stream failed: {str(e) or type(e).__name__}")
+                    self.last_error = e
+                finally:
+                    self._task = None
+                # Not live until the reconnected stream reports an offset
+                self.ready.clear()
+                if self._stopping:
+                    break
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, self.max_reconnect_delay)
+        finally:
+            self.ready.clear()
+            self._loop = None
+            self._stopping = False
+            if self.checkpoint_path and self.offset is not None:
+                self.save_checkpoint(self.checkpoint_path)
+
+    def start(self) -> 'ContractReplica':
+        """Run the stream in a daemon thread (for synchronous applications)"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stopping = False
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.run()), name="contract-replica", daemon=True)
+        self._thread.start()
+        return self
+
+    def _interrupt(self):
+        """On the stream's loop: end the reconnect wait and cancel the connection or stream in progress"""
+        if self._stopped is not None:
+            self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the initial active contract set has been loaded"""
+        return self.ready.wait(timeout)
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Stop streaming, close the WebSocket and write a final checkpoint"""
+        self._stopping = True
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._interrupt)
+            except RuntimeError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+class UsageProjection(ContractReplica):
+    """
+    Incrementally maintained usage counters fed by the UsageEvent stream
+    
+    Folds each new UsageEvent (and the AgentUsageToken contracts that map a
+    token to its agent and usage type) into per-token and per-agent/usage-type
+    counters held in SQLite. The counters and the ledger offset are committed
+    in one transaction per stream message, so a restart resumes from the last
+    offset and only new events are ever processed; contracts themselves are
+    not kept in memory.
+    
+    Usage amounts are read from the event's ``eventData`` (``usageAmount`` or
+    ``amount``, defaulting to 1); unsuccessful events are counted separately
+    and add no usage. Archiving a UsageEvent does not undo its usage.
+    
+    Counters and offsets are keyed by party, so projections for different
+    parties can share one database file.
+    """
+
+    DEFAULT_TEMPLATES = ("AgentUsageToken", "UsageEvent")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS projection_offset (
+            party TEXT PRIMARY KEY,
+            ledger_offset TEXT
+        );
+        CREATE TABLE IF NOT EXISTS token_usage (
+            party TEXT NOT NULL,
+            token_id TEXT NOT NULL,
+            agent_id TEXT NOT NULL,
+            usage_type TEXT NOT NULL,
+            max_usage INTEGER NOT NULL DEFAULT 0,
+            is_active INTEGER NOT NULL DEFAULT 1,
+            events INTEGER NOT NULL DEFAULT 0,
+            failed_events INTEGER NOT NULL DEFAULT 0,
+            usage INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (party, token_id)
+        );
+        CREATE TABLE IF NOT EXISTS agent_usage (
+            party TEXT NOT NULL,
+            agent_id TEXT NOT NULL,
+            usage_type TEXT NOT NULL,
+            tokens INTEGER NOT NULL DEFAULT 0,
+            active_tokens INTEGER NOT NULL DEFAULT 0,
+            max_usage INTEGER NOT NULL DEFAULT 0,
+            events INTEGER NOT NULL DEFAULT 0,
+            failed_events INTEGER NOT NULL DEFAULT 0,
+            usage INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (party, agent_id, usage_type)
+        );
+    """
+
+    _TOKEN_COLUMNS = ('agent_id', 'usage_type', 'max_usage', 'is_active', 'events', 'failed_events', 'usage')
+
+    def __init__(
+        self,
+        sdk: _AgentTokenizationCommands,
+        path: str = "usage-projection.sqlite3",
+        templates: Optional[List[str]] = None,
+        party: Optional[str] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0
+    ):
+        """
+        Args:
+            sdk: AgentTokenizationSDK or AsyncAgentTokenizationSDK supplying
+                base_url, party and package_id
+            path: SQLite database holding the counters and the offset
+            templates: Template entity names to stream
+            party: Party whose view is projected (defaults to the SDK party)
+            reconnect_delay: Initial delay before reconnecting after a drop
+            max_reconnect_delay: Upper bound for the exponential reconnect delay
+        """
+        super().__init__(
+            sdk,
+            templates=templates,
+            party=party,
+            reconnect_delay=reconnect_delay,
+            max_reconnect_delay=max_reconnect_delay
+        )
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._migrate()
+        self._db.executescript(self.SCHEMA)
+        row = self._db.execute(
+            "SELECT ledger_offset FROM projection_offset WHERE party = ?", (self.party,)
+        ).fetchone()
+        self.offset = row[0] if row else None
+
+    def _migrate(self):
+        """Drop counters written before they were keyed by party; every party then resyncs"""
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(token_usage)")]
+        if columns and 'party' not in columns:
+            logger.warning(f"Rebuilding usage projection {self.path} with per-party counters")
+            self._db.executescript(
+                "DROP TABLE token_usage; DROP TABLE IF EXISTS agent_usage; DELETE FROM projection_offset;"
+            )
+
+    # ========== READS ==========
+
+    def token_usage(self, token_id: str) -> Optional[Dict]:
+        """Counters for one usage token, or None if it has not been seen"""
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(self._TOKEN_COLUMNS)} FROM token_usage WHERE party = ? AND token_id = ?",
+                (self.party, token_id)
+            ).fetchone()
+        return dict(zip(self._TOKEN_COLUMNS, row), token_id=token_id) if row else None
+
+    def agent_usage(self, agent_id: str) -> Dict[str, Dict[str, int]]:
+        """Counters per usage type for one agent"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT usage_type, tokens, active_tokens, max_usage, events, failed_events, usage "
+                "FROM agent_usage WHERE party = ? AND agent_id = ?", (self.party, agent_id)
+            ).fetchall()
+        return {
+            row[0]: {
+                'tokenCount': row[1], 'activeTokens': row[2], 'maxUsage': row[3],
+                'events': row[4], 'failedEvents': row[5], 'currentUsage': row[6]
+            }
+            for row in rows
+        }
+
+    def usage_by_type(self) -> Dict[str, Dict[str, int]]:
+        """Counters per usage type across all agents"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT usage_type, SUM(tokens), SUM(max_usage), SUM(events), SUM(failed_events), SUM(usage) "
+                "FROM agent_usage WHERE party = ? GROUP BY usage_type", (self.party,)
+            ).fetchall()
+        return {
+            row[0]: {'tokenCount': row[1], 'maxUsage': row[2], 'events': row[3], 'failedEvents': row[4], 'currentUsage': row[5]}
+            for row in rows
+        }
+
+    def get_usage_summary(self, agent_id: str) -> UsageSummary:
+        """Usage summary from the projected counters"""
+        by_type = self.agent_usage(agent_id)
+        return _AgentTokenizationCommands._usage_summary_from_types(
+            agent_id,
+            {
+                usage_type: {
+                    'maxUsage': entry['maxUsage'],
+                    'currentUsage': entry['currentUsage'],
+                    'tokenCount': entry['tokenCount']
+                }
+                for usage_type, entry in by_type.items()
+            },
+            sum(entry['activeTokens'] for entry in by_type.values())
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM token_usage WHERE party = ?", (self.party,)).fetchone()[0]
+
+    # ========== DELTA APPLICATION ==========
+
+    def _reset(self):
+        with self._lock:
+            self._db.execute("DELETE FROM token_usage WHERE party = ?", (self.party,))
+            self._db.execute("DELETE FROM agent_usage WHERE party = ?", (self.party,))
+            self._db.execute("DELETE FROM projection_offset WHERE party = ?", (self.party,))
+            self._db.commit()
+
+    @staticmethod
+    def _event_data(argument: Dict) -> Dict:
+        # DA.Map is encoded as [[key, value], ...] by the JSON API, TextMap as an object
+        data = argument.get('eventData') or {}
+        return dict(data) if isinstance(data, list) else data
+
+    def _update_token(self, token_id: str, update: Callable[[Dict], None], defaults: Dict):
+        """Apply ``update`` to a token row and move its contribution in agent_usage; caller holds the lock"""
+        row = self._db.execute(
+            f"SELECT {', '.join(self._TOKEN_COLUMNS)} FROM token_usage WHERE party = ? AND token_id = ?",
+            (self.party, token_id)
+        ).fetchone()
+        if row is None:
+            token = dict(defaults, max_usage=0, is_active=1, events=0, failed_events=0, usage=0)
+        else:
+            token = dict(zip(self._TOKEN_COLUMNS, row))
+            self._add_contribution(token, -1)
+        update(token)
+        self._db.execute(
+            f"INSERT OR REPLACE INTO token_usage (party, token_id, {', '.join(self._TOKEN_COLUMNS)}) "
+            f"VALUES (?, ?, {', '.join('?' for _ in self._TOKEN_COLUMNS)})",
+            (self.party, token_id) + tuple(token[column] for column in self._TOKEN_COLUMNS)
+        )
+        self._add_contribution(token, 1)
+
+    def _add_contribution(self, token: Dict, sign: int):
+        self._db.execute(
+            "INSERT INTO agent_usage "
+            "(party, agent_id, usage_type, tokens, active_tokens, max_usage, events, failed_events, usage) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (party, agent_id, usage_type) DO UPDATE SET "
+            "tokens = tokens + excluded.tokens, active_tokens = active_tokens + excluded.active_tokens, "
+            "max_usage = max_usage + excluded.max_usage, events = events + excluded.events, "
+            "failed_events = failed_events + excluded.failed_events, usage = usage + excluded.usage",
+            (
+                self.party, token['agent_id'], token['usage_type'], sign, sign * token['is_active'], sign * token['max_usage'],
+                sign * token['events'], sign * token['failed_events'], sign * token['usage']
+            )
+        )
+
+    def _apply_token(self, argument: Dict):
+        if argument.get('tokenId') is None:
+            return
+        def update(token):
+            token['agent_id'] = argument.get('agentId', token['agent_id'])
+            token['usage_type'] = argument.get('usageType', token['usage_type'])
+            token['max_usage'] = argument.get('maxUsage', 0)
+            token['is_active'] = 1 if argument.get('isActive', True) else 0
+        self._update_token(argument.get('tokenId'), update, {'agent_id': '', 'usage_type': 'unknown'})
+
+    def _apply_event(self, argument: Dict):
+        if argument.get('tokenId') is None:
+            return
+        data = self._event_data(argument)
+        successful = argument.get('successful', True)
+        try:
+            amount = int(data.get('usageAmount', data.get('amount', 1)))
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring non-numeric usage amount in event {argument.get('eventId')}")
+            amount = 0
+
+        def update(token):
+            if successful:
+                token['events'] += 1
+                token['usage'] += amount
+            else:
+                token['failed_events'] += 1
+        self._update_token(argument.get('tokenId'), update, {
+            'agent_id': data.get('agentId', ''),
+            'usage_type': data.get('usageType', 'unknown')
+        })
+
+    def apply_message(self, message: Dict):
+        """Fold one stream message into the counters and commit it with its offset"""
+        self._check_message(message)
+        
+        with self._lock:
+            try:
+                for event in message.get('events', []):
+                    if 'created' not in event:
+                        continue
+                    contract = event['created']
+                    entity = self._entity_name(contract.get('templateId', ''))
+                    if entity == "UsageEvent":
+                        self._apply_event(contract['argument'])
+                    elif entity == "AgentUsageToken":
+                        self._apply_token(contract['argument'])
+                    for callback in self._created_callbacks:
+                        callback(contract)
+                if 'offset' in message and message['offset'] is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO projection_offset (party, ledger_offset) VALUES (?, ?)",
+                        (self.party, message['offset'])
+                    )
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+        
+        if 'offset' in message and message['offset'] is not None:
+            self.offset = message['offset']
+            self.ready.set()
+            for callback in self._offset_callbacks:
+                callback(self.offset)
+
+    def close(self):
+        """Stop streaming and close the database"""
+        self.stop()
+        with self._lock:
+            self._db.close()
 
 
 # Usage Examples:
@@ -57,7 +57,12 @@ setup(
         ],
         "async": [
             "aiohttp>=3.8.0",
-            "asyncio",
+        ],
+        "numpy": [
+            "numpy>=1.17.0",
+        ],
+        "fast": [
+            "orjson>=3.6.0",
         ],
         "flask": [
             "Flask>=2.0.0",
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Offline check of ContractReplica and UsageProjection against the mock JSON API
+
+Starts mock-json-api.py in-process and verifies, over its /v1/stream/query
+WebSocket, that created/archived deltas reach the replica, that a restart
+resumes from the saved offset instead of replaying the active contract set,
+and that a stream failure clears ``ready`` and reconnects. Needs the SDK's
+``async`` extra (aiohttp).
+
+Run with: python test-replica.py
+"""
+
+import importlib.util
+import os
+import socket
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_module(name, relative_path):
+    """Import one of the repo's script-style modules by file path"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+failures = []
+
+
+def check(condition, message):
+    print(f"  {'✅' if condition else '❌'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def eventually(predicate, timeout=5.0):
+    """Poll ``predicate`` until it is truthy or ``timeout`` seconds pass"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return bool(predicate())
+
+
+def create_usage_event(sdk, token_id, amount, successful=True):
+    sdk._make_request('/v1/create', 'POST', {
+        'templateId': sdk._template_id('UsageEvent'),
+        'argument': {
+            'operator': sdk.party,
+            'tokenId': token_id,
+            'eventId': f"event-{time.monotonic_ns()}",
+            'eventData': {'usageAmount': amount},
+            'successful': successful
+        }
+    })
+
+
+def check_replica(sdk_module, sdk, workdir):
+    print('1. ContractReplica deltas and offset resume:')
+    checkpoint = os.path.join(workdir, 'replica.json')
+    replica = sdk_module.ContractReplica(sdk, checkpoint_path=checkpoint).start()
+    check(replica.wait_ready(5), 'initial active contract set loaded')
+    tokens = sdk.query_usage_tokens()
+    check(len(replica.usage_tokens()) == len(tokens), f"{len(tokens)} usage tokens replicated")
+
+    token = tokens[0]
+    agent_id = token['argument']['agentId']
+    new_id = sdk.record_usage(token['contractId'], 25)['result']['exerciseResult']
+    check(eventually(lambda: replica.get(new_id) is not None), 'created delta applied')
+    check(replica.get(token['contractId']) is None, 'archived delta applied')
+    expected = sdk._build_usage_summary(agent_id, sdk.query_usage_tokens({'agentId': agent_id}))
+    check(replica.get_usage_summary(agent_id) == expected, 'maintained usage summary matches a fresh query')
+    replica.stop()
+    check(not replica.ready.is_set(), 'stopped replica is not ready')
+
+    # Changes made while the replica is down arrive as deltas after the saved offset
+    later_id = sdk.record_usage(new_id, 5)['result']['exerciseResult']
+    resumed = sdk_module.ContractReplica(sdk, checkpoint_path=checkpoint)
+    seen = []
+    resumed.on_created(lambda contract: seen.append(contract['contractId']))
+    resumed.start()
+    check(resumed.wait_ready(5), 'resumed from checkpoint offset')
+    check(eventually(lambda: resumed.get(later_id) is not None) and resumed.get(new_id) is None,
+          'delta made while stopped applied on resume')
+    check(seen == [later_id], f"only the missed contract was streamed on resume ({len(seen)} created events)")
+    resumed.stop()
+
+
+def check_failure_recovery(sdk_module, sdk):
+    print('2. ContractReplica stream failures:')
+    replica = sdk_module.ContractReplica(sdk, reconnect_delay=0.05)
+    failing = []
+    failed = []
+    delivered = []
+
+    def flaky_callback(contract):
+        if failing and not failed:
+            failed.append(contract['contractId'])
+            raise RuntimeError('callback failure')
+        delivered.append(contract['contractId'])
+
+    replica.on_created(flaky_callback)
+    replica.start()
+    check(replica.wait_ready(5), 'replica live')
+    # Fail on a live delta, so the reconnect resumes from an offset rather than resyncing
+    failing.append(True)
+    token = sdk.query_usage_tokens()[0]
+    new_id = sdk.record_usage(token['contractId'], 1)['result']['exerciseResult']
+    check(eventually(lambda: replica.last_error is not None), 'callback failure recorded in last_error')
+    check(eventually(replica.ready.is_set), 'reconnected and live again after the failure')
+    check(replica._thread.is_alive(), 'stream thread still running')
+    check(eventually(lambda: new_id in delivered) and replica.get(new_id) is not None,
+          'contract whose callback failed is delivered again on replay')
+    replica.stop()
+
+    bad_offset = sdk_module.ContractReplica(sdk, offset='999999999', reconnect_delay=0.05).start()
+    check(eventually(lambda: getattr(bad_offset.last_error, 'code', None) == 'STREAM_ERROR'),
+          'stream error from the JSON API recorded in last_error')
+    check(not bad_offset.ready.is_set() and bad_offset._thread.is_alive(), 'not ready, still reconnecting')
+    sdk.summary_source = bad_offset
+    agent_id = sdk.query_usage_tokens()[0]['argument']['agentId']
+    check(sdk._maintained_usage_summary(agent_id) is None, 'SDK falls back to querying while the stream is down')
+    sdk.summary_source = None
+    bad_offset.stop()
+
+
+def check_stop(sdk_module, sdk_class):
+    print('3. ContractReplica.stop while not streaming:')
+    unreachable = sdk_module.ContractReplica(sdk_class(base_url='http://127.0.0.1:9'), reconnect_delay=30.0).start()
+    check(eventually(lambda: unreachable.last_error is not None), 'connection refused, waiting to reconnect')
+    started = time.monotonic()
+    unreachable.stop()
+    check(unreachable._thread is None and time.monotonic() - started < 1.0, 'stop() ends the reconnect wait')
+
+    # Accepts TCP connections but never answers the WebSocket handshake
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    hanging = sdk_module.ContractReplica(sdk_class(base_url=f"http://127.0.0.1:{listener.getsockname()[1]}")).start()
+    time.sleep(0.2)
+    started = time.monotonic()
+    hanging.stop()
+    check(hanging._thread is None and time.monotonic() - started < 1.0, 'stop() cancels a connect in progress')
+    listener.close()
+
+
+def check_projection(sdk_module, sdk, workdir):
+    print('4. UsageProjection counters and offset resume:')
+    path = os.path.join(workdir, 'projection.sqlite3')
+    token = sdk.query_usage_tokens()[0]['argument']
+    token_id = token['tokenId']
+    create_usage_event(sdk, token_id, 3)
+    create_usage_event(sdk, token_id, 4, successful=False)
+
+    projection = sdk_module.UsageProjection(sdk, path).start()
+    check(projection.wait_ready(5), 'projection live')
+    check(eventually(lambda: (projection.token_usage(token_id) or {}).get('usage') == 3),
+          'successful event counted, failed one not')
+    create_usage_event(sdk, token_id, 10)
+    check(eventually(lambda: projection.token_usage(token_id)['events'] == 2), 'live event delta applied')
+    projection.close()
+
+    create_usage_event(sdk, token_id, 100)
+    reopened = sdk_module.UsageProjection(sdk, path)
+    check(reopened.offset is not None, f"offset {reopened.offset} restored from SQLite")
+    reopened.start()
+    check(reopened.wait_ready(5), 'projection resumed from stored offset')
+    check(eventually(lambda: reopened.token_usage(token_id)['usage'] == 113), 'missed event counted exactly once')
+    counters = reopened.token_usage(token_id)
+    check((counters['events'], counters['failed_events']) == (3, 1), 'event counters not replayed')
+    usage_type = reopened.agent_usage(token['agentId'])[token['usageType']]
+    check(usage_type['events'] == 3, 'per-agent counters match')
+    reopened.close()
+
+
+def main():
+    sdk_module = load_module('agent_tokenization_sdk', 'sdks/agent-tokenization-python-sdk.py')
+    mock_module = load_module('mock_json_api', 'mock-json-api.py')
+    if sdk_module.aiohttp is None:
+        print('aiohttp is required (pip install aiohttp)')
+        sys.exit(2)
+    sdk_module.logger.setLevel('CRITICAL')
+
+    mock = mock_module.start_mock_server(agents=3, tokens_per_agent=2)
+    sdk = sdk_module.AgentTokenizationSDK(base_url=mock.base_url, package_id=mock.ledger.package_id)
+    print(f"🧪 Checking replicas against mock JSON API ({len(mock.ledger)} contracts seeded)\n")
+    with tempfile.TemporaryDirectory() as workdir:
+        check_replica(sdk_module, sdk, workdir)
+        check_failure_recovery(sdk_module, sdk)
+        check_stop(sdk_module, sdk_module.AgentTokenizationSDK)
+        check_projection(sdk_module, sdk, workdir)
+    mock.shutdown()
+
+    if failures:
+        print(f"\n❌ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print('\n✅ All replica checks passed')
+
+
+if __name__ == '__main__':
+    main()